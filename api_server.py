@@ -6,11 +6,16 @@ Provides REST API to interact with autobidder configuration and data
 import json
 import sqlite3
 import os
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, g
 from flask_cors import CORS
 import subprocess
 import threading
 import time
+from prompt_bandit import PromptBandit
+from db_pool import ReadPool, snapshot
+from prompt_registry import TemplateError, validate_template, template_hash
+from migrations import migrate
+import bid_queries
 
 # Try to import config, but don't fail if it doesn't exist
 try:
@@ -21,8 +26,8 @@ except ImportError:
 
 # Import Freelancer SDK for fetching bids
 try:
-    from freelancersdk.session import Session
     from freelancersdk.resources.projects import get_bids, get_projects
+    from freelancer_client import get_session, client_stats
     FREELANCER_SDK_AVAILABLE = True
 except ImportError:
     FREELANCER_SDK_AVAILABLE = False
@@ -40,6 +45,27 @@ MAX_LOG_LINES = 1000
 # Database connections
 BIDS_DB = 'bids.db'
 CONFIG_FILE = 'config.py'
+# Schema changes happen once here (see migrations.py), never inside request handlers
+try:
+    for _version, _name in migrate(BIDS_DB):
+        print(f"Applied schema migration {_version}: {_name}")
+except Exception as e:
+    print(f"Error migrating {BIDS_DB}: {e}")
+# Dashboard reads share a few read-only connections; writes still open their own
+READ_POOL_SIZE = int(os.environ.get('READ_POOL_SIZE', '4'))
+read_pool = ReadPool(BIDS_DB, size=READ_POOL_SIZE)
+
+def read_db():
+    """This request's pooled read-only connection (checked out on first use, returned on teardown)"""
+    if 'read_db' not in g:
+        g.read_db = read_pool.acquire()
+    return g.read_db
+
+@app.teardown_appcontext
+def release_read_db(exc):
+    conn = g.pop('read_db', None)
+    if conn is not None:
+        read_pool.release(conn)
 
 def convert_to_usd(amount, currency_code):
     """Convert amount from given currency to USD"""
@@ -83,30 +109,6 @@ def convert_to_usd(amount, currency_code):
     rate = conversion_rates.get(currency_code.upper(), 1.0)
     return amount * rate
 
-def init_prompts_table():
-    """Initialize prompts table for arsenal"""
-    conn = sqlite3.connect(BIDS_DB, check_same_thread=False)
-    c = conn.cursor()
-    c.execute('''CREATE TABLE IF NOT EXISTS prompts 
-                 (id INTEGER PRIMARY KEY AUTOINCREMENT, 
-                  name TEXT NOT NULL,
-                  description TEXT,
-                  template TEXT NOT NULL,
-                  is_active INTEGER DEFAULT 0,
-                  created_at TEXT DEFAULT CURRENT_TIMESTAMP,
-                  updated_at TEXT DEFAULT CURRENT_TIMESTAMP,
-                  stats_bids INTEGER DEFAULT 0,
-                  stats_replies INTEGER DEFAULT 0,
-                  stats_won INTEGER DEFAULT 0)''')
-    # Migrate: Add description column if it doesn't exist
-    try:
-        c.execute("ALTER TABLE prompts ADD COLUMN description TEXT")
-        conn.commit()
-    except sqlite3.OperationalError:
-        pass  # Column already exists
-    conn.commit()
-    conn.close()
-
 def read_config_file():
     """Read config.py and parse it"""
     config = {}
@@ -438,15 +440,8 @@ def update_config():
 def get_prompts():
     """Get all prompts from arsenal"""
     try:
-        init_prompts_table()
-        # Sync stats before returning
-        sync_prompt_stats()
-        
-        conn = sqlite3.connect(BIDS_DB, check_same_thread=False)
-        c = conn.cursor()
-        c.execute("SELECT id, name, description, template, is_active, created_at, updated_at, stats_bids, stats_replies, stats_won FROM prompts ORDER BY is_active DESC, created_at DESC")
-        rows = c.fetchall()
-        conn.close()
+        # stats_* are counted as they happen (bid placed, first reply, won), never recomputed here
+        rows = read_db().execute("SELECT id, name, description, template, is_active, created_at, updated_at, stats_bids, stats_replies, stats_won FROM prompts ORDER BY is_active DESC, created_at DESC").fetchall()
         
         prompts = []
         for row in rows:
@@ -483,12 +478,15 @@ def create_prompt():
         
         if not name or not template:
             return jsonify({'error': 'Name and template are required'}), 400
+        try:
+            validate_template(template)
+        except TemplateError as e:
+            return jsonify({'error': str(e)}), 400
         
-        init_prompts_table()
         conn = sqlite3.connect(BIDS_DB, check_same_thread=False)
         c = conn.cursor()
-        c.execute("INSERT INTO prompts (name, description, template, created_at, updated_at) VALUES (?, ?, ?, datetime('now'), datetime('now'))",
-                 (name, description, template))
+        c.execute("INSERT INTO prompts (name, description, template, prompt_hash, created_at, updated_at) VALUES (?, ?, ?, ?, datetime('now'), datetime('now'))",
+                 (name, description, template, template_hash(template)))
         prompt_id = c.lastrowid
         conn.commit()
         conn.close()
@@ -507,8 +505,12 @@ def update_prompt_arsenal(prompt_id):
         name = data.get('name', '').strip()
         description = data.get('description', '').strip() or None
         template = data.get('template', '').strip()
+        if template:
+            try:
+                validate_template(template)
+            except TemplateError as e:
+                return jsonify({'error': str(e)}), 400
         
-        init_prompts_table()
         conn = sqlite3.connect(BIDS_DB, check_same_thread=False)
         c = conn.cursor()
         
@@ -525,6 +527,8 @@ def update_prompt_arsenal(prompt_id):
         if template:
             updates.append("template = ?")
             params.append(template)
+            updates.append("prompt_hash = ?")
+            params.append(template_hash(template))
         
         if updates:
             updates.append("updated_at = datetime('now')")
@@ -543,7 +547,6 @@ def update_prompt_arsenal(prompt_id):
 def activate_prompt(prompt_id):
     """Activate a prompt (set as active and update autobidder.py)"""
     try:
-        init_prompts_table()
         conn = sqlite3.connect(BIDS_DB, check_same_thread=False)
         c = conn.cursor()
         
@@ -578,7 +581,6 @@ def activate_prompt(prompt_id):
 def delete_prompt(prompt_id):
     """Delete a prompt from arsenal"""
     try:
-        init_prompts_table()
         conn = sqlite3.connect(BIDS_DB, check_same_thread=False)
         c = conn.cursor()
         c.execute("DELETE FROM prompts WHERE id = ?", (prompt_id,))
@@ -594,12 +596,7 @@ def delete_prompt(prompt_id):
 def get_prompt():
     """Get current active prompt (for backward compatibility)"""
     try:
-        init_prompts_table()
-        conn = sqlite3.connect(BIDS_DB, check_same_thread=False)
-        c = conn.cursor()
-        c.execute("SELECT name, description, template FROM prompts WHERE is_active = 1 LIMIT 1")
-        result = c.fetchone()
-        conn.close()
+        result = read_db().execute("SELECT name, description, template FROM prompts WHERE is_active = 1 LIMIT 1").fetchone()
         
         if result:
             return jsonify({'prompt': result[2], 'template': result[2], 'name': result[0], 'description': result[1]})
@@ -613,25 +610,18 @@ def get_prompt():
         import traceback
         return jsonify({'error': str(e), 'traceback': traceback.format_exc()}), 500
 
-def init_prompt_metadata_table():
-    """Initialize prompt_metadata table"""
-    conn = sqlite3.connect(BIDS_DB, check_same_thread=False)
-    c = conn.cursor()
-    c.execute('''CREATE TABLE IF NOT EXISTS prompt_metadata 
-                 (prompt_hash TEXT PRIMARY KEY, name TEXT NOT NULL, created_at TEXT DEFAULT CURRENT_TIMESTAMP)''')
-    conn.commit()
-    conn.close()
-
 @app.route('/prompt', methods=['POST'])
 @app.route('/api/prompt', methods=['POST'])  # Also accept /api prefix
 def update_prompt():
     """Update current active prompt (for backward compatibility)"""
-    import hashlib
     data = request.json
     template = data.get('prompt') or data.get('template', '')
     prompt_name = data.get('name', '').strip() if data.get('name') else None
+    try:
+        validate_template(template)
+    except TemplateError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
     
-    init_prompts_table()
     conn = sqlite3.connect(BIDS_DB, check_same_thread=False)
     c = conn.cursor()
     
@@ -643,26 +633,22 @@ def update_prompt():
     
     if active:
         # Update existing active prompt
+        updates = ["template = ?", "prompt_hash = ?"]
+        params = [template, template_hash(template)]
         if prompt_name:
-            if description is not None:
-                c.execute("UPDATE prompts SET template = ?, name = ?, description = ?, updated_at = datetime('now') WHERE id = ?",
-                         (template, prompt_name, description, active[0]))
-            else:
-                c.execute("UPDATE prompts SET template = ?, name = ?, updated_at = datetime('now') WHERE id = ?",
-                         (template, prompt_name, active[0]))
-        else:
-            if description is not None:
-                c.execute("UPDATE prompts SET template = ?, description = ?, updated_at = datetime('now') WHERE id = ?",
-                         (template, description, active[0]))
-            else:
-                c.execute("UPDATE prompts SET template = ?, updated_at = datetime('now') WHERE id = ?",
-                         (template, active[0]))
+            updates.append("name = ?")
+            params.append(prompt_name)
+        if description is not None:
+            updates.append("description = ?")
+            params.append(description)
+        params.append(active[0])
+        c.execute(f"UPDATE prompts SET {', '.join(updates)}, updated_at = datetime('now') WHERE id = ?", params)
     else:
         # Create new active prompt
         name = prompt_name or 'Default Prompt'
         c.execute("UPDATE prompts SET is_active = 0")  # Deactivate all
-        c.execute("INSERT INTO prompts (name, description, template, is_active, created_at, updated_at) VALUES (?, ?, ?, 1, datetime('now'), datetime('now'))",
-                 (name, description, template))
+        c.execute("INSERT INTO prompts (name, description, template, prompt_hash, is_active, created_at, updated_at) VALUES (?, ?, ?, ?, 1, datetime('now'), datetime('now'))",
+                 (name, description, template, template_hash(template)))
     
     conn.commit()
     conn.close()
@@ -684,7 +670,7 @@ def fetch_bids_from_freelancer():
         if not oauth_token or not bidder_id:
             return []
         
-        session = Session(oauth_token=oauth_token)
+        session = get_session(oauth_token)
         all_bids = []
         
         # Strategy: Get recent active projects and check for bids
@@ -766,40 +752,13 @@ def sync_bids_with_freelancer():
         conn = sqlite3.connect(BIDS_DB, check_same_thread=False)
         c = conn.cursor()
         
-        # Ensure table exists with all columns
-        c.execute('''CREATE TABLE IF NOT EXISTS bids 
-                     (project_id INTEGER PRIMARY KEY, title TEXT, bid_amount REAL, 
-                      status TEXT DEFAULT 'applied', outsource_cost REAL, profit REAL, applied_at TEXT, bid_message TEXT, reply_count INTEGER DEFAULT 0)''')
-        
-        # Migrate: Add columns if they don't exist
-        try:
-            c.execute("ALTER TABLE bids ADD COLUMN bid_message TEXT")
-            conn.commit()
-        except sqlite3.OperationalError:
-            pass
-        try:
-            c.execute("ALTER TABLE bids ADD COLUMN reply_count INTEGER DEFAULT 0")
-            conn.commit()
-        except sqlite3.OperationalError:
-            pass
-        try:
-            c.execute("ALTER TABLE bids ADD COLUMN prompt_hash TEXT")
-            conn.commit()
-        except sqlite3.OperationalError:
-            pass
-        try:
-            c.execute("ALTER TABLE bids ADD COLUMN currency_code TEXT")
-            conn.commit()
-        except sqlite3.OperationalError:
-            pass
-        
         # Get project details for bids that don't have titles
         config = read_config_file()
         oauth_token = config.get('OAUTH_TOKEN')
         session = None
         if oauth_token and FREELANCER_SDK_AVAILABLE:
             try:
-                session = Session(oauth_token=oauth_token)
+                session = get_session(oauth_token)
             except:
                 pass
         
@@ -887,8 +846,11 @@ def sync_bids_with_freelancer():
                 reply_count = bid.get('reply_count') or bid.get('message_count') or bid.get('replies') or 0
                 
                 # Insert or update bid (preserve existing status if it's 'won', preserve reply_count if higher)
-                c.execute("SELECT status, reply_count, currency_code FROM bids WHERE project_id=?", (project_id,))
+                c.execute("SELECT status, reply_count, currency_code, prompt_id FROM bids WHERE project_id=?", (project_id,))
                 existing_data = c.fetchone()
+                # First reply on a bid we placed: credit its prompt right away (feeds the bandit)
+                if existing_data and existing_data[3] and reply_count > 0 and not existing_data[1]:
+                    c.execute("UPDATE prompts SET stats_replies = stats_replies + 1 WHERE id = ?", (existing_data[3],))
                 status = 'applied'
                 if existing_data and existing_data[0] == 'won':
                     status = 'won'
@@ -901,9 +863,13 @@ def sync_bids_with_freelancer():
                     # If we didn't successfully fetch project details, keep existing non-USD currency
                     currency_code = existing_data[2]
                 
-                c.execute("""INSERT OR REPLACE INTO bids 
+                # Upsert so columns the autobidder wrote (prompt_id, prompt_hash, project_skills) survive the sync
+                c.execute("""INSERT INTO bids 
                             (project_id, title, bid_amount, status, applied_at, bid_message, reply_count, currency_code) 
-                            VALUES (?, ?, ?, ?, ?, ?, ?, ?)""",
+                            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                            ON CONFLICT(project_id) DO UPDATE SET title = excluded.title, bid_amount = excluded.bid_amount,
+                            status = excluded.status, applied_at = excluded.applied_at, bid_message = excluded.bid_message,
+                            reply_count = excluded.reply_count, currency_code = excluded.currency_code""",
                          (project_id, title, bid_amount, status, submitted_time, bid_message, reply_count, currency_code))
                 synced_count += 1
             except Exception as e:
@@ -922,11 +888,19 @@ def sync_bids_with_freelancer():
 # Cache for last sync time to avoid too frequent API calls
 _last_sync_time = 0
 SYNC_INTERVAL_SECONDS = 300  # Sync every 5 minutes
+BIDS_PAGE_SIZE = 50
+BIDS_PAGE_MAX = 200
 
 @app.route('/bids', methods=['GET'])
 @app.route('/api/bids', methods=['GET'])  # Also accept /api prefix
 def get_bids():
-    """Get all bids from database, synced with Freelancer API"""
+    """One page of bids, newest first, synced with Freelancer API
+
+    Query params: limit (default BIDS_PAGE_SIZE, at most BIDS_PAGE_MAX), cursor (next_cursor
+    of the previous page), status, prompt_id, currency, since/until (applied_at range,
+    until exclusive) and fields (comma-separated, see bid_queries.BID_FIELDS). Messages
+    are left out; fetch them one bid at a time from /api/bids/<project_id>.
+    """
     import sys
     global _last_sync_time
     try:
@@ -948,154 +922,36 @@ def get_bids():
             threading.Thread(target=sync_in_background, daemon=True).start()
             _last_sync_time = current_time
         
-        # Use a fresh connection each time to avoid caching issues
-        conn = sqlite3.connect(BIDS_DB, check_same_thread=False)
-        c = conn.cursor()
-        
-        # Ensure table exists
-        c.execute('''CREATE TABLE IF NOT EXISTS bids 
-                     (project_id INTEGER PRIMARY KEY, title TEXT, bid_amount REAL, 
-                      status TEXT DEFAULT 'applied', outsource_cost REAL, profit REAL, applied_at TEXT, bid_message TEXT, reply_count INTEGER DEFAULT 0)''')
-        conn.commit()
-        
-        # Migrate: Add columns if they don't exist
-        try:
-            c.execute("ALTER TABLE bids ADD COLUMN bid_message TEXT")
-            conn.commit()
-        except sqlite3.OperationalError:
-            pass  # Column already exists
         try:
-            c.execute("ALTER TABLE bids ADD COLUMN currency_code TEXT")
-            conn.commit()
-        except sqlite3.OperationalError:
-            pass  # Column already exists
-        try:
-            c.execute("ALTER TABLE bids ADD COLUMN prompt_id INTEGER")
-            conn.commit()
-        except sqlite3.OperationalError:
-            pass  # Column already exists
-        try:
-            c.execute("ALTER TABLE bids ADD COLUMN prompt_hash TEXT")
-            conn.commit()
-        except sqlite3.OperationalError:
-            pass  # Column already exists
-        
-        # Check if currency_code column exists
-        c.execute("PRAGMA table_info(bids)")
-        columns = [col[1] for col in c.fetchall()]
-        has_currency = 'currency_code' in columns
-        
-        # Check if reply_count column exists
-        has_reply_count = 'reply_count' in columns
-        
-        # Check if prompt_id column exists
-        has_prompt_id = 'prompt_id' in columns
-        
-        # Force a fresh read by using a transaction
-        c.execute("BEGIN IMMEDIATE")
-        
-        # Build query with prompt name join if prompt_id exists
-        if has_prompt_id:
-            # Join with prompts table to get prompt name
-            base_select = """SELECT b.project_id, b.title, b.bid_amount, b.status, b.outsource_cost, b.profit, 
-                         b.applied_at, b.bid_message"""
-            if has_reply_count:
-                base_select += ", b.reply_count"
-            if has_currency:
-                base_select += ", b.currency_code"
-            base_select += ", b.prompt_id, p.name as prompt_name"
-            base_select += " FROM bids b LEFT JOIN prompts p ON b.prompt_id = p.id ORDER BY b.applied_at DESC"
-            c.execute(base_select)
-        elif has_currency and has_reply_count:
-            # Explicitly select columns to ensure correct order
-            # Don't use COALESCE - return NULL so frontend can handle it properly
-            c.execute("""SELECT project_id, title, bid_amount, status, outsource_cost, profit, 
-                         applied_at, bid_message, reply_count, currency_code 
-                         FROM bids ORDER BY applied_at DESC""")
-        elif has_currency:
-            c.execute("""SELECT project_id, title, bid_amount, status, outsource_cost, profit, 
-                         applied_at, bid_message, currency_code 
-                         FROM bids ORDER BY applied_at DESC""")
-        elif has_reply_count:
-            c.execute("""SELECT project_id, title, bid_amount, status, outsource_cost, profit, 
-                         applied_at, bid_message, reply_count 
-                         FROM bids ORDER BY applied_at DESC""")
-        else:
-            # Fallback if currency_code and reply_count columns don't exist yet
-            c.execute("""SELECT project_id, title, bid_amount, status, outsource_cost, profit, 
-                         applied_at, bid_message 
-                         FROM bids ORDER BY applied_at DESC""")
-        rows = c.fetchall()
-        c.execute("COMMIT")
-        conn.close()
-        
-        bids = []
-        for row in rows:
-            bid_data = {
-                'project_id': row[0],
-                'title': row[1],
-                'bid_amount': row[2],
-                'status': row[3],
-                'outsource_cost': row[4],
-                'profit': row[5],
-                'applied_at': row[6],
-                'bid_message': row[7] if len(row) > 7 else None,
-            }
-            
-            # Handle columns based on what exists
-            col_idx = 8
-            if has_prompt_id:
-                # prompt_id and prompt_name are at the end
-                if has_reply_count and has_currency:
-                    # reply_count at 8, currency_code at 9, prompt_id at 10, prompt_name at 11
-                    bid_data['reply_count'] = row[8] if len(row) > 8 and row[8] is not None else 0
-                    bid_data['currency_code'] = row[9] if len(row) > 9 and row[9] else None
-                    bid_data['prompt_id'] = row[10] if len(row) > 10 else None
-                    bid_data['prompt_name'] = row[11] if len(row) > 11 else None
-                elif has_reply_count:
-                    # reply_count at 8, prompt_id at 9, prompt_name at 10
-                    bid_data['reply_count'] = row[8] if len(row) > 8 and row[8] is not None else 0
-                    bid_data['currency_code'] = None
-                    bid_data['prompt_id'] = row[9] if len(row) > 9 else None
-                    bid_data['prompt_name'] = row[10] if len(row) > 10 else None
-                elif has_currency:
-                    # currency_code at 8, prompt_id at 9, prompt_name at 10
-                    bid_data['reply_count'] = 0
-                    bid_data['currency_code'] = row[8] if len(row) > 8 and row[8] else None
-                    bid_data['prompt_id'] = row[9] if len(row) > 9 else None
-                    bid_data['prompt_name'] = row[10] if len(row) > 10 else None
-                else:
-                    # prompt_id at 8, prompt_name at 9
-                    bid_data['reply_count'] = 0
-                    bid_data['currency_code'] = None
-                    bid_data['prompt_id'] = row[8] if len(row) > 8 else None
-                    bid_data['prompt_name'] = row[9] if len(row) > 9 else None
-            elif has_reply_count and has_currency:
-                # Both columns exist: reply_count is at index 8, currency_code at index 9
-                bid_data['reply_count'] = row[8] if len(row) > 8 and row[8] is not None else 0
-                bid_data['currency_code'] = row[9] if len(row) > 9 and row[9] else None
-                bid_data['prompt_id'] = None
-                bid_data['prompt_name'] = None
-            elif has_reply_count:
-                # Only reply_count exists: it's at index 8
-                bid_data['reply_count'] = row[8] if len(row) > 8 and row[8] is not None else 0
-                bid_data['currency_code'] = None
-                bid_data['prompt_id'] = None
-                bid_data['prompt_name'] = None
-            elif has_currency:
-                # Only currency_code exists: it's at index 8
-                bid_data['reply_count'] = 0
-                bid_data['currency_code'] = row[8] if len(row) > 8 and row[8] else None
-                bid_data['prompt_id'] = None
-                bid_data['prompt_name'] = None
-            else:
-                # Neither column exists
-                bid_data['reply_count'] = 0
-                bid_data['currency_code'] = None
-                bid_data['prompt_id'] = None
-                bid_data['prompt_name'] = None
-            bids.append(bid_data)
-        return jsonify(bids)
+            limit = min(max(int(request.args.get('limit', BIDS_PAGE_SIZE)), 1), BIDS_PAGE_MAX)
+            fields = request.args.get('fields')
+            fields = [f.strip() for f in fields.split(',') if f.strip()] if fields else list(bid_queries.BID_FIELDS)
+            unknown = [f for f in fields if f not in bid_queries.BID_FIELDS]
+            if unknown:
+                raise ValueError(f"Unknown fields: {', '.join(unknown)} (available: {', '.join(bid_queries.BID_FIELDS)})")
+            after = bid_queries.decode_cursor(request.args['cursor']) if request.args.get('cursor') else None
+            prompt_id = int(request.args['prompt_id']) if request.args.get('prompt_id') else None
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        currency = request.args.get('currency')
+        
+        # Autocommit read on a pooled read-only connection: sees the latest committed bids (WAL snapshot)
+        rows, next_after = bid_queries.fetch_bids_page(
+            read_db(), fields, limit, after,
+            status=request.args.get('status') or None,
+            prompt_id=prompt_id,
+            currency=currency.upper() if currency else None,
+            since=request.args.get('since') or None,
+            until=request.args.get('until') or None)
+        
+        bids = [dict(zip(fields, row)) for row in rows]
+        if 'has_message' in fields:
+            for bid in bids:
+                bid['has_message'] = bool(bid['has_message'])
+        return jsonify({
+            'bids': bids,
+            'next_cursor': bid_queries.encode_cursor(next_after) if next_after else None,
+        })
     except Exception as e:
         import traceback
         error_trace = traceback.format_exc()
@@ -1104,6 +960,31 @@ def get_bids():
         sys.stderr.flush()
         return jsonify({'error': str(e), 'traceback': error_trace}), 500
 
+@app.route('/bids/<int:project_id>', methods=['GET'])
+@app.route('/api/bids/<int:project_id>', methods=['GET'])  # Also accept /api prefix
+def get_bid(project_id):
+    """One bid including its full message"""
+    try:
+        row = read_db().execute(bid_queries.BID_DETAIL, (project_id,)).fetchone()
+        if not row:
+            return jsonify({'error': 'Bid not found'}), 404
+        return jsonify({
+            'project_id': row[0],
+            'title': row[1],
+            'bid_amount': row[2],
+            'status': row[3],
+            'outsource_cost': row[4],
+            'profit': row[5],
+            'applied_at': row[6],
+            'bid_message': row[7],
+            'reply_count': row[8],
+            'currency_code': row[9],
+            'prompt_id': row[10],
+            'prompt_name': row[11],
+        })
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/bids/sync', methods=['POST'])
 @app.route('/api/bids/sync', methods=['POST'])  # Also accept /api prefix in case proxy isn't working
 def sync_bids_now():
@@ -1158,7 +1039,7 @@ def sync_bids_now():
             
             if project_ids:
                 try:
-                    session = Session(oauth_token=oauth_token)
+                    session = get_session(oauth_token)
                     # Fetch project details in batches
                     for i in range(0, len(project_ids), 10):
                         batch_ids = project_ids[i:i+10]
@@ -1257,209 +1138,93 @@ def sync_bids_now():
 def get_stats():
     """Get statistics"""
     try:
-        conn = sqlite3.connect(BIDS_DB)
-        c = conn.cursor()
-        
-        # Ensure table exists
-        c.execute('''CREATE TABLE IF NOT EXISTS bids 
-                     (project_id INTEGER PRIMARY KEY, title TEXT, bid_amount REAL, 
-                      status TEXT DEFAULT 'applied', outsource_cost REAL, profit REAL, applied_at TEXT, bid_message TEXT, reply_count INTEGER DEFAULT 0)''')
-        conn.commit()
-        
-        # Migrate: Add columns if they don't exist
-        try:
-            c.execute("ALTER TABLE bids ADD COLUMN reply_count INTEGER DEFAULT 0")
-            conn.commit()
-        except sqlite3.OperationalError:
-            pass  # Column already exists
-        try:
-            c.execute("ALTER TABLE bids ADD COLUMN prompt_hash TEXT")
-            conn.commit()
-        except sqlite3.OperationalError:
-            pass  # Column already exists
-        
-        c.execute("SELECT COUNT(*) FROM bids")
-        total = c.fetchone()[0] or 0
-        c.execute("SELECT COUNT(*) FROM bids WHERE status='applied'")
-        applied = c.fetchone()[0] or 0
-        c.execute("SELECT COUNT(*) FROM bids WHERE status='won'")
-        won = c.fetchone()[0] or 0
-        c.execute("SELECT COUNT(*) FROM bids WHERE reply_count > 0")
-        replies = c.fetchone()[0] or 0
-        
-        # Calculate totals with currency conversion to USD
-        # Check if currency_code column exists
-        c.execute("PRAGMA table_info(bids)")
-        columns = [col[1] for col in c.fetchall()]
-        has_currency = 'currency_code' in columns
-        
-        if has_currency:
-            c.execute("SELECT bid_amount, COALESCE(currency_code, 'USD') as currency_code FROM bids WHERE bid_amount IS NOT NULL")
-        else:
-            c.execute("SELECT bid_amount FROM bids WHERE bid_amount IS NOT NULL")
-        bid_rows = c.fetchall()
-        total_value = 0.0
-        for row in bid_rows:
-            bid_amount = row[0]
-            currency_code = row[1] if has_currency and len(row) > 1 else 'USD'
-            total_value += convert_to_usd(bid_amount, currency_code)
-        
-        if has_currency:
-            c.execute("SELECT profit, COALESCE(currency_code, 'USD') as currency_code FROM bids WHERE profit IS NOT NULL")
-        else:
-            c.execute("SELECT profit FROM bids WHERE profit IS NOT NULL")
-        profit_rows = c.fetchall()
-        total_profit = 0.0
-        for row in profit_rows:
-            profit = row[0]
-            currency_code = row[1] if has_currency and len(row) > 1 else 'USD'
-            total_profit += convert_to_usd(profit, currency_code)
-        
-        conn.close()
-        
-        return jsonify({
-            'total_bids': total,
-            'applied': applied,
-            'won': won,
-            'replies': replies,
-            'total_value': total_value,
-            'total_profit': total_profit
-        })
+        # All counts and totals from one snapshot, so they agree with each other
+        with snapshot(read_db()) as conn:
+            return jsonify(compute_stats(conn.cursor()))
     except Exception as e:
         import traceback
         error_msg = f"Error getting stats: {str(e)}\n{traceback.format_exc()}"
         print(error_msg)
         return jsonify({'error': str(e), 'traceback': traceback.format_exc()}), 500
 
-def sync_prompt_stats():
-    """Sync prompt stats from bids table"""
+def compute_stats(c):
+    """Dashboard totals from the bids table"""
+    total = c.execute(bid_queries.COUNT_BIDS).fetchone()[0] or 0
+    applied = c.execute(bid_queries.COUNT_BIDS_WITH_STATUS, ('applied',)).fetchone()[0] or 0
+    won = c.execute(bid_queries.COUNT_BIDS_WITH_STATUS, ('won',)).fetchone()[0] or 0
+    replies = c.execute(bid_queries.COUNT_BIDS_WITH_REPLIES).fetchone()[0] or 0
+    
+    # Calculate totals with currency conversion to USD
+    total_value = 0.0
+    total_profit = 0.0
+    for currency_code, bid_amount, profit in c.execute(bid_queries.TOTALS_BY_CURRENCY):
+        total_value += convert_to_usd(bid_amount or 0.0, currency_code)
+        total_profit += convert_to_usd(profit or 0.0, currency_code)
+    
+    return {
+        'total_bids': total,
+        'applied': applied,
+        'won': won,
+        'replies': replies,
+        'total_value': total_value,
+        'total_profit': total_profit
+    }
+
+@app.route('/freelancer/client-stats', methods=['GET'])
+@app.route('/api/freelancer/client-stats', methods=['GET'])  # Also accept /api prefix
+def get_freelancer_client_stats():
+    """Connection reuse and latency of the shared Freelancer API client"""
+    if not FREELANCER_SDK_AVAILABLE:
+        return jsonify({'error': 'Freelancer SDK not available'}), 500
+    return jsonify(client_stats())
+
+@app.route('/db/pool', methods=['GET'])
+@app.route('/api/db/pool', methods=['GET'])  # Also accept /api prefix
+def get_db_pool_stats():
+    """Checkouts, waits and open connections of the read pool"""
+    return jsonify(read_pool.stats())
+
+@app.route('/analytics/prompts/bandit', methods=['GET'])
+@app.route('/api/analytics/prompts/bandit', methods=['GET'])  # Also accept /api prefix
+def get_prompt_bandit():
+    """Posterior state of the bandit prompt selector (PROMPT_SELECTION_MODE = 'bandit')"""
     try:
-        init_prompts_table()
-        conn = sqlite3.connect(BIDS_DB, check_same_thread=False)
-        c = conn.cursor()
-        
-        # Get all prompts
-        c.execute("SELECT id FROM prompts")
-        prompt_ids = [row[0] for row in c.fetchall()]
-        
-        for prompt_id in prompt_ids:
-            # Get prompt hash
-            c.execute("SELECT template FROM prompts WHERE id = ?", (prompt_id,))
-            result = c.fetchone()
-            if not result:
-                continue
-            
-            import hashlib
-            prompt_hash = hashlib.md5(result[0].encode('utf-8')).hexdigest()[:16]
-            
-            # Count bids, replies, and wins for this prompt
-            c.execute("SELECT COUNT(*), SUM(CASE WHEN reply_count > 0 THEN 1 ELSE 0 END), SUM(CASE WHEN status = 'won' THEN 1 ELSE 0 END) FROM bids WHERE prompt_hash = ?", (prompt_hash,))
-            stats = c.fetchone()
-            
-            if stats:
-                bids_count = stats[0] or 0
-                replies_count = stats[1] or 0
-                won_count = stats[2] or 0
-                
-                c.execute("UPDATE prompts SET stats_bids = ?, stats_replies = ?, stats_won = ? WHERE id = ?",
-                         (bids_count, replies_count, won_count, prompt_id))
-        
-        conn.commit()
-        conn.close()
+        config = read_config_file()
+        rows = read_db().execute("SELECT id, name, is_active, stats_bids, stats_replies, stats_won FROM prompts").fetchall()
+        
+        bandit = PromptBandit(config.get('PROMPT_BANDIT_STRATEGY', 'thompson'))
+        bandit.load([(row[0], row[3], row[4], row[5]) for row in rows])
+        state = bandit.posterior([row[0] for row in rows])
+        names = {row[0]: (row[1], bool(row[2])) for row in rows}
+        for arm in state['arms']:
+            arm['prompt_name'], arm['is_active'] = names[arm['prompt_id']]
+        state['arms'].sort(key=lambda arm: arm['p_best'], reverse=True)
+        state['enabled'] = config.get('PROMPT_SELECTION_MODE') == 'bandit'
+        return jsonify(state)
     except Exception as e:
-        print(f"Error syncing prompt stats: {e}")
+        return jsonify({'error': str(e)}), 500
 
 @app.route('/analytics/prompts', methods=['GET'])
 @app.route('/api/analytics/prompts', methods=['GET'])  # Also accept /api prefix
 def get_prompt_analytics():
     """Get prompt performance analytics - includes all prompts, even with no bids"""
     try:
-        import hashlib
-        conn = sqlite3.connect(BIDS_DB)
-        c = conn.cursor()
-        
-        # Ensure tables exist
-        c.execute('''CREATE TABLE IF NOT EXISTS bids 
-                     (project_id INTEGER PRIMARY KEY, title TEXT, bid_amount REAL, 
-                      status TEXT DEFAULT 'applied', outsource_cost REAL, profit REAL, applied_at TEXT, bid_message TEXT, reply_count INTEGER DEFAULT 0, prompt_hash TEXT)''')
-        init_prompts_table()
-        init_prompt_metadata_table()
-        conn.commit()
-        
-        # Migrate: Add prompt_hash column if it doesn't exist
-        try:
-            c.execute("ALTER TABLE bids ADD COLUMN prompt_hash TEXT")
-            conn.commit()
-        except sqlite3.OperationalError:
-            pass  # Column already exists
-        
-        # Get all prompts from prompts table and calculate their hashes
-        c.execute("SELECT id, name, template, created_at FROM prompts")
-        all_prompts = c.fetchall()
-        
-        # Create a map of prompt_hash -> prompt info
-        prompt_hash_map = {}
-        for prompt_id, prompt_name, template, created_at in all_prompts:
-            prompt_hash = hashlib.md5(template.encode('utf-8')).hexdigest()[:16]
-            prompt_hash_map[prompt_hash] = {
-                'name': prompt_name,
-                'created_at': created_at,
-                'id': prompt_id
-            }
-        
-        # Get analytics from bids grouped by prompt_hash
-        c.execute("""
-            SELECT 
-                COALESCE(b.prompt_hash, 'unknown') as prompt_hash,
-                COUNT(*) as total_bids,
-                SUM(CASE WHEN b.reply_count > 0 THEN 1 ELSE 0 END) as total_replies,
-                SUM(CASE WHEN b.status = 'won' THEN 1 ELSE 0 END) as total_won,
-                ROUND(AVG(CASE WHEN b.reply_count > 0 THEN 1.0 ELSE 0.0 END) * 100, 2) as reply_rate,
-                MIN(b.applied_at) as first_used,
-                MAX(b.applied_at) as last_used,
-                pm.name as prompt_name
-            FROM bids b
-            LEFT JOIN prompt_metadata pm ON b.prompt_hash = pm.prompt_hash
-            WHERE b.prompt_hash IS NOT NULL
-            GROUP BY b.prompt_hash
-        """)
-        
-        bid_results = c.fetchall()
-        
-        # Create analytics dict from bids data
-        analytics_dict = {}
-        for row in bid_results:
-            prompt_hash, total_bids, total_replies, total_won, reply_rate, first_used, last_used, prompt_name = row
-            analytics_dict[prompt_hash] = {
-                'prompt_hash': prompt_hash,
-                'prompt_name': prompt_name or prompt_hash_map.get(prompt_hash, {}).get('name'),
-                'total_bids': total_bids or 0,
-                'total_replies': total_replies or 0,
-                'total_won': total_won or 0,
-                'reply_rate': reply_rate or 0.0,
-                'first_used': first_used,
-                'last_used': last_used
-            }
-        
-        # Add all prompts from prompts table, even if they have no bids
-        for prompt_hash, prompt_info in prompt_hash_map.items():
-            if prompt_hash not in analytics_dict:
-                analytics_dict[prompt_hash] = {
-                    'prompt_hash': prompt_hash,
-                    'prompt_name': prompt_info['name'],
-                    'total_bids': 0,
-                    'total_replies': 0,
-                    'total_won': 0,
-                    'reply_rate': 0.0,
-                    'first_used': prompt_info['created_at'],
-                    'last_used': None
-                }
-        
-        # Convert to list and sort by total_bids DESC, then by name
-        analytics = list(analytics_dict.values())
+        c = read_db().cursor()
+        c.execute(bid_queries.PROMPT_ANALYTICS)
+        analytics = [{
+            'prompt_hash': prompt_hash,
+            'prompt_name': prompt_name,
+            'total_bids': total_bids or 0,
+            'total_replies': total_replies or 0,
+            'total_won': total_won or 0,
+            'reply_rate': reply_rate or 0.0,
+            'first_used': first_used,
+            'last_used': last_used
+        } for prompt_hash, prompt_name, total_bids, total_replies, total_won, reply_rate, first_used, last_used in c.fetchall()]
+        
+        # Sort by total_bids DESC, then by name
         analytics.sort(key=lambda x: (x['total_bids'], x['prompt_name'] or ''), reverse=True)
         
-        conn.close()
         return jsonify(analytics)
     except Exception as e:
         import traceback
@@ -1917,6 +1682,7 @@ def root():
             'health': '/health',
             'stats': '/api/stats',
             'bids': '/api/bids',
+            'bid': '/api/bids/<project_id>',
             'config': '/api/config',
             'prompts': '/api/prompts',
             'autobidder_status': '/api/autobidder/status',
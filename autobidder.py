@@ -6,13 +6,30 @@ import os
 import asyncio
 import threading
 import logging
-import hashlib
 import re
+import json
+import math
 from datetime import datetime
-from freelancersdk.session import Session
+from collections import deque
 from freelancersdk.resources.projects import place_project_bid
 import google.generativeai as genai
 from telegram import Bot
+from bid_pipeline import BidPipeline, Stage
+from freelancer_client import get_session, format_client_stats
+from project_feed import ProjectFeed
+from skill_matcher import SkillMatcher
+from bid_store import BidStore
+from migrations import migrate
+from dedupe import SeenCache, ProcessedStore
+from prompt_cache import SelectionCache, project_signature, arsenal_fingerprint
+from prompt_router import PromptRouter, project_tokens, training_samples
+from prompt_bandit import PromptBandit
+from llm_client import LLMClient, HedgedLLM, LLMThrottled, LLMTimeout
+from llm_providers import ProviderRouter, parse_provider_spec
+from prompt_prefix import GeminiContextCache, AGE_PHRASE
+from prompt_registry import PromptRegistry, TemplateError, AGE_FIELD
+from prompt_selection import (select_and_write_prompt, parse_select_and_write, format_prompt_strategies,
+                              batch_selection_prompt, assign_batch_selection, preselected_prompt)
 
 # Try to import from config.py, fallback to environment variables
 try:
@@ -37,6 +54,65 @@ except ImportError:
     else:
         MY_SKILLS = []
 
+# === PIPELINE SETTINGS ===
+# Optional in config.py; fall back to environment variables, then defaults
+PIPELINE_QUEUE_SIZE = globals().get('PIPELINE_QUEUE_SIZE', int(os.environ.get('PIPELINE_QUEUE_SIZE', '20')))
+PIPELINE_SELECT_WORKERS = globals().get('PIPELINE_SELECT_WORKERS', int(os.environ.get('PIPELINE_SELECT_WORKERS', '2')))
+PIPELINE_GENERATE_WORKERS = globals().get('PIPELINE_GENERATE_WORKERS', int(os.environ.get('PIPELINE_GENERATE_WORKERS', '2')))
+PIPELINE_PLACE_WORKERS = globals().get('PIPELINE_PLACE_WORKERS', int(os.environ.get('PIPELINE_PLACE_WORKERS', '2')))
+PIPELINE_PERSIST_WORKERS = globals().get('PIPELINE_PERSIST_WORKERS', int(os.environ.get('PIPELINE_PERSIST_WORKERS', '1')))
+# Bid queue priority decays by half for every this many minutes of project age
+PRIORITY_AGE_HALF_LIFE_MINUTES = globals().get('PRIORITY_AGE_HALF_LIFE_MINUTES', float(os.environ.get('PRIORITY_AGE_HALF_LIFE_MINUTES', '5')))
+# Queued work is dropped once the project is older than this (defaults to MAX_PROJECT_AGE_MINUTES, 0 = no deadline)
+BID_DEADLINE_MINUTES = globals().get('BID_DEADLINE_MINUTES', float(os.environ.get('BID_DEADLINE_MINUTES', str(MAX_PROJECT_AGE_MINUTES))))
+
+# === LLM CLIENT ===
+# Providers per purpose, best-first by observed latency/errors: "gemini-2.5-pro", "gemini:<model>" or "stub" (offline)
+LLM_SELECTION_PROVIDERS = globals().get('LLM_SELECTION_PROVIDERS', os.environ.get('LLM_SELECTION_PROVIDERS', 'gemini-2.5-flash,gemini-2.5-pro'))
+LLM_GENERATION_PROVIDERS = globals().get('LLM_GENERATION_PROVIDERS', os.environ.get('LLM_GENERATION_PROVIDERS', 'gemini-2.5-pro'))
+# Request budget per provider
+LLM_REQUESTS_PER_MINUTE = globals().get('LLM_REQUESTS_PER_MINUTE', float(os.environ.get('LLM_REQUESTS_PER_MINUTE', '60')))
+LLM_BURST = globals().get('LLM_BURST', int(os.environ.get('LLM_BURST', '5')))
+LLM_MAX_IN_FLIGHT = globals().get('LLM_MAX_IN_FLIGHT', int(os.environ.get('LLM_MAX_IN_FLIGHT', '4')))
+LLM_TIMEOUT_SECONDS = globals().get('LLM_TIMEOUT_SECONDS', float(os.environ.get('LLM_TIMEOUT_SECONDS', '60')))
+LLM_MAX_RETRIES = globals().get('LLM_MAX_RETRIES', int(os.environ.get('LLM_MAX_RETRIES', '3')))
+# Bid messages: race a faster provider once the main one is slower than its usual p90, and never wait past the deadline
+LLM_HEDGE_MODEL = globals().get('LLM_HEDGE_MODEL', os.environ.get('LLM_HEDGE_MODEL', 'gemini-2.5-flash'))
+LLM_HEDGE_PERCENTILE = globals().get('LLM_HEDGE_PERCENTILE', float(os.environ.get('LLM_HEDGE_PERCENTILE', '90')))
+LLM_HEDGE_DEFAULT_SECONDS = globals().get('LLM_HEDGE_DEFAULT_SECONDS', float(os.environ.get('LLM_HEDGE_DEFAULT_SECONDS', '8')))
+LLM_GENERATION_DEADLINE_SECONDS = globals().get('LLM_GENERATION_DEADLINE_SECONDS', float(os.environ.get('LLM_GENERATION_DEADLINE_SECONDS', '30')))
+# The static persona/rules part of a prompt is cached per model (Gemini CachedContent) and only the project block is sent per bid.
+# Prefixes under the minimum size are sent inline (Gemini rejects small explicit caches; implicit caching still applies)
+LLM_CONTEXT_CACHE_TTL_SECONDS = globals().get('LLM_CONTEXT_CACHE_TTL_SECONDS', int(os.environ.get('LLM_CONTEXT_CACHE_TTL_SECONDS', '3600')))
+LLM_CONTEXT_CACHE_MIN_TOKENS = globals().get('LLM_CONTEXT_CACHE_MIN_TOKENS', int(os.environ.get('LLM_CONTEXT_CACHE_MIN_TOKENS', '1024')))
+
+# === PROMPT SELECTION CACHE ===
+# Dynamic mode reuses the AI's prompt choice for projects with the same skills, budget band and kind of work
+PROMPT_CACHE_TTL_SECONDS = globals().get('PROMPT_CACHE_TTL_SECONDS', int(os.environ.get('PROMPT_CACHE_TTL_SECONDS', '21600')))
+PROMPT_CACHE_SIZE = globals().get('PROMPT_CACHE_SIZE', int(os.environ.get('PROMPT_CACHE_SIZE', '500')))
+
+# === BATCH PROMPT SELECTION ===
+# Dynamic mode classifies all of a cycle's matches in one LLM call, up to this many projects per call (0 = off)
+PROMPT_BATCH_SIZE = globals().get('PROMPT_BATCH_SIZE', int(os.environ.get('PROMPT_BATCH_SIZE', '10')))
+
+# === PROMPT ROUTER ===
+# Local model trained on past bid outcomes (python autobidder.py --train-router); the LLM is only asked when it isn't confident
+PROMPT_ROUTER_MODEL = globals().get('PROMPT_ROUTER_MODEL', os.environ.get('PROMPT_ROUTER_MODEL', 'prompt_router.json'))
+PROMPT_ROUTER_MIN_CONFIDENCE = globals().get('PROMPT_ROUTER_MIN_CONFIDENCE', float(os.environ.get('PROMPT_ROUTER_MIN_CONFIDENCE', '0.2')))
+PROMPT_ROUTER_MIN_SUPPORT = globals().get('PROMPT_ROUTER_MIN_SUPPORT', int(os.environ.get('PROMPT_ROUTER_MIN_SUPPORT', '20')))
+
+# === PROMPT BANDIT ===
+# PROMPT_SELECTION_MODE = 'bandit' picks prompts by reply rate: 'thompson' sampling or 'ucb'
+PROMPT_BANDIT_STRATEGY = globals().get('PROMPT_BANDIT_STRATEGY', os.environ.get('PROMPT_BANDIT_STRATEGY', 'thompson'))
+
+# === FEED SETTINGS ===
+# 'incremental' polls only projects newer than the last one seen, 'full' re-fetches the newest 100 every cycle
+FEED_MODE = globals().get('FEED_MODE', os.environ.get('FEED_MODE', 'incremental'))
+FEED_PAGE_SIZE = globals().get('FEED_PAGE_SIZE', int(os.environ.get('FEED_PAGE_SIZE', '20')))
+FEED_MAX_PAGES = globals().get('FEED_MAX_PAGES', int(os.environ.get('FEED_MAX_PAGES', '5')))
+# Two-phase: slim listing first, full descriptions/job details only for projects passing the cheap checks
+FEED_TWO_PHASE = globals().get('FEED_TWO_PHASE', os.environ.get('FEED_TWO_PHASE', 'true').lower() in ('1', 'true', 'yes'))
+
 # === LOGGING SETUP ===
 LOG_FILE = 'autobidder.log'
 logging.basicConfig(
@@ -57,46 +133,59 @@ def log(message):
     return f"{timestamp} | {message}"
 
 # === DATABASE ===
-# Thread-safe database operations
-_db_lock = threading.Lock()
-
 def init_database():
-    """Initialize database schema"""
-    conn = sqlite3.connect('bids.db', check_same_thread=False)
-    c = conn.cursor()
-    c.execute('''CREATE TABLE IF NOT EXISTS bids 
-                 (project_id INTEGER PRIMARY KEY, title TEXT, bid_amount REAL, 
-                  status TEXT DEFAULT 'applied', outsource_cost REAL, profit REAL, applied_at TEXT, bid_message TEXT, prompt_hash TEXT, currency_code TEXT, prompt_id INTEGER)''')
-    # Migrate: Add columns if they don't exist
-    try:
-        c.execute("ALTER TABLE bids ADD COLUMN prompt_hash TEXT")
-        conn.commit()
-    except sqlite3.OperationalError:
-        pass  # Column already exists
-    try:
-        c.execute("ALTER TABLE bids ADD COLUMN currency_code TEXT")
-        conn.commit()
-    except sqlite3.OperationalError:
-        pass  # Column already exists
-    try:
-        c.execute("ALTER TABLE bids ADD COLUMN prompt_id INTEGER")
-        conn.commit()
-    except sqlite3.OperationalError:
-        pass  # Column already exists
-    conn.commit()
-    conn.close()
+    """Bring bids.db up to the current schema (see migrations.py)"""
+    for version, name in migrate('bids.db'):
+        log(f"Applied schema migration {version}: {name}")
 
 def get_db_connection():
-    """Get a thread-safe database connection"""
+    """Get a new database connection (CLI commands and the prompt registry; the bidder itself uses bid_store)"""
     conn = sqlite3.connect('bids.db', check_same_thread=False, timeout=10.0)
     return conn
 
 # Initialize database schema
 init_database()
+# Bidder reads and writes go through one WAL-mode store; its writer thread is started with the main loop
+bid_store = BidStore('bids.db')
 
 # === GEMINI SETUP ===
 genai.configure(api_key=GEMINI_API_KEY)
-model = genai.GenerativeModel('gemini-2.5-pro')
+_llm_clients = {}
+context_cache = GeminiContextCache(ttl_seconds=LLM_CONTEXT_CACHE_TTL_SECONDS, min_tokens=LLM_CONTEXT_CACHE_MIN_TOKENS)
+
+def llm_client_for(spec):
+    """One rate-limited client per provider spec, shared by every purpose that routes to it"""
+    if spec not in _llm_clients:
+        _llm_clients[spec] = LLMClient(
+            parse_provider_spec(spec, context_cache),
+            requests_per_minute=LLM_REQUESTS_PER_MINUTE,
+            burst=LLM_BURST,
+            max_in_flight=LLM_MAX_IN_FLIGHT,
+            timeout=LLM_TIMEOUT_SECONDS,
+            max_retries=LLM_MAX_RETRIES,
+        )
+    return _llm_clients[spec]
+
+def provider_route(specs):
+    """[(spec, client), ...] for a comma-separated provider list"""
+    return [(spec.strip(), llm_client_for(spec.strip())) for spec in specs.split(',') if spec.strip()]
+
+selection_route = provider_route(LLM_SELECTION_PROVIDERS)
+generation_route = provider_route(LLM_GENERATION_PROVIDERS)
+llm = ProviderRouter({
+    'selection': selection_route,
+    'batch_selection': selection_route,
+    'generation': generation_route,
+    'select_and_write': generation_route,
+})
+hedge_llm = llm_client_for(LLM_HEDGE_MODEL) if LLM_HEDGE_MODEL else None
+generation_llm = HedgedLLM(
+    llm,
+    hedge_llm,
+    percentile=LLM_HEDGE_PERCENTILE,
+    default_delay=LLM_HEDGE_DEFAULT_SECONDS,
+    deadline=LLM_GENERATION_DEADLINE_SECONDS,
+)
 
 # === PERFECT BID PROMPT (default fallback) ===
 DEFAULT_PROMPT_TEMPLATE = """
@@ -126,25 +215,26 @@ Rules you MUST follow:
 Write only the message itself. No greetings like "Hi there", no sign-off. Just the body.
 """
 
-def load_active_prompt():
-    """Load active prompt from database, fallback to default"""
+# Prompts are read from the registry's in-memory snapshot; fetch_cycle() reloads it when the table changes
+prompt_registry = PromptRegistry(get_db_connection, DEFAULT_PROMPT_TEMPLATE)
+try:
+    prompt_registry.refresh(force=True)
+except sqlite3.Error as e:
+    log(f"Error loading prompts from database: {e}, using default")
+
+def refresh_prompts():
+    """Pick up prompt edits made through the API (one PRAGMA when nothing changed)"""
     try:
-        with _db_lock:
-            db_conn = get_db_connection()
-            try:
-                db_c = db_conn.cursor()
-                # Check if prompts table exists
-                db_c.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='prompts'")
-                if db_c.fetchone():
-                    db_c.execute("SELECT template FROM prompts WHERE is_active = 1 LIMIT 1")
-                    result = db_c.fetchone()
-                    if result:
-                        return result[0]
-            finally:
-                db_conn.close()
-    except Exception as e:
-        log(f"Error loading prompt from database: {e}, using default")
-    return DEFAULT_PROMPT_TEMPLATE
+        if prompt_registry.refresh():
+            snapshot = prompt_registry.snapshot
+            # Invalid templates are logged by the registry itself, once per change
+            log(f"Prompt arsenal reloaded: {len(snapshot.prompts)} prompts, active ID {snapshot.active_id}")
+    except sqlite3.Error as e:
+        log(f"Error refreshing prompts: {e}")
+
+def load_active_prompt():
+    """Active prompt template, fallback to default"""
+    return prompt_registry.active()[1].source
 
 # Load prompt template
 PROMPT_TEMPLATE = load_active_prompt()
@@ -168,6 +258,13 @@ def notify(msg):
             pass
     threading.Thread(target=run_in_thread, daemon=True).start()
 
+def notify_sync(msg):
+    """Send notification from the calling thread (used by pipeline workers, no extra thread)"""
+    try:
+        asyncio.run(async_notify(msg))
+    except:
+        pass
+
 # Cache for user skills
 _user_skills_cache = None
 
@@ -185,7 +282,7 @@ def get_user_skills():
     
     # Try to fetch from API
     try:
-        session = Session(oauth_token=OAUTH_TOKEN)
+        session = get_session(OAUTH_TOKEN)
         url = f'https://www.freelancer.com/api/users/0.1/users/{YOUR_BIDDER_ID}/'
         params = {'qualification_details': True}
         response = session.session.get(url, params=params)
@@ -216,18 +313,31 @@ def get_user_skills():
     log(f"Using fallback skills. Add MY_SKILLS to config.py for accurate filtering.")
     return _user_skills_cache
 
+FEED_PARAMS = {
+    'full_description': True,    # Get full description for Gemini tailoring
+    'job_details': True,         # Get skills/jobs
+    'user_details': False,       # We don't need owner details
+    'sort': 'latest'            # Sort by latest to get newest first
+}
+# Phase one of a two-phase fetch: just budget, bid stats, submit time and preview text
+SLIM_FEED_PARAMS = dict(FEED_PARAMS, full_description=False, job_details=False)
+LISTING_PARAMS = SLIM_FEED_PARAMS if FEED_TWO_PHASE else FEED_PARAMS
+
+project_feed = ProjectFeed(OAUTH_TOKEN, page_size=FEED_PAGE_SIZE, max_pages=FEED_MAX_PAGES, params=LISTING_PARAMS)
+
 def get_projects():
     """Fetch projects from Freelancer API. Returns (projects_list, is_rate_limited)"""
     try:
-        session = Session(oauth_token=OAUTH_TOKEN)
+        if FEED_MODE == 'incremental':
+            projects, total_active = project_feed.poll()
+            cycle = project_feed.last_cycle
+            log(f"Fetched {len(projects)} new active projects (total on platform: {total_active}) | "
+                f"{cycle['pages']} page(s), {cycle['bytes'] / 1024:.1f} KB, parse {cycle['parse_ms']:.1f} ms")
+            return projects, False
+        
+        session = get_session(OAUTH_TOKEN)
         url = 'https://www.freelancer.com/api/projects/0.1/projects/active/'
-        params = {
-            'limit': 100,  # Increased to get more projects per scan
-            'full_description': True,    # Get full description for Gemini tailoring
-            'job_details': True,         # Get skills/jobs
-            'user_details': False,       # We don't need owner details
-            'sort': 'latest'            # Sort by latest to get newest first
-        }
+        params = dict(LISTING_PARAMS, limit=100)  # Increased to get more projects per scan
         response = session.session.get(url, params=params)  # <-- This is the key line
         response.raise_for_status()
         data = response.json()
@@ -245,6 +355,20 @@ def get_projects():
             log(f"Search error: {e}")
             return [], False  # Other error, not rate limited
 
+def hydrate_projects(projects):
+    """Phase two: fill in full descriptions and job details for the given listing entries"""
+    try:
+        details = project_feed.fetch_details([p['id'] for p in projects])
+        log(f"Fetched details for {len(details)}/{len(projects)} candidates ({project_feed.last_cycle.get('detail_bytes', 0) / 1024:.1f} KB)")
+    except Exception as e:
+        log(f"Detail fetch failed, filtering on listing data: {e}")
+        details = {}
+    for p in projects:
+        p.update(details.get(p['id'], {}))
+        # Fall back to the preview text if the full record never arrived
+        p.setdefault('description', p.get('preview_description', ''))
+    return projects
+
 def convert_to_usd(amount, currency_code):
     """Convert amount from given currency to USD"""
     if not currency_code or currency_code.upper() == 'USD':
@@ -278,47 +402,91 @@ def convert_to_usd(amount, currency_code):
     rate = conversion_rates.get(currency_code.upper(), 1.0)
     return amount * rate
 
+def project_budget_usd(project):
+    """Midpoint of the project budget in USD"""
+    budget_data = project.get('budget', {}) or {}
+    budget_min = budget_data.get('minimum', 0) or 0
+    budget_max = budget_data.get('maximum', 0) or budget_min
+    return convert_to_usd((budget_min + budget_max) / 2, get_currency_code(project))
+
+def score_project(p):
+    """Bid priority: expected value (budget in USD) discounted by competition, age and skill fit"""
+    value = math.log1p(max(project_budget_usd(p), 0))
+    
+    # Fewer bids so far = better odds of being read
+    bid_count = p.get('bid_stats', {}).get('bid_count', 0) or 0
+    competition = 1.0 / (1.0 + bid_count / 5.0)
+    
+    # Early bids win: halve the priority every PRIORITY_AGE_HALF_LIFE_MINUTES
+    freshness = 1.0
+    time_submitted = get_submit_timestamp(p)
+    if time_submitted:
+        age_minutes = max(0.0, (time.time() - time_submitted) / 60)
+        freshness = 0.5 ** (age_minutes / PRIORITY_AGE_HALF_LIFE_MINUTES)
+    
+    # Share of the listed skills we actually have
+    required = len(p.get('jobs', []) or [])
+    matched = len(p.get('_matched_skills', []))
+    match_strength = min(1.0, matched / required) if required else (1.0 if matched else 0.5)
+    
+    return value * competition * freshness * (0.5 + 0.5 * match_strength)
+
+def get_submit_timestamp(p):
+    """Project submit time as a Unix timestamp, or None if it can't be determined"""
+    # Try different possible field names for project creation time
+    time_submitted = p.get('time_submitted') or p.get('submitdate') or p.get('time_created') or p.get('created_time') or p.get('submit_date')
+    if not time_submitted:
+        return None
+    # Convert to timestamp if it's a string
+    if isinstance(time_submitted, str):
+        try:
+            # Try parsing ISO format (e.g., "2025-12-13T12:00:00Z")
+            if 'T' in time_submitted:
+                return datetime.fromisoformat(time_submitted.replace('Z', '+00:00')).timestamp()
+            # Try parsing as Unix timestamp string
+            return float(time_submitted)
+        except ValueError:
+            return None
+    if isinstance(time_submitted, (int, float)):
+        return float(time_submitted)
+    return None
+
+def project_deadline(p):
+    """Time after which a bid on this project is too late to be worth placing (None = no deadline)"""
+    if BID_DEADLINE_MINUTES <= 0:
+        return None
+    time_submitted = get_submit_timestamp(p)
+    if not time_submitted:
+        return None
+    return time_submitted + BID_DEADLINE_MINUTES * 60
+
 def good_project(p):
+    """Full filter: cheap listing checks, then skill match"""
+    return passes_cheap_checks(p) and matches_skills(p)
+
+MAX_BIDS_SO_FAR = 25  # skip projects that already have this many bids
+
+def get_bid_count(p):
+    """Bids the project had when this record was fetched"""
+    return p.get('bid_stats', {}).get('bid_count', 0)
+
+def passes_cheap_checks(p):
+    """Age, budget and bid-count checks - only need fields from the slim feed listing"""
     budget_data = p.get('budget', {})
     budget_min = budget_data.get('minimum', 0)
     currency_code = budget_data.get('currency', {}).get('code') or budget_data.get('currency_code') or 'USD'
-    bids_so_far = p.get('bid_stats', {}).get('bid_count', 0)
+    bids_so_far = get_bid_count(p)
     pid = p.get('id', 'unknown')
-    title = p.get('title', '')[:50]
     
     # Check project age - only bid on very new projects (if MAX_PROJECT_AGE_MINUTES > 0)
     if MAX_PROJECT_AGE_MINUTES > 0:
-        try:
-            # Try different possible field names for project creation time
-            time_submitted = p.get('time_submitted') or p.get('submitdate') or p.get('time_created') or p.get('created_time') or p.get('submit_date')
-            if time_submitted:
-                # Convert to timestamp if it's a string
-                if isinstance(time_submitted, str):
-                    from datetime import datetime
-                    try:
-                        # Try parsing ISO format (e.g., "2025-12-13T12:00:00Z")
-                        if 'T' in time_submitted:
-                            dt = datetime.fromisoformat(time_submitted.replace('Z', '+00:00'))
-                            time_submitted = dt.timestamp()
-                        else:
-                            # Try parsing as Unix timestamp string
-                            time_submitted = float(time_submitted)
-                    except:
-                        try:
-                            # Try parsing Unix timestamp string
-                            time_submitted = float(time_submitted)
-                        except:
-                            time_submitted = None
-                
-                if time_submitted and isinstance(time_submitted, (int, float)):
-                    age_seconds = time.time() - time_submitted
-                    age_minutes = age_seconds / 60
-                    if age_minutes > MAX_PROJECT_AGE_MINUTES:
-                        log(f"Project {pid} skipped: Too old ({age_minutes:.1f} min > {MAX_PROJECT_AGE_MINUTES} min)")
-                        return False
-        except Exception as e:
-            # If we can't determine age, allow it (better to bid than skip)
-            pass
+        time_submitted = get_submit_timestamp(p)
+        if time_submitted:
+            age_minutes = (time.time() - time_submitted) / 60
+            if age_minutes > MAX_PROJECT_AGE_MINUTES:
+                log(f"Project {pid} skipped: Too old ({age_minutes:.1f} min > {MAX_PROJECT_AGE_MINUTES} min)")
+                return False
+        # If we can't determine age, allow it (better to bid than skip)
     
     # Convert budget to USD and check against MIN_BUDGET
     budget_min_usd = convert_to_usd(budget_min, currency_code)
@@ -326,99 +494,120 @@ def good_project(p):
         log(f"Project {pid} skipped: Budget {currency_code} {budget_min} (${budget_min_usd:.2f} USD) < ${MIN_BUDGET}")
         return False
     
-    if bids_so_far >= 25:
-        log(f"Project {pid} skipped: Too many bids ({bids_so_far} >= 25)")
+    if bids_so_far >= MAX_BIDS_SO_FAR:
+        log(f"Project {pid} skipped: Too many bids ({bids_so_far} >= {MAX_BIDS_SO_FAR})")
         return False
     
-    # Get required skills from project
-    required_skills = [j.get('name', '').lower().strip() for j in p.get('jobs', [])]
+    return True
+
+# Compiled matcher, built once from get_user_skills()
+_skill_matcher = None
+
+def get_skill_matcher():
+    """Get the precompiled matcher for the user's skills"""
+    global _skill_matcher
+    if _skill_matcher is None:
+        _skill_matcher = SkillMatcher(get_user_skills())
+    return _skill_matcher
+
+def matches_skills(p):
+    """Skill check - needs job details (and the description when no skills are listed)"""
+    pid = p.get('id', 'unknown')
+    title = p.get('title', '')[:50]
     
-    # Get user's skills
-    user_skills = get_user_skills()
+    matched, missing, source = get_skill_matcher().match_project(p)
+    # Keep the matched skills on the project for scoring later in the pipeline
+    p['_matched_skills'] = [user_skill for _, user_skill in matched]
     
-    # If project has no required skills, check title/description for keywords
-    if not required_skills:
-        title_lower = title.lower()
-        desc_lower = p.get('description', '').lower()
-        combined_text = f"{title_lower} {desc_lower}"
-        
-        # Check if any user skill appears in title or description
-        for user_skill in user_skills:
-            if user_skill in combined_text:
-                log(f"Project {pid} MATCHED (no skills listed, but found '{user_skill}' in text)")
-                return True
-        
+    # If project has no required skills, title/description were scanned for keywords
+    if source == 'text':
+        if matched:
+            log(f"Project {pid} MATCHED (no skills listed, but found '{matched[0][1]}' in text)")
+            return True
         log(f"Project {pid} skipped: No skills listed and no skill keywords found in title/description")
         return False
     
-    # Check if AT LEAST ONE required skill matches user's skills
-    # This is more flexible - we only need one skill match, not all
-    matched_skills = []
-    missing_skills = []
-    
-    for req_skill in required_skills:
-        if not req_skill:
-            continue
-        # Check if any user skill matches (exact or contains)
-        skill_matches = False
-        matched_user_skill = None
-        for user_skill in user_skills:
-            # Exact match
-            if req_skill == user_skill:
-                skill_matches = True
-                matched_user_skill = user_skill
-                break
-            # Partial match (skill name contains or is contained)
-            if req_skill in user_skill or user_skill in req_skill:
-                skill_matches = True
-                matched_user_skill = user_skill
-                break
-            # Also check for common variations (e.g., "next.js" vs "nextjs")
-            req_normalized = req_skill.replace('.', '').replace(' ', '').replace('-', '')
-            user_normalized = user_skill.replace('.', '').replace(' ', '').replace('-', '')
-            if req_normalized == user_normalized:
-                skill_matches = True
-                matched_user_skill = user_skill
-                break
-        
-        if skill_matches:
-            matched_skills.append(f"{req_skill} (matched: {matched_user_skill})")
-        else:
-            missing_skills.append(req_skill)
-    
-    # If at least one skill matches, we're good
-    if matched_skills:
-        log(f"Project {pid} MATCHED: Skills matched: {', '.join(matched_skills[:2])}{'...' if len(matched_skills) > 2 else ''}")
-        if missing_skills:
-            log(f"  (Also requires: {', '.join(missing_skills[:2])}{'...' if len(missing_skills) > 2 else ''} - but we have at least one match)")
+    # At least one required skill has to match one of ours, not all of them
+    if matched:
+        matched_text = [f"{req_skill} (matched: {user_skill})" for req_skill, user_skill in matched]
+        log(f"Project {pid} MATCHED: Skills matched: {', '.join(matched_text[:2])}{'...' if len(matched_text) > 2 else ''}")
+        if missing:
+            log(f"  (Also requires: {', '.join(missing[:2])}{'...' if len(missing) > 2 else ''} - but we have at least one match)")
         return True
     
     # No skills matched
-    log(f"Project {pid} skipped: No matching skills. Required: {', '.join(required_skills[:3])}{'...' if len(required_skills) > 3 else ''} | Title: {title}")
+    user_skills = get_user_skills()
+    log(f"Project {pid} skipped: No matching skills. Required: {', '.join(missing[:3])}{'...' if len(missing) > 3 else ''} | Title: {title}")
     log(f"  Your skills: {', '.join(user_skills[:5])}{'...' if len(user_skills) > 5 else ''}")
     return False
 
 def get_prompt_hash():
-    """Generate a hash of the current prompt template for tracking"""
-    return hashlib.md5(PROMPT_TEMPLATE.encode('utf-8')).hexdigest()[:16]
+    """Hash of the active prompt template for tracking"""
+    return prompt_registry.active()[1].hash
 
 def get_all_prompts():
-    """Get all prompts from the database"""
+    """All usable prompts (id, name, description, template, compiled)"""
+    return prompt_registry.all()
+
+def prompts_fingerprint(prompts):
+    """arsenal_fingerprint, precomputed for the registry's current prompt list"""
+    snapshot = prompt_registry.snapshot
+    return snapshot.fingerprint if prompts is snapshot.prompts else arsenal_fingerprint(prompts)
+
+selection_cache = SelectionCache(ttl_seconds=PROMPT_CACHE_TTL_SECONDS, capacity=PROMPT_CACHE_SIZE)
+router_stats = {'routed': 0, 'fallback': 0}
+
+def load_prompt_router():
+    """Load the trained prompt router, or None if it hasn't been trained yet"""
+    if not os.path.exists(PROMPT_ROUTER_MODEL):
+        return None
     try:
-        with _db_lock:
-            db_conn = get_db_connection()
-            try:
-                db_c = db_conn.cursor()
-                db_c.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='prompts'")
-                if db_c.fetchone():
-                    db_c.execute("SELECT id, name, description, template FROM prompts")
-                    rows = db_c.fetchall()
-                    return [{'id': row[0], 'name': row[1], 'description': row[2], 'template': row[3]} for row in rows]
-            finally:
-                db_conn.close()
+        router = PromptRouter.load(PROMPT_ROUTER_MODEL)
+        log(f"Prompt router loaded: {router.samples} training bids, {len(router.prompts)} prompts")
+        return router
     except Exception as e:
-        log(f"Error loading prompts: {e}")
-    return []
+        log(f"Could not load prompt router ({e}), using AI selection only")
+        return None
+
+def train_prompt_router():
+    """Train the prompt router from bids.db and save it to PROMPT_ROUTER_MODEL"""
+    with bid_store.reading() as db_conn:
+        samples = training_samples(db_conn)
+    router = PromptRouter().fit(samples)
+    router.save(PROMPT_ROUTER_MODEL)
+    return router
+
+prompt_router = load_prompt_router()
+
+def route_prompt(project, prompts):
+    """Pick a prompt with the local router. Returns the prompt dict, or None when not confident"""
+    if not prompt_router:
+        return None
+    prompt_id, confidence, support = prompt_router.predict(project_tokens(project), [p['id'] for p in prompts])
+    if prompt_id is None or confidence < PROMPT_ROUTER_MIN_CONFIDENCE or support < PROMPT_ROUTER_MIN_SUPPORT:
+        router_stats['fallback'] += 1
+        return None
+    router_stats['routed'] += 1
+    selected = next(p for p in prompts if p['id'] == prompt_id)
+    log(f"Router selected prompt: {selected['name']} (ID: {prompt_id}, confidence {confidence:.2f}, support {support})")
+    return selected
+
+def quick_select_prompt(project, prompts):
+    """Prompt choice that needs no LLM call (cached decision or confident router). Returns the prompt dict or None"""
+    # Same project shape as a recent decision? Reuse it and skip the LLM call
+    cached_id = selection_cache.get(project_signature(project, project_budget_usd(project)), prompts_fingerprint(prompts))
+    if cached_id is not None:
+        for p in prompts:
+            if p['id'] == cached_id:
+                log(f"Cached prompt selection: {p['name']} (ID: {p['id']})")
+                return p
+    
+    # Confident local routing skips the LLM round-trip entirely
+    return route_prompt(project, prompts)
+
+def remember_ai_selection(project, prompts, prompt_id):
+    """Cache an LLM prompt choice for projects of the same shape"""
+    selection_cache.put(project_signature(project, project_budget_usd(project)), prompts_fingerprint(prompts), prompt_id)
 
 def select_best_prompt(project):
     """Use AI to intelligently select the best prompt for this project"""
@@ -428,6 +617,15 @@ def select_best_prompt(project):
             # Fallback to active prompt or default
             return load_active_prompt(), get_active_prompt_id()
         
+        # Already picked by this cycle's batch selection?
+        batch_pick = preselected_prompt(project, prompts)
+        if batch_pick:
+            return batch_pick['template'], batch_pick['id']
+        
+        quick = quick_select_prompt(project, prompts)
+        if quick:
+            return quick['template'], quick['id']
+        
         # Build project context for AI analysis
         title = project.get('title', '')
         description = project.get('description', '')[:2000]  # Limit for context
@@ -436,10 +634,7 @@ def select_best_prompt(project):
         budget_max = project.get('budget', {}).get('maximum', 0) or "open"
         
         # Build prompt selection prompt
-        prompts_summary = "\n\n".join([
-            f"{i+1}. {p['name']}: {p['description']}" 
-            for i, p in enumerate(prompts)
-        ])
+        prompts_summary = format_prompt_strategies(prompts)
         
         selection_prompt = f"""You are an expert at matching project requirements to the most effective bid strategy.
 
@@ -463,11 +658,11 @@ Consider:
 
 Respond with ONLY the number (1-{len(prompts)}) of the best prompt strategy. No explanation, just the number."""
         
-        response = model.generate_content(selection_prompt)
+        response_text = llm.generate(selection_prompt, purpose='selection')
         selected_num = None
         try:
             # Extract number from response
-            response_text = response.text.strip()
+            response_text = response_text.strip()
             # Find first number in response
             numbers = re.findall(r'\d+', response_text)
             if numbers:
@@ -475,6 +670,7 @@ Respond with ONLY the number (1-{len(prompts)}) of the best prompt strategy. No
                 if 1 <= selected_num <= len(prompts):
                     selected_prompt = prompts[selected_num - 1]
                     log(f"AI selected prompt: {selected_prompt['name']} (ID: {selected_prompt['id']})")
+                    remember_ai_selection(project, prompts, selected_prompt['id'])
                     return selected_prompt['template'], selected_prompt['id']
         except Exception as e:
             log(f"Error parsing AI prompt selection: {e}, using fallback")
@@ -494,81 +690,207 @@ Respond with ONLY the number (1-{len(prompts)}) of the best prompt strategy. No
         # Fallback to active prompt
         return load_active_prompt(), get_active_prompt_id()
 
+def batch_select_prompts(projects):
+    """Pick prompts for queued matches with one LLM call per PROMPT_BATCH_SIZE projects.
+
+    Results are stored as project['_selected_prompt_id'] for select_stage. Projects the
+    cache or router can decide, or that the batch answer leaves out, are left to the
+    per-project selector.
+    """
+    if len(projects) < 2:
+        return
+    prompts = get_all_prompts()
+    if not prompts:
+        return
+    pending = []
+    for project in projects:
+        quick = quick_select_prompt(project, prompts)
+        if quick:
+            project['_selected_prompt_id'] = quick['id']
+        else:
+            pending.append(project)
+    # A single undecided project gains nothing from batching
+    if len(pending) < 2:
+        return
+    
+    for start in range(0, len(pending), PROMPT_BATCH_SIZE):
+        batch = pending[start:start + PROMPT_BATCH_SIZE]
+        try:
+            response_text = llm.generate(batch_selection_prompt(batch, prompts), purpose='batch_selection',
+                                         generation_config={'response_mime_type': 'application/json'})
+        except Exception as e:
+            log(f"Batch prompt selection failed: {e}, selecting per project")
+            continue
+        assigned = assign_batch_selection(response_text, batch, prompts)
+        for project, selected in assigned:
+            remember_ai_selection(project, prompts, selected['id'])
+        log(f"Batch prompt selection: {len(assigned)}/{len(batch)} projects classified in one call")
+
 def get_active_prompt_id():
     """Get the ID of the currently active prompt"""
+    prompt, _ = prompt_registry.active()
+    return prompt['id'] if prompt else None
+
+prompt_bandit = PromptBandit(PROMPT_BANDIT_STRATEGY)
+
+def refresh_prompt_bandit():
+    """Reload bandit counts from prompts.stats_* (picks up replies recorded by the bid sync)"""
     try:
-        with _db_lock:
-            db_conn = get_db_connection()
-            try:
-                db_c = db_conn.cursor()
-                db_c.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='prompts'")
-                if db_c.fetchone():
-                    db_c.execute("SELECT id FROM prompts WHERE is_active = 1 LIMIT 1")
-                    result = db_c.fetchone()
-                    if result:
-                        return result[0]
-            finally:
-                db_conn.close()
-    except:
-        pass
-    return None
+        rows = bid_store.read("SELECT id, stats_bids, stats_replies, stats_won FROM prompts")
+        prompt_bandit.load(rows)
+    except sqlite3.OperationalError as e:
+        log(f"Could not load prompt stats for bandit: {e}")
+
+def select_prompt(p):
+    """Pick the prompt template for this project based on PROMPT_SELECTION_MODE. Returns (template, prompt_id)"""
+    # Since we use 'from config import *', PROMPT_SELECTION_MODE should be available
+    # Default to 'dynamic' if not set
+    prompt_mode = globals().get('PROMPT_SELECTION_MODE', 'dynamic')
+    
+    if prompt_mode == 'manual':
+        # Manual mode: Use the active prompt only
+        selected_template = load_active_prompt()
+        selected_prompt_id = get_active_prompt_id()
+        log(f"Manual mode: Using active prompt (ID: {selected_prompt_id})")
+        return selected_template, selected_prompt_id
+    
+    if prompt_mode == 'combined':
+        # Combined mode: decide cheaply if we can, otherwise leave it to the select-and-write call
+        prompts = get_all_prompts()
+        if not prompts:
+            return load_active_prompt(), get_active_prompt_id()
+        quick = quick_select_prompt(p, prompts)
+        if quick:
+            return quick['template'], quick['id']
+        return None, None
+    
+    if prompt_mode == 'bandit':
+        # Bandit mode: in-memory draw over the arsenal's reply rates, no LLM call
+        prompts = get_all_prompts()
+        prompt_id = prompt_bandit.select([prompt['id'] for prompt in prompts])
+        if prompt_id is None:
+            return load_active_prompt(), get_active_prompt_id()
+        selected = next(prompt for prompt in prompts if prompt['id'] == prompt_id)
+        log(f"Bandit ({prompt_bandit.strategy}) selected prompt: {selected['name']} (ID: {prompt_id})")
+        return selected['template'], prompt_id
+    
+    # Dynamic mode: Intelligently select the best prompt for this project
+    return select_best_prompt(p)
+
+FALLBACK_BID_MESSAGE = "I just saw your project and already have a clear plan to deliver exactly what you need. What's the one feature you're most excited about?"
+
+def render_local_message(p):
+    """Bid message built from the project fields alone, for when the LLM can't answer in time"""
+    skills = [j['name'] for j in p.get('jobs', []) or [] if j.get('name')]
+    matched = list(p.get('_matched_skills', [])) or skills
+    skill_text = ", ".join(matched[:3]) if matched else "this kind of work"
+    title = (p.get('title') or 'your project').strip()
+    return (f"Your \"{title}\" project is right in my lane - I work with {skill_text} every day and can "
+            f"start right away with a clear plan for the first milestone. "
+            f"What's the one outcome that would make this project a success for you?")
+
+def project_age_text(p):
+    """Human-readable project age for prompts ("posted 3 minutes ago")"""
+    time_submitted = get_submit_timestamp(p)
+    if not time_submitted:
+        return "just posted"
+    age_minutes = int((time.time() - time_submitted) / 60)
+    if age_minutes < 2:
+        return "posted less than 2 minutes ago"
+    return f"posted {age_minutes} minutes ago"
+
+def prompt_fields(p):
+    """Values for a prompt template's placeholders"""
+    return {
+        'project_title': p['title'],
+        'full_description': p.get('description', '')[:3000],
+        'budget_min': p.get('budget', {}).get('minimum', 0),
+        'budget_max': p.get('budget', {}).get('maximum', 0) or "open",
+        'skills_list': ", ".join([j['name'] for j in p.get('jobs', [])]),
+        AGE_FIELD: project_age_text(p),
+    }
+
+def fill_prompt_template(p, template):
+    """Fill a prompt template with the project's details"""
+    return prompt_registry.compile(template).render(prompt_fields(p))
 
-def generate_message(p):
-    """Generate bid message using prompt selection mode (manual or dynamic)"""
+def generate_message(p, selected_template=None, selected_prompt_id=None):
+    """Generate bid message from the selected prompt (selects one first if not given)"""
     try:
-        # Check prompt selection mode from config
-        # Since we use 'from config import *', PROMPT_SELECTION_MODE should be available
-        # Default to 'dynamic' if not set
-        prompt_mode = globals().get('PROMPT_SELECTION_MODE', 'dynamic')
+        if selected_template is None:
+            selected_template, selected_prompt_id = select_prompt(p)
         
-        if prompt_mode == 'manual':
-            # Manual mode: Use the active prompt only
-            selected_template = load_active_prompt()
-            selected_prompt_id = get_active_prompt_id()
-            log(f"Manual mode: Using active prompt (ID: {selected_prompt_id})")
-        else:
-            # Dynamic mode: Intelligently select the best prompt for this project
-            selected_template, selected_prompt_id = select_best_prompt(p)
-        
-        # Get project age for prompt
-        time_submitted = p.get('time_submitted') or p.get('submitdate') or p.get('time_created')
-        age_text = "just posted"
-        if time_submitted:
-            try:
-                if isinstance(time_submitted, str):
-                    from datetime import datetime
-                    dt = datetime.fromisoformat(time_submitted.replace('Z', '+00:00'))
-                    age_seconds = time.time() - dt.timestamp()
-                    age_minutes = int(age_seconds / 60)
-                    if age_minutes < 2:
-                        age_text = "posted less than 2 minutes ago"
-                    elif age_minutes < 5:
-                        age_text = f"posted {age_minutes} minutes ago"
-                    else:
-                        age_text = f"posted {age_minutes} minutes ago"
-            except:
-                pass
+        # Static persona/rules go out as a cacheable prefix; only the project block is filled per bid
+        compiled = prompt_registry.compile(selected_template)
+        filled = compiled.render_suffix(prompt_fields(p))
         
-        # Format the selected prompt template
-        filled = selected_template.format(
-            project_title=p['title'],
-            full_description=p.get('description', '')[:3000],
-            budget_min=p.get('budget', {}).get('minimum', 0),
-            budget_max=p.get('budget', {}).get('maximum', 0) or "open",
-            skills_list=", ".join([j['name'] for j in p.get('jobs', [])])
-        ).replace("posted less than 2 minutes ago", age_text)
-        
-        response = model.generate_content(filled)
-        message = response.text.strip()
+        message, source = generation_llm.generate(filled, purpose='generation', prefix=compiled.prefix or None)
+        message = message.strip()
+        if source == 'hedge':
+            log(f"Message for {p.get('id')} came from the hedge model ({LLM_HEDGE_MODEL})")
         
         # Store the selected prompt_id for this message generation
-        # We'll use this in the bid() function
+        # We'll use this when recording the bid
         p['_selected_prompt_id'] = selected_prompt_id
         
         return message
+    except LLMThrottled as e:
+        # A canned message wastes the bid; skip it and screen the project again next cycle
+        log(f"Gemini throttled, retrying {p.get('id')} next cycle: {e}")
+        retry_next_cycle(p)
+        return None
+    except LLMTimeout as e:
+        # Past the hard deadline an early bid beats a perfect one
+        log(f"Gemini missed the {LLM_GENERATION_DEADLINE_SECONDS:.0f}s deadline for {p.get('id')}, using local template: {e}")
+        p['_selected_prompt_id'] = selected_prompt_id
+        return render_local_message(p)
+    except Exception as e:
+        log(f"Gemini failed: {e}")
+        return FALLBACK_BID_MESSAGE
+
+STRATEGY_INSTRUCTION_FIELDS = {
+    'project_title': "[project title above]",
+    'full_description': "[project description above]",
+    'budget_min': "[budget above]",
+    'budget_max': "[budget above]",
+    'skills_list': "[skills above]",
+    AGE_FIELD: AGE_PHRASE,
+}
+
+def strategy_instructions(template):
+    """A prompt template as instructions, with its project placeholders pointing at the shared project details"""
+    try:
+        return prompt_registry.compile(template).render(STRATEGY_INSTRUCTION_FIELDS)
+    except TemplateError:
+        return template
+
+def select_and_write(p):
+    """Combined mode: one Gemini call picks the strategy and writes the message. Returns (message, prompt_id)"""
+    prompts = get_all_prompts()
+    if not prompts:
+        return generate_message(p, load_active_prompt(), get_active_prompt_id()), get_active_prompt_id()
+    try:
+        combined_prompt = select_and_write_prompt(p, prompts, [strategy_instructions(prompt['template']) for prompt in prompts],
+                                                  project_age_text(p))
+        response_text = llm.generate(combined_prompt, purpose='select_and_write',
+                                     generation_config={'response_mime_type': 'application/json'})
+        selected, message = parse_select_and_write(response_text, prompts)
+        if not message:
+            log("Combined select-and-write returned no usable message, using fallback")
+            return FALLBACK_BID_MESSAGE, get_active_prompt_id()
+        if selected is None:
+            log("Combined select-and-write returned no valid strategy, recording the active prompt")
+            return message, get_active_prompt_id()
+        remember_ai_selection(p, prompts, selected['id'])
+        log(f"AI selected and wrote with prompt: {selected['name']} (ID: {selected['id']})")
+        return message, selected['id']
+    except LLMThrottled as e:
+        log(f"Gemini throttled, retrying {p.get('id')} next cycle: {e}")
+        retry_next_cycle(p)
+        return None, None
     except Exception as e:
         log(f"Gemini failed: {e}")
-        return "I just saw your project and already have a clear plan to deliver exactly what you need. What's the one feature you're most excited about?"
+        return FALLBACK_BID_MESSAGE, get_active_prompt_id()
 
 def calc_bid_amount(p):
     avg = p.get('bid_stats', {}).get('bid_avg')
@@ -586,91 +908,121 @@ def calc_bid_amount(p):
     max_allowed = budget_max if budget_max else budget_min * 2
     return max(budget_min + 50, min(proposed, int(max_allowed * 0.9)))
 
-def bid(project):
-    pid = project['id']
-    start_time = time.time()
-    amount = calc_bid_amount(project)
-    msg = generate_message(project)
-    
-    # Get the selected prompt_id from generate_message (stored in project dict)
-    selected_prompt_id = project.get('_selected_prompt_id')
+def get_currency_code(project):
+    """Get currency code from project - try multiple possible structures"""
+    budget_data = project.get('budget', {})
+    currency_code = 'USD'  # Default
     
+    # Try different ways the currency might be structured in the API response
+    if isinstance(budget_data.get('currency'), dict):
+        currency_code = budget_data.get('currency', {}).get('code', 'USD')
+    elif isinstance(budget_data.get('currency'), str):
+        currency_code = budget_data.get('currency', 'USD')
+    elif budget_data.get('currency_code'):
+        currency_code = budget_data.get('currency_code', 'USD')
+    elif project.get('currency'):
+        if isinstance(project.get('currency'), dict):
+            currency_code = project.get('currency', {}).get('code', 'USD')
+        else:
+            currency_code = project.get('currency', 'USD')
+    elif project.get('currency_code'):
+        currency_code = project.get('currency_code', 'USD')
+    return currency_code
+
+# === PIPELINE STAGES ===
+# Each stage takes a BidItem and returns True to pass it on, False to drop it
+
+def select_stage(item):
+    """Prompt selection stage"""
+    item.template, item.prompt_id = select_prompt(item.project)
+    return True
+
+def batch_select_stage(items):
+    """Select stage batch: one selection call for the matches queued together instead of one per bid"""
+    if PROMPT_BATCH_SIZE > 0 and globals().get('PROMPT_SELECTION_MODE', 'dynamic') == 'dynamic':
+        batch_select_prompts([item.project for item in items])
+
+def generate_stage(item):
+    """Message generation stage"""
+    project = item.project
+    item.amount = calc_bid_amount(project)
+    if item.template is None and globals().get('PROMPT_SELECTION_MODE') == 'combined':
+        # No cheap decision in select: one call both picks the strategy and writes the message
+        item.message, item.prompt_id = select_and_write(project)
+        return bool(item.message)
+    item.message = generate_message(project, item.template, item.prompt_id)
+    # generate_message records the prompt it actually used
+    item.prompt_id = project.get('_selected_prompt_id', item.prompt_id)
+    return bool(item.message)
+
+def place_stage(item):
+    """Bid placement stage"""
+    project = item.project
+    pid = project['id']
+    # Last guard against a duplicate bid (e.g. the same project matched again after a restart)
+    if processed_store.already_bid(pid):
+        log(f"Project {pid} dropped: Already bid on it")
+        return False
+    # Others keep bidding while the item waits in select/generate: recheck the live count
+    try:
+        current = project_feed.fetch_details([pid]).get(pid)
+    except Exception as e:
+        log(f"Could not refresh bid count for {pid}, using the fetched one: {e}")
+        current = None
+    bids_so_far = get_bid_count(current or project)
+    if bids_so_far >= MAX_BIDS_SO_FAR:
+        log(f"Project {pid} dropped: Too many bids ({bids_so_far} >= {MAX_BIDS_SO_FAR})")
+        return False
     try:
         log(f"Attempting to bid on project {pid}: {project['title'][:60]}")
         place_project_bid(
-            Session(oauth_token=OAUTH_TOKEN),
+            get_session(OAUTH_TOKEN),
             project_id=pid,
             bidder_id=YOUR_BIDDER_ID,
-            amount=amount,
+            amount=item.amount,
             period=DEFAULT_DELIVERY_DAYS,
-            description=msg,
+            description=item.message,
             milestone_percentage=50,  # <-- THIS WAS MISSING (50% default milestone)
         )
-        bid_time = time.time() - start_time
-        
-        # Use thread-safe database connection
-        # Get prompt hash from selected template
-        prompt_hash = None
-        if selected_prompt_id:
-            try:
-                with _db_lock:
-                    db_conn = get_db_connection()
-                    try:
-                        db_c = db_conn.cursor()
-                        db_c.execute("SELECT template FROM prompts WHERE id = ?", (selected_prompt_id,))
-                        result = db_c.fetchone()
-                        if result:
-                            prompt_hash = hashlib.md5(result[0].encode('utf-8')).hexdigest()[:16]
-                    finally:
-                        db_conn.close()
-            except:
-                pass
-        
-        # Fallback to default hash if needed
-        if not prompt_hash:
-            prompt_hash = get_prompt_hash()
-        
-        with _db_lock:
-            db_conn = get_db_connection()
-            try:
-                db_c = db_conn.cursor()
-                # Get currency code from project - try multiple possible structures
-                budget_data = project.get('budget', {})
-                currency_code = 'USD'  # Default
-                
-                # Try different ways the currency might be structured in the API response
-                if isinstance(budget_data.get('currency'), dict):
-                    currency_code = budget_data.get('currency', {}).get('code', 'USD')
-                elif isinstance(budget_data.get('currency'), str):
-                    currency_code = budget_data.get('currency', 'USD')
-                elif budget_data.get('currency_code'):
-                    currency_code = budget_data.get('currency_code', 'USD')
-                elif project.get('currency'):
-                    if isinstance(project.get('currency'), dict):
-                        currency_code = project.get('currency', {}).get('code', 'USD')
-                    else:
-                        currency_code = project.get('currency', 'USD')
-                elif project.get('currency_code'):
-                    currency_code = project.get('currency_code', 'USD')
-                
-                # Use REPLACE instead of IGNORE to update existing bids
-                db_c.execute("INSERT OR REPLACE INTO bids (project_id, title, bid_amount, applied_at, bid_message, prompt_hash, currency_code, prompt_id) VALUES (?,?,?,datetime('now'),?,?,?,?)",
-                          (pid, project['title'], amount, msg, prompt_hash, currency_code, selected_prompt_id))
-                
-                # Update prompt stats if prompt_id exists
-                if selected_prompt_id:
-                    try:
-                        db_c.execute("UPDATE prompts SET stats_bids = stats_bids + 1 WHERE id = ?", (selected_prompt_id,))
-                    except:
-                        pass  # Table might not exist yet
-                
-                db_conn.commit()
-            finally:
-                db_conn.close()
-        notify(f"BID PLACED → {project['title'][:50]} | ${amount} | ID: {pid}")
-        log(f"BID SUCCESS → {pid} | ${amount} | {project['title'][:60]} | Time: {bid_time:.1f}s")
+        return True
     except Exception as e:
         log(f"Bid failed on {pid}: {e}")
+        return False
+
+def log_failed_write(what):
+    """Done-callback for a queued BidStore write that logs it if the commit failed"""
+    def callback(future):
+        if future.exception() is not None:
+            log(f"Could not record {what}: {future.exception()}")
+    return callback
+
+def persist_stage(item):
+    """Persist the placed bid and notify"""
+    project = item.project
+    pid = project['id']
+    amount = item.amount
+    selected_prompt_id = item.prompt_id
+    bid_time = item.elapsed()
+    
+    # Hash stored with the prompt when it was loaded; the active prompt's if the choice isn't known
+    prompt = prompt_registry.get(selected_prompt_id) if selected_prompt_id else None
+    prompt_hash = prompt['prompt_hash'] if prompt else get_prompt_hash()
+    
+    currency_code = get_currency_code(project)
+    project_skills = ",".join(j.get('name', '') for j in project.get('jobs', []) or [] if j.get('name'))
+    # Use REPLACE instead of IGNORE to update existing bids
+    writes = [("INSERT OR REPLACE INTO bids (project_id, title, bid_amount, applied_at, bid_message, prompt_hash, currency_code, prompt_id, project_skills) VALUES (?,?,?,datetime('now'),?,?,?,?,?)",
+               (pid, project['title'], amount, item.message, prompt_hash, currency_code, selected_prompt_id, project_skills))]
+    # Update prompt stats if prompt_id exists
+    if selected_prompt_id:
+        writes.append(("UPDATE prompts SET stats_bids = stats_bids + 1 WHERE id = ?", (selected_prompt_id,)))
+        prompt_bandit.record_bid(selected_prompt_id)
+    # Queued for the writer thread's next group commit; the bid is already placed, so don't wait on disk
+    bid_store.write_all(writes).add_done_callback(log_failed_write(f"bid {pid}"))
+    processed_store.mark_bid(pid)
+    log(f"BID SUCCESS → {pid} | ${amount} | {project['title'][:60]} | Time: {bid_time:.1f}s ({item.timing_summary()})")
+    notify_sync(f"BID PLACED → {project['title'][:50]} | ${amount} | ID: {pid}")
+    return True
 
 # === CLI COMMANDS ===
 if len(sys.argv) > 1:
@@ -682,16 +1034,23 @@ if len(sys.argv) > 1:
                 print(row)
         finally:
             db_conn.close()
+    elif sys.argv[1] == "--train-router":
+        router = train_prompt_router()
+        print(f"Trained prompt router on {router.samples} bids across {len(router.prompts)} prompts -> {PROMPT_ROUTER_MODEL}")
+        for prompt_id, (bids, successes) in sorted(router.prompts.items()):
+            print(f"  prompt {prompt_id}: {bids} bids, {successes:.0f} replies/wins")
     elif sys.argv[1] == "--cost" and len(sys.argv) == 4:
         pid, cost = int(sys.argv[2]), float(sys.argv[3])
         db_conn = get_db_connection()
         try:
             db_c = db_conn.cursor()
-            db_c.execute("SELECT bid_amount FROM bids WHERE project_id=?", (pid,))
+            db_c.execute("SELECT bid_amount, status, prompt_id FROM bids WHERE project_id=?", (pid,))
             row = db_c.fetchone()
             if row:
                 profit = row[0] - cost
                 db_c.execute("UPDATE bids SET status='won', outsource_cost=?, profit=? WHERE project_id=?", (cost, profit, pid))
+                if row[1] != 'won' and row[2]:
+                    db_c.execute("UPDATE prompts SET stats_won = stats_won + 1 WHERE id = ?", (row[2],))
                 db_conn.commit()
                 notify(f"WIN UPDATED → ID {pid} | Cost ${cost} | Profit ${profit}")
                 print(f"Updated {pid}: Profit ${profit}")
@@ -700,100 +1059,152 @@ if len(sys.argv) > 1:
     sys.exit(0)
 
 # === MAIN LOOP ===
-seen = {}  # Changed to dict: {project_id: timestamp}
-SEEN_EXPIRY_SECONDS = 3600  # Re-check projects after 1 hour (bid counts might change)
-MAX_SEEN_SIZE = 500
+SEEN_EXPIRY_SECONDS = globals().get('SEEN_EXPIRY_SECONDS', int(os.environ.get('SEEN_EXPIRY_SECONDS', '3600')))  # Re-check projects after 1 hour (bid counts might change)
+MAX_SEEN_SIZE = globals().get('MAX_SEEN_SIZE', int(os.environ.get('MAX_SEEN_SIZE', '500')))
+seen = SeenCache(ttl_seconds=SEEN_EXPIRY_SECONDS, capacity=MAX_SEEN_SIZE)
+bid_store.start()
+processed_store = ProcessedStore(store=bid_store)
+_retry_projects = deque()  # throttled before a message was written; screened again by the next fetch
+
+def retry_next_cycle(p):
+    """Un-see a project the LLM was too throttled to write for, so fetch_cycle() hands it back"""
+    seen.discard(p['id'])
+    processed_store.record({p['id']: 'throttled'})
+    _retry_projects.append(p)
+
+STATS_EVERY_CYCLES = 20  # Log Freelancer client and seen-cache stats every N polls
+_cycle_count = 0
+
+def fetch_cycle():
+    """Fetch stage: expire old seen entries, then poll the project feed"""
+    global _cycle_count
+    _cycle_count += 1
+    refresh_prompts()
+    if _cycle_count % STATS_EVERY_CYCLES == 0:
+        log(format_client_stats())
+        log(llm.format_stats())
+        for client in _llm_clients.values():
+            log(client.format_stats())
+        log(generation_llm.format_stats())
+        stats = bid_store.stats()
+        log(f"Bid store: {stats['units']} writes in {stats['commits']} commits (avg batch {stats['avg_batch']}, max {stats['max_batch']}, {stats['avg_commit_ms']:.1f} ms/commit) | {stats['queued']} queued | {stats['errors']} errors")
+        stats = seen.stats()
+        log(f"Seen cache: {stats['size']}/{stats['capacity']} | hit rate {stats['hit_rate'] * 100:.0f}% | {stats['evictions']} evicted, {stats['expirations']} expired")
+        stats = selection_cache.stats()
+        if stats['hits'] or stats['misses']:
+            log(f"Prompt selection cache: {stats['size']} entries | hit rate {stats['hit_rate'] * 100:.0f}% ({stats['hits']}/{stats['hits'] + stats['misses']}) | {stats['invalidations']} invalidations")
+        if globals().get('PROMPT_SELECTION_MODE') == 'bandit':
+            refresh_prompt_bandit()
+        stats = context_cache.stats()
+        if stats['registrations'] or stats['skipped']:
+            log(f"Context cache: {stats['entries']} prefixes | {stats['hits']} hits (~{stats['tokens_reused']} tokens reused) | {stats['skipped']} sent inline | {stats['failures']} failures")
+        if router_stats['routed'] or router_stats['fallback']:
+            log(f"Prompt router: {router_stats['routed']} routed locally, {router_stats['fallback']} sent to AI selection")
+    # Clean up expired entries
+    expired = seen.expire()
+    if expired:
+        log(f"Expired {expired} old project entries (re-checking them now)")
+    
+    log(f"Scanning for new projects... (tracking: {len(seen)})")
+    projects, rate_limited = get_projects()
+    retries = []
+    while _retry_projects:
+        retries.append(_retry_projects.popleft())
+    if retries:
+        log(f"Re-checking {len(retries)} project(s) skipped while the LLM was throttled")
+    return retries + projects, rate_limited
+
+def screen_projects(projects):
+    """Filter stage: drop already-seen projects and return the ones worth bidding on"""
+    current_time = time.time()
+    candidates = []
+    matches = []
+    outcomes = {}  # project_id -> 'skipped' / 'matched', persisted for restarts
+    skipped_count = 0
+    new_projects = 0
+    already_seen = 0
+    
+    for p in projects:
+        pid = p['id']
+        if pid not in seen:
+            new_projects += 1
+            if processed_store.already_bid(pid):
+                log(f"Project {pid} skipped: Already bid on it")
+                skipped_count += 1
+            elif passes_cheap_checks(p):
+                candidates.append(p)
+            else:
+                skipped_count += 1
+                outcomes[pid] = 'skipped'
+            # Capacity is enforced on insert by evicting the oldest entry
+            seen.add(pid, current_time)
+        else:
+            already_seen += 1
+    
+    # Only the survivors of the cheap checks pay for full descriptions
+    if FEED_TWO_PHASE and candidates:
+        hydrate_projects(candidates)
+    
+    for p in candidates:
+        if matches_skills(p):
+            matches.append(p)
+            outcomes[p['id']] = 'matched'
+            log(f"✓ MATCHING PROJECT: {p['id']} - {p['title'][:50]}")
+        else:
+            skipped_count += 1
+            outcomes[p['id']] = 'skipped'
+    
+    try:
+        processed_store.record(outcomes, now=current_time)
+    except Exception as e:
+        log(f"Could not persist processed projects: {e}")
+    
+    if new_projects == 0:
+        log(f"No new projects found ({already_seen} already seen)")
+    else:
+        log(f"Found {new_projects} new projects: {len(matches)} matched, {skipped_count} skipped")
+    return matches
+
 log("=" * 60)
 log("AUTOBIDDER STARTED — Press Ctrl+C to stop")
 log("=" * 60)
-# Initialize user skills at startup
-get_user_skills()
+# Initialize user skills and the compiled skill matcher at startup
+get_skill_matcher()
+# Reload dedupe state so a restart doesn't re-process the last cycles
+recent_processed, total_bids = processed_store.load(seen)
+log(f"Loaded dedupe state: {recent_processed} recently processed projects, {total_bids} past bids")
+if globals().get('PROMPT_SELECTION_MODE') == 'bandit':
+    refresh_prompt_bandit()
+    log(f"Bandit prompt selection ({prompt_bandit.strategy}) over {len(prompt_bandit.arms)} prompts")
 log("")
 
-# Rate limiting state
-rate_limit_backoff = 0  # Current backoff multiplier
-consecutive_rate_limits = 0  # Count of consecutive rate limits
-MAX_BACKOFF_MULTIPLIER = 20  # Maximum backoff: 20 * POLL_INTERVAL
-BACKOFF_RESET_THRESHOLD = 3  # Reset backoff after this many successful requests
+pipeline = BidPipeline(
+    fetch=fetch_cycle,
+    screen=screen_projects,
+    stages=[
+        Stage('select', select_stage, workers=PIPELINE_SELECT_WORKERS,
+              batch=batch_select_stage, batch_size=max(1, PROMPT_BATCH_SIZE)),
+        Stage('generate', generate_stage, workers=PIPELINE_GENERATE_WORKERS),
+        Stage('place', place_stage, workers=PIPELINE_PLACE_WORKERS),
+        # The bid is already placed by now, so it is always recorded
+        Stage('persist', persist_stage, workers=PIPELINE_PERSIST_WORKERS, check_deadline=False),
+    ],
+    poll_interval=POLL_INTERVAL,
+    queue_size=PIPELINE_QUEUE_SIZE,
+    priority=score_project,
+    deadline=project_deadline,
+)
+log(f"Pipeline: queue size {PIPELINE_QUEUE_SIZE}, workers select={PIPELINE_SELECT_WORKERS} generate={PIPELINE_GENERATE_WORKERS} place={PIPELINE_PLACE_WORKERS} persist={PIPELINE_PERSIST_WORKERS}, deadline {BID_DEADLINE_MINUTES} min after posting")
 
 try:
-    while True:
-        current_time = time.time()
-        # Clean up expired entries
-        expired = [pid for pid, ts in seen.items() if current_time - ts > SEEN_EXPIRY_SECONDS]
-        for pid in expired:
-            del seen[pid]
-        if expired:
-            log(f"Expired {len(expired)} old project entries (re-checking them now)")
-        
-        log(f"Scanning for new projects... (tracking: {len(seen)})")
-        matching_count = 0
-        skipped_count = 0
-        new_projects = 0
-        already_seen = 0
-        
-        projects, is_rate_limited = get_projects()
-        
-        # Handle rate limiting with exponential backoff
-        if is_rate_limited:
-            consecutive_rate_limits += 1
-            # Exponential backoff: 2^consecutive_rate_limits, capped at MAX_BACKOFF_MULTIPLIER
-            rate_limit_backoff = min(2 ** consecutive_rate_limits, MAX_BACKOFF_MULTIPLIER)
-            sleep_time = POLL_INTERVAL * rate_limit_backoff
-            log(f"⚠️  Rate limited! Backing off: {sleep_time} seconds (backoff multiplier: {rate_limit_backoff}x)")
-        else:
-            # Successful request - reset backoff if we had consecutive failures
-            if consecutive_rate_limits > 0:
-                consecutive_rate_limits = max(0, consecutive_rate_limits - BACKOFF_RESET_THRESHOLD)
-                if consecutive_rate_limits == 0:
-                    rate_limit_backoff = 0
-                    log("✅ Rate limit cleared, returning to normal polling")
-        
-        # Process projects only if we got them (not rate limited)
-        if projects:
-            for p in projects:
-                pid = p['id']
-                if pid not in seen:
-                    new_projects += 1
-                    if good_project(p):
-                        matching_count += 1
-                        log(f"✓ MATCHING PROJECT: {pid} - {p['title'][:50]}")
-                        # Run bid in background thread to not block scanning
-                        threading.Thread(target=bid, args=(p,), daemon=True).start()
-                    else:
-                        skipped_count += 1
-                    seen[pid] = current_time
-                else:
-                    already_seen += 1
-                    
-                # Limit seen dict size to prevent memory issues
-                if len(seen) > MAX_SEEN_SIZE:
-                    # Remove oldest 20% of entries
-                    sorted_seen = sorted(seen.items(), key=lambda x: x[1])
-                    to_remove = sorted_seen[:int(MAX_SEEN_SIZE * 0.2)]
-                    for pid, _ in to_remove:
-                        del seen[pid]
-                    log(f"Trimmed seen set to {len(seen)} projects (removed {len(to_remove)} oldest)")
-            
-            if new_projects == 0:
-                log(f"No new projects found ({already_seen} already seen)")
-            elif matching_count > 0:
-                log(f"Found {new_projects} new projects: {matching_count} matched, {skipped_count} skipped")
-            elif skipped_count > 0:
-                log(f"Found {new_projects} new projects: {matching_count} matched, {skipped_count} skipped")
-        
-        # Calculate sleep time based on rate limiting
-        if is_rate_limited:
-            sleep_time = POLL_INTERVAL * rate_limit_backoff
-        else:
-            sleep_time = POLL_INTERVAL
-        
-        log(f"Sleeping for {sleep_time} seconds...")
-        time.sleep(sleep_time)
+    asyncio.run(pipeline.run())
 except KeyboardInterrupt:
     log("=" * 60)
     log("AUTOBIDDER STOPPED by user")
     log("=" * 60)
 except Exception as e:
     log(f"FATAL ERROR: {e}")
-    raise
\ No newline at end of file
+    raise
+finally:
+    # Commit whatever the writer thread still has queued
+    bid_store.close()
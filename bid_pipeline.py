@@ -0,0 +1,380 @@
+#!/usr/bin/env python3
+"""
+Asyncio bid pipeline for the autobidder
+
+Stages run as independent worker pools connected by bounded queues:
+fetch -> filter -> prompt selection -> message generation -> place bid -> persist/notify
+Blocking work (Freelancer API, Gemini, SQLite) runs on a fixed-size thread pool,
+so a burst of matching projects queues up instead of spawning a thread per bid.
+
+Stage queues are priority queues: each match is scored once (budget, competition,
+freshness, skill match) and workers always take the most valuable item next. When
+the first queue is full, the lowest-scored item is dropped rather than blocking.
+
+Items can carry a deadline (wall-clock time after which a bid is no longer worth
+placing). It is checked before every stage that opts in, so work that is already
+too late is dropped and counted instead of spending LLM or API capacity.
+
+A stage can also take a batch function: a worker then pulls up to batch_size
+queued items at once and runs it over the ones still in time (e.g. one LLM call
+choosing prompts for all of them) before running the per-item function on each.
+The batch call runs inside that worker, so it counts against the stage's workers.
+"""
+import asyncio
+import heapq
+import itertools
+import time
+import logging
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+
+class StageStats:
+    """Rolling latency and throughput counters for one pipeline stage"""
+
+    def __init__(self, name, window=200):
+        self.name = name
+        self.processed = 0
+        self.dropped = 0
+        self.stale = 0
+        self.errors = 0
+        self.batches = 0
+        self.in_flight = 0
+        self.total_seconds = 0.0
+        self._latencies = deque(maxlen=window)
+
+    def record(self, seconds):
+        self.processed += 1
+        self.total_seconds += seconds
+        self._latencies.append(seconds)
+
+    def percentile(self, pct):
+        """Latency percentile (0-100) over the recent window, in seconds"""
+        if not self._latencies:
+            return 0.0
+        ordered = sorted(self._latencies)
+        index = min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))
+        return ordered[index]
+
+    def snapshot(self):
+        avg = self.total_seconds / self.processed if self.processed else 0.0
+        return {
+            'processed': self.processed,
+            'dropped': self.dropped,
+            'stale': self.stale,
+            'errors': self.errors,
+            'batches': self.batches,
+            'in_flight': self.in_flight,
+            'avg_seconds': round(avg, 3),
+            'p50_seconds': round(self.percentile(50), 3),
+            'p95_seconds': round(self.percentile(95), 3),
+            'p99_seconds': round(self.percentile(99), 3),
+        }
+
+
+class BidItem:
+    """A matched project travelling through the pipeline, plus what each stage produced"""
+
+    def __init__(self, project, priority=0.0, deadline=None):
+        self.project = project
+        self.priority = priority
+        self.deadline = deadline  # time.time() value, or None for no deadline
+        self.started = time.monotonic()
+        self.timings = {}  # stage name -> seconds spent inside that stage
+        self.template = None
+        self.prompt_id = None
+        self.message = None
+        self.amount = None
+
+    @property
+    def pid(self):
+        return self.project.get('id')
+
+    def elapsed(self):
+        """Seconds since the project was fetched (includes time spent queued)"""
+        return time.monotonic() - self.started
+
+    def overdue(self, now=None):
+        """Seconds past the deadline (0 or less while still in time)"""
+        if self.deadline is None:
+            return 0.0
+        return (now or time.time()) - self.deadline
+
+    def timing_summary(self):
+        return ", ".join(f"{name} {seconds:.1f}s" for name, seconds in self.timings.items())
+
+
+class PriorityBidQueue(asyncio.PriorityQueue):
+    """Bounded queue of BidItems, highest priority first (FIFO among equal priorities)
+
+    put() waits for room like any bounded queue; offer() never waits and instead
+    drops whichever item has the lowest priority when the queue is full.
+    """
+
+    def __init__(self, maxsize):
+        super().__init__(maxsize=maxsize)
+        self._sequence = itertools.count()
+        self.dropped = 0
+
+    def _entry(self, item):
+        return (-item.priority, next(self._sequence), item)
+
+    async def put(self, item):
+        await super().put(self._entry(item))
+
+    async def get(self):
+        entry = await super().get()
+        return entry[2]
+
+    def take_nowait(self):
+        """Next item without waiting (get_nowait() itself is left to asyncio's get())"""
+        return self.get_nowait()[2]
+
+    def offer(self, item):
+        """Add without waiting. Returns the item that was dropped, or None"""
+        entry = self._entry(item)
+        if self.full():
+            worst = max(self._queue)
+            if entry > worst:
+                self.dropped += 1
+                return item
+            self._queue.remove(worst)
+            heapq.heapify(self._queue)
+            self.task_done()
+            self.dropped += 1
+            super().put_nowait(entry)
+            return worst[2]
+        super().put_nowait(entry)
+        return None
+
+    def peek_priority(self):
+        return -self._queue[0][0] if self._queue else None
+
+
+class Stage:
+    """One pipeline stage: a blocking function of a BidItem and how many workers run it.
+
+    The function returns a truthy value to pass the item downstream, or a falsy one
+    to drop it (e.g. generation failed). Exceptions are logged and also drop the item.
+    With check_deadline, items past their deadline are dropped before the stage runs.
+    batch, if given, is a blocking function of a list of BidItems run once over up to
+    batch_size queued items before func runs on each; its failures are logged and the
+    items carry on through func alone.
+    """
+
+    def __init__(self, name, func, workers=1, check_deadline=True, batch=None, batch_size=1):
+        self.name = name
+        self.func = func
+        self.workers = max(1, int(workers))
+        self.check_deadline = check_deadline
+        self.batch = batch
+        self.batch_size = max(1, int(batch_size))
+        self.stats = StageStats(name)
+
+
+class BidPipeline:
+    """Fetch/filter loop feeding a chain of bounded, independently sized stages"""
+
+    def __init__(self, fetch, screen, stages, poll_interval=30, queue_size=20,
+                 max_backoff_multiplier=20, backoff_reset_threshold=3, priority=None, deadline=None):
+        """
+        fetch: () -> (projects, is_rate_limited), called once per poll cycle
+        screen: (projects) -> list of matching projects for this cycle
+        stages: ordered list of Stage objects run on every match
+        priority: (project) -> float, higher is bid on first (default: arrival order)
+        deadline: (project) -> time.time() value or None, after which the item is stale
+        """
+        self.fetch = fetch
+        self.screen = screen
+        self.priority = priority
+        self.deadline = deadline
+        self.stages = list(stages)
+        self.poll_interval = poll_interval
+        self.queue_size = max(1, int(queue_size))
+        self.max_backoff_multiplier = max_backoff_multiplier
+        self.backoff_reset_threshold = backoff_reset_threshold
+        self.fetch_stats = StageStats('fetch')
+        self.filter_stats = StageStats('filter')
+        self.time_to_bid = StageStats('time_to_bid')
+        self._queues = []
+        # Fetch and filter each get one thread, every stage worker gets one
+        self._executor = ThreadPoolExecutor(
+            max_workers=2 + sum(stage.workers for stage in self.stages),
+            thread_name_prefix='bidder'
+        )
+
+    async def _call(self, func, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, func, *args)
+
+    async def _fetch_loop(self, out_queue):
+        consecutive_rate_limits = 0
+        rate_limit_backoff = 0
+        while True:
+            start = time.monotonic()
+            try:
+                projects, is_rate_limited = await self._call(self.fetch)
+            except Exception as e:
+                self.fetch_stats.errors += 1
+                logger.info(f"Fetch stage error: {e}")
+                projects, is_rate_limited = [], False
+            self.fetch_stats.record(time.monotonic() - start)
+
+            # Handle rate limiting with exponential backoff
+            if is_rate_limited:
+                consecutive_rate_limits += 1
+                rate_limit_backoff = min(2 ** consecutive_rate_limits, self.max_backoff_multiplier)
+                sleep_time = self.poll_interval * rate_limit_backoff
+                logger.info(f"⚠️  Rate limited! Backing off: {sleep_time} seconds (backoff multiplier: {rate_limit_backoff}x)")
+            else:
+                sleep_time = self.poll_interval
+                if consecutive_rate_limits > 0:
+                    consecutive_rate_limits = max(0, consecutive_rate_limits - self.backoff_reset_threshold)
+                    if consecutive_rate_limits == 0:
+                        rate_limit_backoff = 0
+                        logger.info("✅ Rate limit cleared, returning to normal polling")
+
+            if projects:
+                # Blocks when the filter stage is still busy with the previous cycle
+                await out_queue.put(projects)
+
+            self.log_stats()
+            logger.info(f"Sleeping for {sleep_time} seconds...")
+            await asyncio.sleep(sleep_time)
+
+    async def _filter_loop(self, in_queue, out_queue):
+        while True:
+            projects = await in_queue.get()
+            start = time.monotonic()
+            self.filter_stats.in_flight += 1
+            try:
+                matches = await self._call(self.screen, projects)
+            except Exception as e:
+                self.filter_stats.errors += 1
+                logger.info(f"Filter stage error: {e}")
+                matches = []
+            finally:
+                self.filter_stats.in_flight -= 1
+                self.filter_stats.record(time.monotonic() - start)
+                in_queue.task_done()
+            for project in matches:
+                try:
+                    score = self.priority(project) if self.priority else 0.0
+                except Exception as e:
+                    logger.info(f"Priority scoring failed for project {project.get('id')}: {e}")
+                    score = 0.0
+                try:
+                    deadline = self.deadline(project) if self.deadline else None
+                except Exception as e:
+                    logger.info(f"Deadline calculation failed for project {project.get('id')}: {e}")
+                    deadline = None
+                # Full queue: the least valuable of (queued items + this one) is dropped
+                dropped = out_queue.offer(BidItem(project, score, deadline))
+                if dropped is not None:
+                    logger.info(f"Bid queue full ({out_queue.maxsize}): dropped project {dropped.pid} (priority {dropped.priority:.2f})")
+
+    async def _run_stage(self, stage, item):
+        if stage.check_deadline:
+            overdue = item.overdue()
+            if overdue > 0:
+                stage.stats.stale += 1
+                logger.info(f"Project {item.pid} dropped before '{stage.name}': {overdue:.0f}s past its deadline")
+                return False
+        stage.stats.in_flight += 1
+        start = time.monotonic()
+        try:
+            ok = await self._call(stage.func, item)
+        except Exception as e:
+            stage.stats.errors += 1
+            logger.info(f"Stage '{stage.name}' failed for project {item.pid}: {e}")
+            ok = False
+        finally:
+            stage.stats.in_flight -= 1
+            elapsed = time.monotonic() - start
+            item.timings[stage.name] = elapsed
+            stage.stats.record(elapsed)
+        if not ok:
+            stage.stats.dropped += 1
+        return ok
+
+    async def _run_batch(self, stage, items):
+        if stage.check_deadline:
+            items = [item for item in items if item.overdue() <= 0]  # stale ones are counted by _run_stage
+        if len(items) < 2:
+            return
+        stage.stats.batches += 1
+        try:
+            await self._call(stage.batch, items)
+        except Exception as e:
+            logger.info(f"Stage '{stage.name}' batch of {len(items)} failed: {e}")
+
+    async def _stage_worker(self, stage, in_queue, out_queue):
+        while True:
+            items = [await in_queue.get()]
+            while stage.batch and len(items) < stage.batch_size and not in_queue.empty():
+                items.append(in_queue.take_nowait())
+            try:
+                if stage.batch:
+                    await self._run_batch(stage, items)
+                for item in items:
+                    if await self._run_stage(stage, item):
+                        if out_queue is not None:
+                            await out_queue.put(item)
+                        else:
+                            self.time_to_bid.record(item.elapsed())
+            finally:
+                for _ in items:
+                    in_queue.task_done()
+
+    async def run(self):
+        """Run the pipeline until cancelled"""
+        cycle_queue = asyncio.Queue(maxsize=1)
+        self._queues = [PriorityBidQueue(maxsize=self.queue_size) for _ in self.stages]
+        tasks = [
+            asyncio.create_task(self._fetch_loop(cycle_queue)),
+            asyncio.create_task(self._filter_loop(cycle_queue, self._queues[0])),
+        ]
+        for index, stage in enumerate(self.stages):
+            in_queue = self._queues[index]
+            out_queue = self._queues[index + 1] if index + 1 < len(self.stages) else None
+            for _ in range(stage.workers):
+                tasks.append(asyncio.create_task(self._stage_worker(stage, in_queue, out_queue)))
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+            self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self):
+        """Per-stage counters, queue depths and end-to-end time-to-bid"""
+        stages = {
+            'fetch': self.fetch_stats.snapshot(),
+            'filter': self.filter_stats.snapshot(),
+        }
+        for index, stage in enumerate(self.stages):
+            snapshot = stage.stats.snapshot()
+            snapshot['workers'] = stage.workers
+            queue = self._queues[index] if self._queues else None
+            snapshot['queued'] = queue.qsize() if queue else 0
+            snapshot['queue_size'] = self.queue_size
+            snapshot['queue_dropped'] = queue.dropped if queue else 0
+            snapshot['next_priority'] = queue.peek_priority() if queue else None
+            stages[stage.name] = snapshot
+        return {'stages': stages, 'time_to_bid': self.time_to_bid.snapshot()}
+
+    def log_stats(self):
+        """Log a one-line summary of stage activity (only once something has matched)"""
+        if not any(stage.stats.processed or stage.stats.in_flight for stage in self.stages):
+            return
+        stats = self.stats()
+        parts = []
+        for stage in self.stages:
+            s = stats['stages'][stage.name]
+            parts.append(f"{stage.name} q={s['queued']}/{self.queue_size} busy={s['in_flight']}/{stage.workers} avg={s['avg_seconds']:.1f}s")
+        ttb = stats['time_to_bid']
+        dropped = stats['stages'][self.stages[0].name]['queue_dropped']
+        stale = sum(stats['stages'][stage.name]['stale'] for stage in self.stages)
+        logger.info(f"Pipeline: {' | '.join(parts)} | dropped={dropped} stale={stale} | time-to-bid p50={ttb['p50_seconds']:.1f}s p95={ttb['p95_seconds']:.1f}s p99={ttb['p99_seconds']:.1f}s")
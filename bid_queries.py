@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+SQL behind the dashboard's bids, stats and prompt analytics endpoints
+
+The statements live here rather than inline in api_server so test_query_plans.py
+can run EXPLAIN QUERY PLAN on exactly what the endpoints execute. Each one is
+served by an index from migration 5 (see migrations.py) - bids pages seek into an
+index ordered by (applied_at, project_id), the counters and totals read covering
+indexes and the per-prompt aggregates search idx_bids_prompt_hash - so none of
+them scans the bids table itself as it grows. Change a query here and the plan
+test tells you whether it still hits its index.
+"""
+import json
+import base64
+
+# Fields a bids page can return (get_bids ?fields=), in response order. The message
+# text itself is only served by the per-bid detail query
+BID_FIELDS = {
+    'project_id': 'b.project_id',
+    'title': 'b.title',
+    'bid_amount': 'b.bid_amount',
+    'status': 'b.status',
+    'outsource_cost': 'b.outsource_cost',
+    'profit': 'b.profit',
+    'applied_at': 'b.applied_at',
+    'reply_count': 'COALESCE(b.reply_count, 0)',
+    'currency_code': "NULLIF(b.currency_code, '')",
+    'prompt_id': 'b.prompt_id',
+    'prompt_name': 'p.name',
+    'has_message': "(b.bid_message IS NOT NULL AND b.bid_message != '')",
+}
+
+# One bid with its full message (get_bid)
+BID_DETAIL = """
+    SELECT b.project_id, b.title, b.bid_amount, b.status, b.outsource_cost, b.profit,
+           b.applied_at, b.bid_message, COALESCE(b.reply_count, 0), NULLIF(b.currency_code, ''), b.prompt_id, p.name
+    FROM bids b LEFT JOIN prompts p ON b.prompt_id = p.id
+    WHERE b.project_id = ?
+"""
+
+
+def bids_page(fields, limit, after=None, status=None, prompt_id=None, currency=None, since=None, until=None):
+    """SQL and params for one newest-first page of bids (get_bids)
+
+    Keyset pagination on (applied_at, project_id): `after` is the last row of the
+    previous page, so every page is an index seek instead of an OFFSET over the
+    history. Each row starts with applied_at and project_id (the next cursor),
+    followed by `fields`. Bids without an applied_at sort last; after=(None, id)
+    continues through them.
+    """
+    where, params = [], []
+    if after is not None:
+        applied_at, project_id = after
+        if applied_at is None:
+            where.append("b.applied_at IS NULL AND b.project_id < ?")
+            params.append(project_id)
+        else:
+            where.append("(b.applied_at, b.project_id) < (?, ?)")
+            params += [applied_at, project_id]
+    if status is not None:
+        where.append("b.status = ?")
+        params.append(status)
+    if prompt_id is not None:
+        where.append("b.prompt_id = ?")
+        params.append(prompt_id)
+    if currency is not None:
+        where.append("COALESCE(b.currency_code, 'USD') = ?")  # unset means USD; matches idx_bids_currency
+        params.append(currency)
+    if since is not None:
+        where.append("b.applied_at >= ?")
+        params.append(since)
+    if until is not None:
+        where.append("b.applied_at < ?")
+        params.append(until)
+    sql = "SELECT b.applied_at, b.project_id" + "".join(f", {BID_FIELDS[field]}" for field in fields) + " FROM bids b"
+    if 'prompt_name' in fields:
+        sql += " LEFT JOIN prompts p ON b.prompt_id = p.id"
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    sql += " ORDER BY b.applied_at DESC, b.project_id DESC LIMIT ?"
+    return sql, params + [limit]
+
+
+def fetch_bids_page(conn, fields, limit, after=None, **filters):
+    """Run bids_page(). Returns (rows, next cursor or None), rows without the cursor columns
+
+    The row-value seek skips bids with no applied_at, so a page that runs past the
+    dated bids is topped up from the undated tail (date filters exclude it anyway).
+    """
+    rows = conn.execute(*bids_page(fields, limit + 1, after, **filters)).fetchall()
+    if len(rows) <= limit and after is not None and after[0] is not None \
+            and filters.get('since') is None and filters.get('until') is None:
+        tail = bids_page(fields, limit + 1 - len(rows), (None, float('inf')), **filters)
+        rows += conn.execute(*tail).fetchall()
+    next_after = rows[limit - 1][:2] if len(rows) > limit else None
+    return [row[2:] for row in rows[:limit]], next_after
+
+
+def encode_cursor(after):
+    """Opaque ?cursor= token for an (applied_at, project_id) position"""
+    return base64.urlsafe_b64encode(json.dumps(list(after)).encode()).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    """Inverse of encode_cursor(); ValueError if the token wasn't made by it"""
+    try:
+        applied_at, project_id = json.loads(base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)))
+    except (ValueError, TypeError) as e:
+        raise ValueError(f"Invalid cursor: {token!r}") from e
+    if not (applied_at is None or isinstance(applied_at, str)) or not isinstance(project_id, int):
+        raise ValueError(f"Invalid cursor: {token!r}")
+    return applied_at, project_id
+
+
+# Dashboard counters (compute_stats)
+COUNT_BIDS = "SELECT COUNT(*) FROM bids"
+COUNT_BIDS_WITH_STATUS = "SELECT COUNT(*) FROM bids WHERE status = ?"
+COUNT_BIDS_WITH_REPLIES = "SELECT COUNT(*) FROM bids WHERE reply_count > 0"
+
+# Bid value and profit summed per currency; converted to USD per currency, not per row
+TOTALS_BY_CURRENCY = """
+    SELECT COALESCE(currency_code, 'USD'), SUM(bid_amount), SUM(profit)
+    FROM bids
+    GROUP BY currency_code
+"""
+
+# Bid usage per hash joined to the stored prompt hashes, plus prompts that have no bids yet
+PROMPT_ANALYTICS = """
+    WITH usage AS (
+        SELECT
+            prompt_hash,
+            COUNT(*) as total_bids,
+            SUM(CASE WHEN reply_count > 0 THEN 1 ELSE 0 END) as total_replies,
+            SUM(CASE WHEN status = 'won' THEN 1 ELSE 0 END) as total_won,
+            ROUND(AVG(CASE WHEN reply_count > 0 THEN 1.0 ELSE 0.0 END) * 100, 2) as reply_rate,
+            MIN(applied_at) as first_used,
+            MAX(applied_at) as last_used
+        FROM bids
+        WHERE prompt_hash IS NOT NULL
+        GROUP BY prompt_hash
+    )
+    SELECT u.prompt_hash,
+           COALESCE(pm.name, (SELECT p.name FROM prompts p WHERE p.prompt_hash = u.prompt_hash ORDER BY p.id DESC LIMIT 1)),
+           u.total_bids, u.total_replies, u.total_won, u.reply_rate, u.first_used, u.last_used
+    FROM usage u
+    LEFT JOIN prompt_metadata pm ON pm.prompt_hash = u.prompt_hash
+    UNION ALL
+    SELECT p.prompt_hash, MAX(p.name), 0, 0, 0, 0.0, MAX(p.created_at), NULL
+    FROM prompts p
+    WHERE p.prompt_hash IS NOT NULL
+      AND NOT EXISTS (SELECT 1 FROM bids b WHERE b.prompt_hash = p.prompt_hash)
+    GROUP BY p.prompt_hash
+"""
@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+"""
+Bidder-side SQLite storage: one long-lived WAL connection behind a writer thread
+
+Opening bids.db for every helper call and serializing everything behind one lock
+meant a bid paid two connect/commit cycles, and with the default rollback journal
+the API server's dashboard reads blocked the bidder's writes. BidStore instead:
+
+- puts the database in WAL mode (persistent in the file, so the API server's
+  readers get snapshot reads that never block the writer, and vice versa)
+- owns a single writer connection used only by its writer thread. Callers enqueue
+  write units (one or more statements that belong together) and get a Future back.
+  The thread drains whatever is queued and commits it as one transaction - group
+  commit - so a burst of bid inserts, prompt stats increments and dedupe records
+  costs one fsync instead of one per statement.
+- keeps one reader connection (behind its own lock) for the bidder's few reads
+
+Each unit runs inside a SAVEPOINT, so a failing statement only fails its own unit.
+"""
+import time
+import queue
+import sqlite3
+import logging
+import threading
+from concurrent.futures import Future
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+class BidStore:
+    """WAL-mode bids.db with a group-committing writer thread and a shared reader"""
+
+    def __init__(self, path, max_batch=256, linger=0.01, timeout=10.0):
+        self.path = path
+        self.max_batch = max_batch
+        self.linger = linger  # how long the writer waits for more units before committing
+        self.timeout = timeout
+        self._queue = queue.Queue()
+        self._queue_lock = threading.Lock()  # orders puts against close()'s stop marker
+        self._closing = False
+        self._read_lock = threading.Lock()
+        self._reader_conn = None
+        self._writer = None
+        self._stats_lock = threading.Lock()
+        self.units = 0
+        self.statements = 0
+        self.commits = 0
+        self.errors = 0
+        self.max_batch_seen = 0
+        self.commit_seconds = 0.0
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=self.timeout, check_same_thread=False, isolation_level=None)
+        conn.execute("PRAGMA synchronous=NORMAL")  # durable across app crashes in WAL mode, one fsync per checkpoint
+        return conn
+
+    def start(self):
+        """Switch the database to WAL and start the writer thread"""
+        if self._writer is not None:
+            return self
+        conn = self._connect()
+        mode = conn.execute("PRAGMA journal_mode=WAL").fetchone()[0]
+        if mode.lower() != 'wal':
+            logger.warning(f"{self.path}: journal mode is {mode}, not WAL; readers may block writes")
+        self._closing = False
+        self._writer = threading.Thread(target=self._run, args=(conn,), name='bid-store-writer', daemon=True)
+        self._writer.start()
+        return self
+
+    # --- writes ---
+
+    def _enqueue(self, statements):
+        future = Future()
+        with self._queue_lock:
+            if self._closing:
+                future.set_exception(RuntimeError("BidStore is closed"))
+            elif self._writer is None:
+                future.set_exception(RuntimeError("BidStore is not started"))
+            else:
+                self._queue.put((statements, future))
+        return future
+
+    def write(self, sql, params=()):
+        """Queue one statement. Returns a Future resolved once it is committed"""
+        return self._enqueue([(sql, params, False)])
+
+    def write_many(self, sql, rows):
+        """Queue an executemany"""
+        return self._enqueue([(sql, list(rows), True)])
+
+    def write_all(self, statements):
+        """Queue [(sql, params), ...] as one unit: committed together or not at all"""
+        return self._enqueue([(sql, params, False) for sql, params in statements])
+
+    def flush(self, timeout=None):
+        """Block until everything queued so far is committed"""
+        self._enqueue([]).result(timeout)
+
+    def _run(self, conn):
+        stopping = False
+        while not stopping:
+            unit = self._queue.get()
+            if unit is _STOP:
+                break
+            batch = [unit]
+            deadline = time.monotonic() + self.linger
+            while len(batch) < self.max_batch:
+                try:
+                    unit = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if unit is _STOP:
+                    stopping = True
+                    break
+                batch.append(unit)
+            self._commit(conn, batch)
+        conn.close()
+        # close() stops new writes before queueing _STOP, so this only catches units
+        # stranded if the loop ever exits another way; never leave a Future hanging
+        while True:
+            try:
+                unit = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if unit is not _STOP:
+                unit[1].set_exception(RuntimeError("BidStore is closed"))
+
+    def _commit(self, conn, batch):
+        start = time.monotonic()
+        results = []
+        statements = 0
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            for statements_in_unit, future in batch:
+                conn.execute("SAVEPOINT unit")
+                try:
+                    for sql, params, many in statements_in_unit:
+                        if many:
+                            conn.executemany(sql, params)
+                        else:
+                            conn.execute(sql, params)
+                    conn.execute("RELEASE unit")
+                    results.append((future, None))
+                    statements += len(statements_in_unit)
+                except Exception as e:
+                    conn.execute("ROLLBACK TO unit")
+                    conn.execute("RELEASE unit")
+                    results.append((future, e))
+            conn.execute("COMMIT")
+        except sqlite3.Error as e:
+            # The transaction itself failed (e.g. still locked after the timeout): nothing was written
+            logger.error(f"Bid store commit of {len(batch)} writes failed: {e}")
+            try:
+                conn.execute("ROLLBACK")
+            except sqlite3.Error:
+                pass
+            results = [(future, e) for _, future in batch]
+            statements = 0
+        elapsed = time.monotonic() - start
+        failed = sum(1 for _, error in results if error is not None)
+        with self._stats_lock:
+            self.units += len(batch)
+            self.statements += statements
+            self.commits += 1
+            self.errors += failed
+            self.max_batch_seen = max(self.max_batch_seen, len(batch))
+            self.commit_seconds += elapsed
+        for future, error in results:
+            if error is None:
+                future.set_result(None)
+            else:
+                future.set_exception(error)
+
+    # --- reads ---
+
+    @contextmanager
+    def reading(self):
+        """The shared reader connection, held exclusively for the block"""
+        with self._read_lock:
+            if self._reader_conn is None:
+                self._reader_conn = self._connect()
+            yield self._reader_conn
+
+    def read(self, sql, params=()):
+        with self.reading() as conn:
+            return conn.execute(sql, params).fetchall()
+
+    # --- lifecycle ---
+
+    def close(self, timeout=10.0):
+        """Commit what is queued, stop the writer and close the connections
+
+        Writes queued after close() starts fail with RuntimeError instead of waiting forever.
+        """
+        if self._writer is not None:
+            with self._queue_lock:
+                self._closing = True
+                self._queue.put(_STOP)
+            self._writer.join(timeout)
+            self._writer = None
+        with self._read_lock:
+            if self._reader_conn is not None:
+                self._reader_conn.close()
+                self._reader_conn = None
+
+    def stats(self):
+        with self._stats_lock:
+            commits = self.commits
+            return {
+                'units': self.units,
+                'statements': self.statements,
+                'commits': commits,
+                'errors': self.errors,
+                'queued': self._queue.qsize(),
+                'avg_batch': round(self.units / commits, 2) if commits else 0.0,
+                'max_batch': self.max_batch_seen,
+                'avg_commit_ms': round(self.commit_seconds / commits * 1000, 2) if commits else 0.0,
+            }
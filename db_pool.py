@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Read-only SQLite connection pool for the API server
+
+Every dashboard handler used to open bids.db from scratch (and get_bids() even took
+the write lock with BEGIN IMMEDIATE for a plain SELECT). ReadPool keeps a few
+long-lived read-only connections instead:
+
+- opened with a mode=ro URI and PRAGMA query_only, so a handler can't take the
+  write lock by accident; with the database in WAL mode (the bidder's BidStore sets
+  it) reads run against a snapshot and never wait for, or block, the bidder's writer
+- reused across requests, so the connect cost is paid once and each connection's
+  prepared statement cache (cached_statements) keeps the dashboard queries compiled
+- checked out once per request (see api_server.read_db) and returned on teardown
+- snapshot() wraps several queries in one read transaction so they all see the
+  same committed state
+
+stats() reports checkouts, how many had to wait for a free connection and for how long.
+"""
+import time
+import queue
+import sqlite3
+import pathlib
+import threading
+from contextlib import contextmanager
+
+
+class PoolTimeout(Exception):
+    """No pooled connection became free in time"""
+
+
+class ReadPool:
+    """Up to `size` read-only connections to one database file"""
+
+    def __init__(self, path, size=4, timeout=5.0, cached_statements=64, busy_timeout=10.0):
+        self.uri = pathlib.Path(path).resolve().as_uri() + '?mode=ro'
+        self.size = size
+        self.timeout = timeout
+        self.cached_statements = cached_statements
+        self.busy_timeout = busy_timeout
+        self._idle = queue.LifoQueue()  # most recently used first: its pages are warm
+        self._lock = threading.Lock()
+        self._created = 0
+        self._in_use = 0
+        self.checkouts = 0
+        self.waits = 0
+        self.timeouts = 0
+        self.wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+
+    def _connect(self):
+        conn = sqlite3.connect(self.uri, uri=True, check_same_thread=False, isolation_level=None,
+                               timeout=self.busy_timeout, cached_statements=self.cached_statements)
+        conn.execute("PRAGMA query_only = 1")
+        return conn
+
+    def acquire(self, timeout=None):
+        """Check out a connection, waiting up to `timeout` seconds when all are in use"""
+        start = time.monotonic()
+        waited = False
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            conn = None
+            with self._lock:
+                create = self._created < self.size
+                if create:
+                    self._created += 1
+            if create:
+                try:
+                    conn = self._connect()
+                except Exception:
+                    with self._lock:
+                        self._created -= 1
+                    raise
+            else:
+                waited = True
+                try:
+                    conn = self._idle.get(timeout=self.timeout if timeout is None else timeout)
+                except queue.Empty:
+                    with self._lock:
+                        self.timeouts += 1
+                    raise PoolTimeout(f"No read connection free after {time.monotonic() - start:.1f}s")
+        elapsed = time.monotonic() - start
+        with self._lock:
+            self.checkouts += 1
+            self._in_use += 1
+            if waited:
+                self.waits += 1
+                self.wait_seconds += elapsed
+                self.max_wait_seconds = max(self.max_wait_seconds, elapsed)
+        return conn
+
+    def release(self, conn):
+        """Return a connection; an open read transaction is ended first"""
+        if conn.in_transaction:
+            conn.rollback()
+        with self._lock:
+            self._in_use -= 1
+        self._idle.put(conn)
+
+    @contextmanager
+    def connection(self, timeout=None):
+        conn = self.acquire(timeout)
+        try:
+            yield conn
+        finally:
+            self.release(conn)
+
+    def close(self):
+        """Close the idle connections"""
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            conn.close()
+            with self._lock:
+                self._created -= 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                'size': self.size,
+                'open': self._created,
+                'in_use': self._in_use,
+                'idle': self._created - self._in_use,
+                'checkouts': self.checkouts,
+                'waits': self.waits,
+                'timeouts': self.timeouts,
+                'wait_rate': round(self.waits / self.checkouts, 3) if self.checkouts else 0.0,
+                'avg_wait_ms': round(self.wait_seconds / self.waits * 1000, 2) if self.waits else 0.0,
+                'max_wait_ms': round(self.max_wait_seconds * 1000, 2),
+            }
+
+
+@contextmanager
+def snapshot(conn):
+    """Run the block in one read transaction, so every query sees the same WAL snapshot"""
+    conn.execute("BEGIN")
+    try:
+        yield conn
+    finally:
+        if conn.in_transaction:
+            conn.execute("COMMIT")
@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+"""
+Project dedupe for the autobidder
+
+SeenCache replaces the plain {project_id: timestamp} dict. Entries are kept in an
+OrderedDict in time order, so lookups and inserts are O(1), expiry only ever pops
+from the old end (amortized O(1) per entry), and going over capacity evicts the
+oldest entry instead of sorting the whole map. The fetch stage expires it while the
+filter stage adds and looks up, so every operation holds the cache's lock.
+
+ProcessedStore persists what was processed to the processed_projects table in
+bids.db, so a restart reloads the recent window into SeenCache and keeps a compact
+Bloom filter of every project we ever bid on. Restarts then neither re-run the LLM
+for projects from the last cycle nor attempt duplicate bids.
+"""
+import math
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+
+
+class SeenCache:
+    """Time-ordered set of recently processed project ids with a TTL and a capacity"""
+
+    def __init__(self, ttl_seconds=3600, capacity=500):
+        self.ttl_seconds = ttl_seconds
+        self.capacity = max(1, int(capacity))
+        self._entries = OrderedDict()  # project_id -> timestamp, oldest first
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, project_id):
+        return self.seen(project_id)
+
+    def seen(self, project_id, now=None):
+        """True if the project was recorded within the TTL (counts a hit or a miss)"""
+        with self._lock:
+            ts = self._entries.get(project_id)
+            if ts is not None and (now or time.time()) - ts > self.ttl_seconds:
+                del self._entries[project_id]
+                self.expirations += 1
+                ts = None
+            if ts is None:
+                self.misses += 1
+                return False
+            self.hits += 1
+            return True
+
+    def add(self, project_id, ts=None):
+        """Record a project as processed; re-adding moves it to the fresh end"""
+        ts = ts if ts is not None else time.time()
+        with self._lock:
+            if project_id in self._entries:
+                self._entries.move_to_end(project_id)
+            self._entries[project_id] = ts
+            while len(self._entries) > self.capacity:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def discard(self, project_id):
+        """Forget a project so the next cycle screens it again"""
+        with self._lock:
+            self._entries.pop(project_id, None)
+
+    def expire(self, now=None):
+        """Drop entries older than the TTL. Returns how many were dropped"""
+        cutoff = (now or time.time()) - self.ttl_seconds
+        expired = 0
+        with self._lock:
+            entries = self._entries
+            while entries:
+                oldest_id = next(iter(entries))
+                if entries[oldest_id] >= cutoff:
+                    break
+                del entries[oldest_id]
+                expired += 1
+            self.expirations += expired
+        return expired
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'capacity': self.capacity,
+                'ttl_seconds': self.ttl_seconds,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 3) if lookups else 0.0,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+            }
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over integer ids (no false negatives, ~error_rate false positives)"""
+
+    def __init__(self, capacity=10000, error_rate=0.01):
+        capacity = max(1, int(capacity))
+        self.size = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hash_count = max(1, int(round(self.size / capacity * math.log(2))))
+        self._bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+        # Persist workers add while place workers look up; |= on a byte is read-modify-write
+        self._lock = threading.Lock()
+
+    def _positions(self, item):
+        digest = hashlib.blake2b(str(item).encode('utf-8'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hash_count)]
+
+    def add(self, item):
+        positions = self._positions(item)
+        with self._lock:
+            for pos in positions:
+                self._bits[pos >> 3] |= 1 << (pos & 7)
+            self.count += 1
+
+    def __contains__(self, item):
+        positions = self._positions(item)
+        with self._lock:
+            return all(self._bits[pos >> 3] & (1 << (pos & 7)) for pos in positions)
+
+
+class ProcessedStore:
+    """processed_projects table plus the in-memory structures loaded from it at startup
+
+    store: a bid_store.BidStore; reads use its shared reader and writes are queued
+    to its writer thread
+    """
+
+    RECENT_BID_SECONDS = 7 * 24 * 3600  # bid ids kept in the exact set at startup
+    PRUNE_AFTER_SECONDS = 30 * 24 * 3600  # non-bid rows older than this are deleted
+
+    def __init__(self, store):
+        self.store = store
+        self.bid_filter = BloomFilter()
+        self._recent_bids = set()
+        self.db_confirmations = 0
+
+    def load(self, seen_cache, now=None):
+        """Prune old rows, refill seen_cache with the TTL window and build the bid filter.
+
+        Returns (recent_processed, total_bids)
+        """
+        now = now or time.time()
+        self.store.write("DELETE FROM processed_projects WHERE processed_at < ? AND outcome != 'bid'",
+                         (now - self.PRUNE_AFTER_SECONDS,)).result()
+        recent = self.store.read(
+            # 'throttled' projects were never decided, so a restart screens them again
+            "SELECT project_id, processed_at FROM processed_projects WHERE processed_at >= ? AND outcome != 'throttled' "
+            "ORDER BY processed_at",
+            (now - seen_cache.ttl_seconds,))
+        bid_rows = self.store.read("SELECT project_id, processed_at FROM processed_projects WHERE outcome = 'bid' "
+                                   "UNION SELECT project_id, NULL FROM bids")
+        for project_id, processed_at in recent:
+            seen_cache.add(project_id, processed_at)
+        self.bid_filter = BloomFilter(capacity=max(10000, 2 * len(bid_rows)))
+        self._recent_bids = set()
+        for project_id, processed_at in bid_rows:
+            self.bid_filter.add(project_id)
+            if processed_at and processed_at >= now - self.RECENT_BID_SECONDS:
+                self._recent_bids.add(project_id)
+        return len(recent), len(bid_rows)
+
+    def already_bid(self, project_id):
+        """True if we ever bid on this project. Bloom negatives skip the database check entirely."""
+        if project_id in self._recent_bids:
+            return True
+        if project_id not in self.bid_filter:
+            return False
+        # Older bid or a Bloom false positive: settle it with a point lookup
+        self.db_confirmations += 1
+        rows = self.store.read(
+            "SELECT 1 FROM processed_projects WHERE project_id = ? AND outcome = 'bid' "
+            "UNION SELECT 1 FROM bids WHERE project_id = ?", (project_id, project_id))
+        if rows:
+            self._recent_bids.add(project_id)
+        return bool(rows)
+
+    def record(self, outcomes, now=None):
+        """Queue {project_id: outcome} for a cycle, committed with the cycle's other writes ('bid' is never downgraded)"""
+        if not outcomes:
+            return
+        now = now or time.time()
+        self.store.write_many(
+            """INSERT INTO processed_projects (project_id, processed_at, outcome) VALUES (?, ?, ?)
+               ON CONFLICT(project_id) DO UPDATE SET processed_at = excluded.processed_at,
+               outcome = CASE WHEN processed_projects.outcome = 'bid' THEN 'bid' ELSE excluded.outcome END""",
+            [(project_id, now, outcome) for project_id, outcome in outcomes.items()])
+
+    def mark_bid(self, project_id, now=None):
+        """Remember a placed bid in memory and in the table"""
+        self.bid_filter.add(project_id)
+        self._recent_bids.add(project_id)
+        self.record({project_id: 'bid'}, now=now)
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Pooled, keep-alive Freelancer API client shared by the autobidder and the API server
+
+freelancersdk builds a new requests.Session per Session() object, so every call paid
+for a fresh TCP + TLS handshake. get_session() hands out one SDK Session per OAuth
+token whose underlying HTTP session keeps connections alive in a capped pool, applies
+a default per-call timeout, and records latency and connection reuse.
+"""
+import os
+import re
+import time
+import threading
+from collections import deque
+
+import requests
+from requests.adapters import HTTPAdapter
+from freelancersdk.session import Session
+
+FREELANCER_URL = 'https://www.freelancer.com'
+POOL_SIZE = int(os.environ.get('FREELANCER_POOL_SIZE', '10'))
+CONNECT_TIMEOUT = float(os.environ.get('FREELANCER_CONNECT_TIMEOUT', '5'))
+READ_TIMEOUT = float(os.environ.get('FREELANCER_READ_TIMEOUT', '30'))
+
+_sessions = {}
+_sessions_lock = threading.Lock()
+
+
+class ClientStats:
+    """Per-endpoint call counts and latencies for the shared client"""
+
+    def __init__(self, window=200):
+        self._lock = threading.Lock()
+        self._window = window
+        self._endpoints = {}
+
+    @staticmethod
+    def endpoint_key(method, url):
+        """Collapse ids out of the path so /users/123/ and /users/456/ share a bucket"""
+        path = url.split('?', 1)[0].replace(FREELANCER_URL, '')
+        path = re.sub(r'/\d+(?=/|$)', '/{id}', path)
+        return f"{method.upper()} {path}"
+
+    def record(self, method, url, seconds, failed=False):
+        key = self.endpoint_key(method, url)
+        with self._lock:
+            entry = self._endpoints.get(key)
+            if entry is None:
+                entry = {'count': 0, 'errors': 0, 'total': 0.0, 'recent': deque(maxlen=self._window)}
+                self._endpoints[key] = entry
+            entry['count'] += 1
+            entry['total'] += seconds
+            entry['recent'].append(seconds)
+            if failed:
+                entry['errors'] += 1
+
+    def snapshot(self):
+        with self._lock:
+            result = {}
+            for key, entry in self._endpoints.items():
+                recent = sorted(entry['recent'])
+                p95 = recent[min(len(recent) - 1, int(len(recent) * 0.95))] if recent else 0.0
+                result[key] = {
+                    'count': entry['count'],
+                    'errors': entry['errors'],
+                    'avg_ms': round(entry['total'] / entry['count'] * 1000, 1),
+                    'p95_ms': round(p95 * 1000, 1),
+                }
+            return result
+
+
+stats = ClientStats()
+
+
+class PooledHTTPSession(requests.Session):
+    """requests.Session with a capped keep-alive pool and a default timeout on every call"""
+
+    def __init__(self, pool_size=POOL_SIZE, timeout=(CONNECT_TIMEOUT, READ_TIMEOUT)):
+        super().__init__()
+        self.timeout = timeout
+        # pool_block caps open connections: extra callers wait for a free one
+        self.adapter = HTTPAdapter(pool_connections=2, pool_maxsize=pool_size, pool_block=True)
+        self.mount('https://', self.adapter)
+        self.mount('http://', self.adapter)
+
+    def request(self, method, url, *args, **kwargs):
+        kwargs.setdefault('timeout', self.timeout)
+        start = time.monotonic()
+        failed = True
+        try:
+            response = super().request(method, url, *args, **kwargs)
+            failed = response.status_code >= 400
+            return response
+        finally:
+            stats.record(method, url, time.monotonic() - start, failed=failed)
+
+    def connection_stats(self):
+        """New vs reused connections across the pools this session has opened"""
+        new_connections = 0
+        total_requests = 0
+        pools = self.adapter.poolmanager.pools
+        for key in list(pools.keys()):
+            pool = pools.get(key)
+            if pool is None:
+                continue
+            new_connections += pool.num_connections
+            total_requests += pool.num_requests
+        return {
+            'requests': total_requests,
+            'new_connections': new_connections,
+            'reused_connections': max(0, total_requests - new_connections),
+        }
+
+
+def get_session(oauth_token, url=FREELANCER_URL):
+    """Return the process-wide SDK Session for this token, creating it on first use"""
+    key = (oauth_token, url)
+    session = _sessions.get(key)
+    if session is not None:
+        return session
+    with _sessions_lock:
+        session = _sessions.get(key)
+        if session is None:
+            session = Session(oauth_token=oauth_token, url=url)
+            pooled = PooledHTTPSession()
+            pooled.headers.update(session.session.headers)
+            session.session.close()
+            session.session = pooled
+            _sessions[key] = session
+    return session
+
+
+def client_stats():
+    """Connection reuse and per-endpoint latency for every shared session"""
+    connections = {'requests': 0, 'new_connections': 0, 'reused_connections': 0}
+    for session in list(_sessions.values()):
+        for name, value in session.session.connection_stats().items():
+            connections[name] += value
+    reuse_rate = connections['reused_connections'] / connections['requests'] if connections['requests'] else 0.0
+    connections['reuse_rate'] = round(reuse_rate, 3)
+    return {'pool_size': POOL_SIZE, 'connections': connections, 'endpoints': stats.snapshot()}
+
+
+def format_client_stats():
+    """One-line summary for the autobidder log"""
+    data = client_stats()
+    conn = data['connections']
+    slowest = sorted(data['endpoints'].items(), key=lambda kv: kv[1]['avg_ms'], reverse=True)[:3]
+    endpoints = ", ".join(f"{key} avg={value['avg_ms']:.0f}ms p95={value['p95_ms']:.0f}ms" for key, value in slowest)
+    return (f"Freelancer client: {conn['requests']} requests, {conn['new_connections']} new connections, "
+            f"reuse {conn['reuse_rate'] * 100:.0f}%" + (f" | {endpoints}" if endpoints else ""))
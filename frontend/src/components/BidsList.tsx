@@ -1,26 +1,41 @@
 import { useEffect, useState } from 'react'
-import { getBids, syncBids } from '../services/api'
+import { getBid, getBids, syncBids } from '../services/api'
 import type { Bid } from '../services/api'
 import { formatCurrency } from '../utils/currency'
 import '../App.css'
 
+const PAGE_SIZE = 50
+
 function BidsList() {
-  const [bids, setBids] = useState<Bid[]>([])
+  // The newest page is polled; older pages are fetched on demand with the cursor
+  const [firstPage, setFirstPage] = useState<Bid[]>([])
+  const [firstCursor, setFirstCursor] = useState<string | null>(null)
+  const [olderBids, setOlderBids] = useState<Bid[]>([])
+  const [olderCursor, setOlderCursor] = useState<string | null | undefined>(undefined)
+  const [statusFilter, setStatusFilter] = useState('')
   const [loading, setLoading] = useState(true)
+  const [loadingMore, setLoadingMore] = useState(false)
   const [syncing, setSyncing] = useState(false)
   const [syncMessage, setSyncMessage] = useState<string | null>(null)
   const [selectedBid, setSelectedBid] = useState<Bid | null>(null)
 
+  const firstIds = new Set(firstPage.map((bid) => bid.project_id))
+  const bids = [...firstPage, ...olderBids.filter((bid) => !firstIds.has(bid.project_id))]
+  const nextCursor = olderCursor === undefined ? firstCursor : olderCursor
+
   useEffect(() => {
+    setOlderBids([])
+    setOlderCursor(undefined)
     loadBids()
     const interval = setInterval(loadBids, 2000) // Refresh every 2 seconds for real-time updates
     return () => clearInterval(interval)
-  }, [])
+  }, [statusFilter])
 
   const loadBids = async () => {
     try {
-      const data = await getBids()
-      setBids(data)
+      const page = await getBids({ limit: PAGE_SIZE, status: statusFilter || undefined })
+      setFirstPage(page.bids)
+      setFirstCursor(page.next_cursor)
     } catch (error) {
       console.error('Failed to load bids:', error)
     } finally {
@@ -28,6 +43,30 @@ function BidsList() {
     }
   }
 
+  const loadMore = async () => {
+    if (!nextCursor) return
+    setLoadingMore(true)
+    try {
+      const page = await getBids({ limit: PAGE_SIZE, cursor: nextCursor, status: statusFilter || undefined })
+      setOlderBids((previous) => [...previous, ...page.bids])
+      setOlderCursor(page.next_cursor)
+    } catch (error) {
+      console.error('Failed to load more bids:', error)
+    } finally {
+      setLoadingMore(false)
+    }
+  }
+
+  const openMessage = async (bid: Bid) => {
+    setSelectedBid(bid)
+    try {
+      const full = await getBid(bid.project_id)
+      setSelectedBid((current) => (current?.project_id === full.project_id ? full : current))
+    } catch (error) {
+      console.error('Failed to load bid message:', error)
+    }
+  }
+
   const handleSync = async () => {
     setSyncing(true)
     setSyncMessage(null)
@@ -79,7 +118,14 @@ function BidsList() {
     <>
       <div className="card">
         <div style={{ display: 'flex', justifyContent: 'space-between', alignItems: 'center', marginBottom: '1.5rem' }}>
-          <h2 style={{ margin: 0 }}>Bid History ({bids.length})</h2>
+          <h2 style={{ margin: 0 }}>Bid History ({bids.length}{nextCursor ? '+' : ''})</h2>
+          <div className="input-group" style={{ margin: '0 1rem 0 auto' }}>
+            <select value={statusFilter} onChange={(e) => setStatusFilter(e.target.value)}>
+              <option value="">All statuses</option>
+              <option value="applied">Applied</option>
+              <option value="won">Won</option>
+            </select>
+          </div>
           <button
             className="btn btn-primary"
             onClick={handleSync}
@@ -200,10 +246,10 @@ function BidsList() {
                         >
                           🔗 Job
                         </a>
-                        {bid.bid_message && (
+                        {bid.has_message && (
                           <button
                             className="btn btn-primary"
-                            onClick={() => setSelectedBid(bid)}
+                            onClick={() => openMessage(bid)}
                             style={{ padding: '0.5rem 1rem', fontSize: '0.875rem' }}
                           >
                             View
@@ -215,6 +261,13 @@ function BidsList() {
                 ))}
               </tbody>
             </table>
+            {nextCursor && (
+              <div style={{ textAlign: 'center', marginTop: '1rem' }}>
+                <button className="btn" onClick={loadMore} disabled={loadingMore}>
+                  {loadingMore ? 'Loading...' : 'Load older bids'}
+                </button>
+              </div>
+            )}
           </div>
         )}
       </div>
@@ -236,7 +289,9 @@ function BidsList() {
               </span>
             </div>
             <div className="bid-message-text">
-              {selectedBid.bid_message || 'No message available'}
+              {selectedBid.bid_message === undefined
+                ? 'Loading message...'
+                : selectedBid.bid_message || 'No message available'}
             </div>
           </div>
         </div>
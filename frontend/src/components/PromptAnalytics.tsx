@@ -1,10 +1,11 @@
 import { useEffect, useState } from 'react'
-import { getPromptAnalytics } from '../services/api'
-import type { PromptAnalytics as PromptAnalyticsType } from '../services/api'
+import { getPromptAnalytics, getPromptBandit } from '../services/api'
+import type { PromptAnalytics as PromptAnalyticsType, PromptBanditState } from '../services/api'
 import '../App.css'
 
 function PromptAnalytics() {
   const [analytics, setAnalytics] = useState<PromptAnalyticsType[]>([])
+  const [bandit, setBandit] = useState<PromptBanditState | null>(null)
   const [loading, setLoading] = useState(true)
 
   useEffect(() => {
@@ -22,6 +23,11 @@ function PromptAnalytics() {
     } finally {
       setLoading(false)
     }
+    try {
+      setBandit(await getPromptBandit())
+    } catch (error) {
+      console.error('Failed to load prompt bandit state:', error)
+    }
   }
 
   const formatDate = (dateString: string | null) => {
@@ -163,6 +169,60 @@ function PromptAnalytics() {
           </tbody>
         </table>
       </div>
+
+      {bandit && bandit.arms.length > 0 && (
+        <div style={{ marginTop: '2rem' }}>
+          <h3 style={{ marginBottom: '0.5rem', fontSize: '1.1rem' }}>Bandit Selector</h3>
+          <p style={{ color: 'var(--text-secondary)', marginBottom: '1rem', fontSize: '0.9rem' }}>
+            {bandit.enabled
+              ? `Prompts are chosen by ${bandit.strategy === 'ucb' ? 'UCB' : 'Thompson sampling'} over ${bandit.total_bids} bids.`
+              : 'Not in use (set PROMPT_SELECTION_MODE to "bandit"). Showing what it would pick from the current stats.'}
+            {' '}Posterior Mean is the expected reply rate; P(best) is the chance each prompt has the highest one.
+          </p>
+          <div style={{ overflowX: 'auto' }}>
+            <table className="table">
+              <thead>
+                <tr>
+                  <th>Prompt Name</th>
+                  <th>Bids</th>
+                  <th>Replies</th>
+                  <th>Posterior Mean</th>
+                  {bandit.strategy === 'ucb' && <th>UCB</th>}
+                  <th>P(best)</th>
+                </tr>
+              </thead>
+              <tbody>
+                {bandit.arms.map((arm) => (
+                  <tr key={arm.prompt_id} style={{ opacity: arm.is_active ? 1 : 0.5 }}>
+                    <td style={{ fontFamily: 'Rajdhani', fontWeight: 600, color: 'var(--text-primary)' }}>
+                      {arm.prompt_name || `Prompt ${arm.prompt_id}`}
+                    </td>
+                    <td style={{ fontFamily: 'Orbitron', fontWeight: 600 }}>{arm.bids}</td>
+                    <td style={{ fontFamily: 'Orbitron', fontWeight: 600 }}>{arm.replies}</td>
+                    <td style={{ fontFamily: 'Orbitron', fontWeight: 600 }}>{(arm.mean * 100).toFixed(1)}%</td>
+                    {bandit.strategy === 'ucb' && (
+                      <td style={{ fontFamily: 'Orbitron', fontWeight: 600 }}>
+                        {arm.ucb === null ? '∞' : arm.ucb.toFixed(3)}
+                      </td>
+                    )}
+                    <td>
+                      <span
+                        style={{
+                          color: arm.p_best >= 0.5 ? 'var(--text-primary)' : arm.p_best >= 0.2 ? '#ffaa00' : 'var(--text-secondary)',
+                          fontWeight: 600,
+                          fontFamily: 'Orbitron',
+                        }}
+                      >
+                        {(arm.p_best * 100).toFixed(1)}%
+                      </span>
+                    </td>
+                  </tr>
+                ))}
+              </tbody>
+            </table>
+          </div>
+        </div>
+      )}
       
       <div style={{ marginTop: '2rem', padding: '1.5rem', background: 'rgba(0, 0, 0, 0.3)', borderRadius: '12px', border: '1px solid var(--border-glass)' }}>
         <h3 style={{ marginTop: 0, marginBottom: '1rem', fontSize: '1.1rem' }}>How to Use This Data</h3>
@@ -14,7 +14,7 @@ function PromptsArsenal() {
   const [newPromptTemplate, setNewPromptTemplate] = useState('')
   const [saving, setSaving] = useState(false)
   const [message, setMessage] = useState<string | null>(null)
-  const [promptMode, setPromptMode] = useState<'manual' | 'dynamic'>('dynamic')
+  const [promptMode, setPromptMode] = useState<'manual' | 'dynamic' | 'combined' | 'bandit'>('dynamic')
   const [updatingMode, setUpdatingMode] = useState(false)
 
   useEffect(() => {
@@ -63,7 +63,7 @@ function PromptsArsenal() {
       setMessage('Prompt created successfully!')
       setTimeout(() => setMessage(null), 3000)
     } catch (error) {
-      setMessage('Failed to create prompt: ' + (error as Error).message)
+      setMessage('Failed to create prompt: ' + ((error as any).response?.data?.error || (error as Error).message))
     } finally {
       setSaving(false)
     }
@@ -80,12 +80,12 @@ function PromptsArsenal() {
     }
   }
 
-  const handleModeToggle = async (mode: 'manual' | 'dynamic') => {
+  const handleModeToggle = async (mode: 'manual' | 'dynamic' | 'combined' | 'bandit') => {
     setUpdatingMode(true)
     try {
       await updateConfig({ PROMPT_SELECTION_MODE: mode })
       setPromptMode(mode)
-      setMessage(`Prompt selection mode set to: ${mode === 'manual' ? 'Manual (Active Prompt Only)' : 'Dynamic (AI Selection)'}`)
+      setMessage(`Prompt selection mode set to: ${mode === 'manual' ? 'Manual (Active Prompt Only)' : mode === 'bandit' ? 'Bandit (Reply-Rate Learning)' : mode === 'combined' ? 'Combined (AI Selects and Writes in One Call)' : 'Dynamic (AI Selection)'}`)
       setTimeout(() => setMessage(null), 3000)
     } catch (error) {
       setMessage('Failed to update prompt mode: ' + (error as Error).message)
@@ -120,7 +120,7 @@ function PromptsArsenal() {
       setMessage('Prompt updated!')
       setTimeout(() => setMessage(null), 3000)
     } catch (error) {
-      setMessage('Failed to update prompt: ' + (error as Error).message)
+      setMessage('Failed to update prompt: ' + ((error as any).response?.data?.error || (error as Error).message))
     } finally {
       setSaving(false)
     }
@@ -206,6 +206,38 @@ function PromptsArsenal() {
                 >
                   DYNAMIC
                 </button>
+                <button
+                  className={`btn ${promptMode === 'combined' ? 'btn-primary' : ''}`}
+                  onClick={() => handleModeToggle('combined')}
+                  disabled={updatingMode || promptMode === 'combined'}
+                  style={{ 
+                    fontSize: '0.75rem',
+                    padding: '0.4rem 0.8rem',
+                    fontFamily: 'Orbitron',
+                    fontWeight: 600,
+                    opacity: promptMode === 'combined' ? 1 : 0.6,
+                    cursor: updatingMode ? 'not-allowed' : 'pointer'
+                  }}
+                  title="AI picks the prompt and writes the bid in a single call"
+                >
+                  COMBINED
+                </button>
+                <button
+                  className={`btn ${promptMode === 'bandit' ? 'btn-primary' : ''}`}
+                  onClick={() => handleModeToggle('bandit')}
+                  disabled={updatingMode || promptMode === 'bandit'}
+                  style={{ 
+                    fontSize: '0.75rem',
+                    padding: '0.4rem 0.8rem',
+                    fontFamily: 'Orbitron',
+                    fontWeight: 600,
+                    opacity: promptMode === 'bandit' ? 1 : 0.6,
+                    cursor: updatingMode ? 'not-allowed' : 'pointer'
+                  }}
+                  title="Favors prompts with the best reply rates while still trying the others"
+                >
+                  BANDIT
+                </button>
               </div>
             </div>
             <button
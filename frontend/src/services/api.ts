@@ -45,7 +45,8 @@ export interface Config {
   BID_AMOUNT_MULTIPLIER?: number
   DEFAULT_DELIVERY_DAYS?: number
   MY_SKILLS?: string[]
-  PROMPT_SELECTION_MODE?: 'manual' | 'dynamic'
+  PROMPT_SELECTION_MODE?: 'manual' | 'dynamic' | 'combined' | 'bandit'
+  PROMPT_BANDIT_STRATEGY?: 'thompson' | 'ucb'
 }
 
 export interface Bid {
@@ -56,12 +57,29 @@ export interface Bid {
   outsource_cost: number | null
   profit: number | null
   applied_at: string
-  bid_message?: string | null
+  bid_message?: string | null // only from getBid(); list pages carry has_message instead
+  has_message?: boolean
   currency_code?: string
   prompt_id?: number | null
   prompt_name?: string | null
 }
 
+export interface BidsPage {
+  bids: Bid[]
+  next_cursor: string | null
+}
+
+export interface BidsQuery {
+  limit?: number
+  cursor?: string | null
+  status?: string
+  prompt_id?: number
+  currency?: string
+  since?: string
+  until?: string
+  fields?: string[]
+}
+
 export interface Stats {
   total_bids: number
   applied: number
@@ -157,8 +175,18 @@ export const deletePrompt = async (id: number): Promise<void> => {
 }
 
 // Bids API
-export const getBids = async (): Promise<Bid[]> => {
-  const response = await api.get<Bid[]>('/bids')
+// One page of bids, newest first; pass next_cursor back as cursor for the next page
+export const getBids = async (query: BidsQuery = {}): Promise<BidsPage> => {
+  const { cursor, fields, ...filters } = query
+  const response = await api.get<BidsPage>('/bids', {
+    params: { ...filters, cursor: cursor || undefined, fields: fields?.join(',') },
+  })
+  return response.data
+}
+
+// A single bid including its full message
+export const getBid = async (projectId: number): Promise<Bid> => {
+  const response = await api.get<Bid>(`/bids/${projectId}`)
   return response.data
 }
 
@@ -215,3 +243,29 @@ export const getPromptAnalytics = async (): Promise<PromptAnalytics[]> => {
   return response.data
 }
 
+export interface PromptBanditArm {
+  prompt_id: number
+  prompt_name: string
+  is_active: boolean
+  bids: number
+  replies: number
+  won: number
+  alpha: number
+  beta: number
+  mean: number
+  ucb: number | null
+  p_best: number
+}
+
+export interface PromptBanditState {
+  strategy: 'thompson' | 'ucb'
+  enabled: boolean
+  total_bids: number
+  arms: PromptBanditArm[]
+}
+
+export const getPromptBandit = async (): Promise<PromptBanditState> => {
+  const response = await api.get<PromptBanditState>('/analytics/prompts/bandit')
+  return response.data
+}
+
@@ -0,0 +1,348 @@
+#!/usr/bin/env python3
+"""
+Rate-limited, instrumented LLM client
+
+Bid threads used to call model.generate_content directly: no rate limit, no retry
+policy, no timeout. LLMClient wraps the model and adds:
+
+- a token bucket (requests per minute with a burst allowance)
+- a cap on requests in flight
+- a deadline per call, shared by queueing, retries and the request itself
+- retries with full jitter on 429 and 5xx responses
+- per-purpose ('selection', 'generation', ...) latency and token histograms
+
+When the bucket or the API keeps us throttled past the deadline, generate() raises
+LLMThrottled so callers can skip the bid instead of posting a canned message.
+
+HedgedLLM bounds tail latency on top of that: if the primary model hasn't answered
+by its usual percentile latency, the same prompt goes to a faster model and the
+first answer wins. Past a hard deadline it raises LLMTimeout so the caller can fall
+back to a locally rendered message.
+"""
+import time
+import random
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+LATENCY_BUCKETS = (0.5, 1, 2, 5, 10, 20, 30, 60)  # seconds, upper bounds
+TOKEN_BUCKETS = (100, 250, 500, 1000, 2000, 4000, 8000)
+
+
+class LLMError(Exception):
+    """LLM call failed"""
+
+
+class LLMThrottled(LLMError):
+    """Rate limited (locally or by the API) until the call's deadline"""
+
+
+class LLMTimeout(LLMError):
+    """Call did not complete before its deadline"""
+
+
+def status_code(error):
+    """HTTP status of an API error, if it carries one (google.api_core errors expose .code)"""
+    code = getattr(error, 'code', None)
+    if isinstance(code, int):
+        return code
+    text = str(error)
+    for candidate in RETRYABLE_STATUS:
+        if text.startswith(str(candidate)) or f" {candidate} " in text:
+            return candidate
+    return None
+
+
+class TokenBucket:
+    """Classic token bucket: `rate` tokens per second, holding at most `capacity`"""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = max(1.0, float(capacity))
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self, deadline):
+        """Take one token, waiting until `deadline` (time.monotonic) at most. Returns False on timeout"""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return True
+                wait = (1 - self._tokens) / self.rate if self.rate > 0 else float('inf')
+            if now + wait > deadline:
+                return False
+            time.sleep(wait)
+
+
+class Histogram:
+    """Fixed-bucket histogram plus a recent window for percentiles"""
+
+    def __init__(self, buckets, window=500):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # last bucket is overflow
+        self.total = 0.0
+        self.count = 0
+        self._recent = deque(maxlen=window)
+
+    def observe(self, value):
+        index = next((i for i, bound in enumerate(self.buckets) if value <= bound), len(self.buckets))
+        self.counts[index] += 1
+        self.total += value
+        self.count += 1
+        self._recent.append(value)
+
+    def percentile(self, pct):
+        if not self._recent:
+            return 0.0
+        ordered = sorted(self._recent)
+        return ordered[min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))]
+
+    def snapshot(self):
+        labels = [f"<={bound}" for bound in self.buckets] + [f">{self.buckets[-1]}"]
+        return {
+            'count': self.count,
+            'avg': round(self.total / self.count, 3) if self.count else 0.0,
+            'p50': round(self.percentile(50), 3),
+            'p95': round(self.percentile(95), 3),
+            'p99': round(self.percentile(99), 3),
+            'buckets': dict(zip(labels, self.counts)),
+        }
+
+
+class PurposeStats:
+    """Counters and histograms for one kind of call"""
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.throttled = 0
+        self.timeouts = 0
+        self.retries = 0
+        self.latency = Histogram(LATENCY_BUCKETS)
+        self.input_tokens = Histogram(TOKEN_BUCKETS)
+        self.output_tokens = Histogram(TOKEN_BUCKETS)
+        self.cached_tokens = Histogram(TOKEN_BUCKETS)
+
+    def snapshot(self):
+        return {
+            'calls': self.calls,
+            'errors': self.errors,
+            'throttled': self.throttled,
+            'timeouts': self.timeouts,
+            'retries': self.retries,
+            'latency_seconds': self.latency.snapshot(),
+            'input_tokens': self.input_tokens.snapshot(),
+            'output_tokens': self.output_tokens.snapshot(),
+            'cached_tokens': self.cached_tokens.snapshot(),
+        }
+
+
+class LLMClient:
+    """Wraps a google.generativeai GenerativeModel (or anything with generate_content)"""
+
+    def __init__(self, model, requests_per_minute=60, burst=5, max_in_flight=4, timeout=60,
+                 max_retries=3, backoff_base=1.0):
+        self.model = model
+        self.name = getattr(model, 'name', None) or getattr(model, 'model_name', None) or 'llm'
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.max_in_flight = max(1, int(max_in_flight))
+        self._bucket = TokenBucket(requests_per_minute / 60.0, burst)
+        self._in_flight = threading.BoundedSemaphore(self.max_in_flight)
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    def _purpose(self, purpose):
+        with self._lock:
+            return self._stats.setdefault(purpose, PurposeStats())
+
+    def _count(self, stats, field):
+        # Purposes are shared by every thread calling generate(), so their stats are too
+        with self._lock:
+            setattr(stats, field, getattr(stats, field) + 1)
+
+    def latency_percentile(self, purpose, pct, min_samples=1):
+        """Latency percentile of successful calls for a purpose, None below min_samples calls"""
+        with self._lock:
+            stats = self._stats.get(purpose)
+            if stats is None or stats.latency.count < min_samples:
+                return None
+            return stats.latency.percentile(pct)
+
+    def generate(self, prompt, purpose='generation', timeout=None, generation_config=None, prefix=None):
+        """Generate text for `prompt` within `timeout` seconds (default: the client's timeout)
+
+        prefix: static text that precedes the prompt. Providers with supports_prefix
+        serve it from a context cache; for anything else it is sent inline.
+        """
+        stats = self._purpose(purpose)
+        self._count(stats, 'calls')
+        extra = {}
+        if prefix:
+            if getattr(self.model, 'supports_prefix', False):
+                extra['prefix'] = prefix
+            else:
+                prompt = prefix + prompt
+        deadline = time.monotonic() + (timeout or self.timeout)
+        attempt = 0
+        while True:
+            if not self._bucket.acquire(deadline):
+                self._count(stats, 'throttled')
+                raise LLMThrottled(f"{purpose}: rate limit would exceed the deadline")
+            if not self._in_flight.acquire(timeout=max(0.0, deadline - time.monotonic())):
+                self._count(stats, 'throttled')
+                raise LLMThrottled(f"{purpose}: {self.max_in_flight} requests already in flight")
+            start = time.monotonic()
+            try:
+                remaining = deadline - start
+                if remaining <= 0:
+                    self._count(stats, 'timeouts')
+                    raise LLMTimeout(f"{purpose}: deadline passed before the request was sent")
+                kwargs = dict(extra, request_options={'timeout': remaining})
+                if generation_config:
+                    kwargs['generation_config'] = generation_config
+                response = self.model.generate_content(prompt, **kwargs)
+                text = response.text
+            except LLMError:
+                raise
+            except Exception as e:
+                code = status_code(e)
+                out_of_time = time.monotonic() >= deadline or code == 504
+                if code not in RETRYABLE_STATUS or attempt >= self.max_retries or out_of_time:
+                    self._count(stats, 'errors')
+                    if code == 429:
+                        self._count(stats, 'throttled')
+                        raise LLMThrottled(f"{purpose}: {e}") from e
+                    if out_of_time:
+                        self._count(stats, 'timeouts')
+                        raise LLMTimeout(f"{purpose}: {e}") from e
+                    raise
+                attempt += 1
+                self._count(stats, 'retries')
+                # Full jitter, never sleeping past the deadline
+                backoff = random.uniform(0, self.backoff_base * 2 ** attempt)
+                time.sleep(max(0.0, min(backoff, deadline - time.monotonic() - 0.05)))
+                continue
+            finally:
+                self._in_flight.release()
+            elapsed = time.monotonic() - start
+            usage = getattr(response, 'usage_metadata', None)
+            with self._lock:
+                stats.latency.observe(elapsed)
+                if usage is not None:
+                    stats.input_tokens.observe(getattr(usage, 'prompt_token_count', 0) or 0)
+                    stats.output_tokens.observe(getattr(usage, 'candidates_token_count', 0) or 0)
+                    stats.cached_tokens.observe(getattr(usage, 'cached_content_token_count', 0) or 0)
+            return text
+
+    def stats(self):
+        with self._lock:
+            return {purpose: s.snapshot() for purpose, s in self._stats.items()}
+
+    def format_stats(self):
+        """One line per purpose, for the periodic stats log"""
+        lines = []
+        for purpose, s in self.stats().items():
+            latency = s['latency_seconds']
+            lines.append(
+                f"LLM {self.name} {purpose}: {s['calls']} calls | p50 {latency['p50']:.1f}s p95 {latency['p95']:.1f}s | "
+                f"{s['retries']} retries, {s['throttled']} throttled, {s['timeouts']} timeouts, {s['errors']} errors | "
+                f"avg tokens in {s['input_tokens']['avg']:.0f} (cached {s['cached_tokens']['avg']:.0f}) out {s['output_tokens']['avg']:.0f}")
+        return "\n".join(lines) if lines else f"LLM {self.name}: no calls yet"
+
+
+class HedgedLLM:
+    """Primary client plus an optional faster hedge client, raced under a hard deadline
+
+    Either client may be an LLMClient or anything with the same generate()/latency_percentile()
+    contract, such as llm_providers.ProviderRouter.
+    """
+
+    def __init__(self, primary, hedge=None, percentile=90, default_delay=8.0, min_samples=20, deadline=30.0):
+        self.primary = primary
+        self.hedge = hedge
+        self.percentile = percentile
+        self.default_delay = default_delay  # used until the primary has min_samples latencies
+        self.min_samples = min_samples
+        self.deadline = deadline
+        self._executor = ThreadPoolExecutor(
+            max_workers=primary.max_in_flight + (hedge.max_in_flight if hedge else 0),
+            thread_name_prefix='llm'
+        )
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.hedged = 0
+        self.hedge_wins = 0
+        self.deadline_misses = 0
+
+    def hedge_delay(self, purpose):
+        """Seconds to wait for the primary before hedging: its observed latency percentile"""
+        delay = self.primary.latency_percentile(purpose, self.percentile, self.min_samples)
+        return self.default_delay if delay is None else delay
+
+    def _count(self, field):
+        with self._lock:
+            setattr(self, field, getattr(self, field) + 1)
+
+    def generate(self, prompt, purpose='generation', generation_config=None, prefix=None):
+        """Returns (text, source) where source is 'primary' or 'hedge'"""
+        self._count('requests')
+        end = time.monotonic() + self.deadline
+        primary = self._executor.submit(self.primary.generate, prompt, purpose, self.deadline, generation_config, prefix)
+        pending = {primary: 'primary'}
+        first_error = None
+        hedge_at = time.monotonic() + self.hedge_delay(purpose) if self.hedge else None
+        while pending:
+            now = time.monotonic()
+            if now >= end:
+                break
+            wake = min(end, hedge_at) if hedge_at else end
+            done, _ = wait(list(pending), timeout=max(0.0, wake - now), return_when=FIRST_COMPLETED)
+            for future in done:
+                source = pending.pop(future)
+                try:
+                    text = future.result()
+                except Exception as e:
+                    first_error = first_error or e
+                    continue
+                if source == 'hedge':
+                    self._count('hedge_wins')
+                return text, source
+            # Primary is slow (or already failed): race the faster model for the remaining time
+            if hedge_at and (time.monotonic() >= hedge_at or not pending):
+                hedge_at = None
+                self._count('hedged')
+                remaining = max(0.1, end - time.monotonic())
+                pending[self._executor.submit(self.hedge.generate, prompt, f"{purpose}_hedge", remaining,
+                                              generation_config, prefix)] = 'hedge'
+        if pending or first_error is None:
+            self._count('deadline_misses')
+            raise LLMTimeout(f"{purpose}: no answer within {self.deadline}s")
+        raise first_error
+
+    def stats(self):
+        with self._lock:
+            requests = self.requests
+            return {
+                'requests': requests,
+                'hedged': self.hedged,
+                'hedge_wins': self.hedge_wins,
+                'deadline_misses': self.deadline_misses,
+                'hedge_rate': round(self.hedged / requests, 3) if requests else 0.0,
+                'deadline_miss_rate': round(self.deadline_misses / requests, 3) if requests else 0.0,
+            }
+
+    def format_stats(self):
+        s = self.stats()
+        return (f"LLM hedging: {s['requests']} requests | hedge rate {s['hedge_rate'] * 100:.0f}% "
+                f"({s['hedge_wins']} won by the hedge) | {s['deadline_misses']} missed the {self.deadline:.0f}s deadline")
@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+"""
+LLM providers and per-purpose routing
+
+A provider is anything with generate_content(prompt, request_options=None,
+generation_config=None) returning an object with .text (and optionally
+.usage_metadata), so each one can sit behind its own LLMClient with its own rate
+limit. Two ship here:
+
+- GeminiProvider: a google.generativeai model, created on first use
+- StubProvider: deterministic local answers in the formats the autobidder asks for,
+  so the pipeline can be load-tested offline
+
+Both accept a static prompt prefix and serve it from a prompt_prefix.ContextCache
+(Gemini CachedContent, or the local stand-in for the stub).
+
+ProviderRouter picks, per purpose ('selection', 'generation', ...), which of the
+configured clients serves a call, from their observed latency and error rate
+(EWMAs), and fails over to the next candidate while the deadline allows.
+Provider specs are strings: "stub", "gemini:gemini-2.5-pro" or just a Gemini
+model name.
+"""
+import re
+import json
+import time
+import hashlib
+import threading
+
+from llm_client import Histogram, LATENCY_BUCKETS, LLMTimeout
+from prompt_prefix import ContextCache, estimate_tokens
+
+
+class StubUsage:
+    def __init__(self, prompt_tokens, output_tokens, cached_tokens=0):
+        self.prompt_token_count = prompt_tokens
+        self.candidates_token_count = output_tokens
+        self.cached_content_token_count = cached_tokens
+
+
+class StubResponse:
+    def __init__(self, text, prompt, cached_tokens=0):
+        self.text = text
+        self.usage_metadata = StubUsage(estimate_tokens(prompt) + cached_tokens, estimate_tokens(text), cached_tokens)
+
+
+class GeminiProvider:
+    """google.generativeai model by name (genai.configure must have been called)"""
+
+    supports_prefix = True
+
+    def __init__(self, model_name, context_cache=None):
+        self.name = f"gemini:{model_name}"
+        self.model_name = model_name
+        self.context_cache = context_cache
+        self._model = None
+
+    def generate_content(self, prompt, request_options=None, generation_config=None, prefix=None):
+        if self._model is None:
+            import google.generativeai as genai
+            self._model = genai.GenerativeModel(self.model_name)
+        model = self._model
+        if prefix:
+            cached_model = self.context_cache.get(self.model_name, prefix) if self.context_cache else None
+            if cached_model is not None:
+                model = cached_model
+            else:
+                prompt = prefix + prompt
+        kwargs = {}
+        if request_options:
+            kwargs['request_options'] = request_options
+        if generation_config:
+            kwargs['generation_config'] = generation_config
+        return model.generate_content(prompt, **kwargs)
+
+
+class StubProvider:
+    """Offline provider: same prompt in, same answer out, with an optional fixed latency"""
+
+    supports_prefix = True
+
+    def __init__(self, name='stub', latency=0.0, context_cache=None):
+        self.name = name
+        self.latency = latency
+        self.context_cache = context_cache or ContextCache()
+
+    @staticmethod
+    def _pick(prompt, count, salt=''):
+        digest = hashlib.md5(f"{salt}{prompt}".encode('utf-8')).digest()
+        return digest[0] % max(1, count) + 1
+
+    def generate_content(self, prompt, request_options=None, generation_config=None, prefix=None):
+        if self.latency:
+            time.sleep(self.latency)
+        cached_tokens = 0
+        if prefix:
+            if self.context_cache.get(self.name, prefix) is not None:
+                cached_tokens = estimate_tokens(prefix)
+            else:
+                prompt = prefix + prompt
+        strategies = re.findall(r'number 1-(\d+)', prompt)
+        strategy_count = int(strategies[0]) if strategies else 1
+        if 'mapping project number to strategy number' in prompt:
+            projects = len(re.findall(r'^PROJECT \d+$', prompt, re.MULTILINE))
+            text = json.dumps({str(i): self._pick(prompt, strategy_count, i) for i in range(1, projects + 1)})
+        elif '"strategy"' in prompt:
+            text = json.dumps({'strategy': self._pick(prompt, strategy_count), 'message': self._message(prompt)})
+        elif strategies:
+            text = str(self._pick(prompt, strategy_count))
+        else:
+            text = self._message(prompt)
+        return StubResponse(text, prompt, cached_tokens)
+
+    @staticmethod
+    def _message(prompt):
+        title = re.search(r'title[:=]\s*(.+)', prompt, re.IGNORECASE)
+        subject = title.group(1).strip()[:60] if title else 'your project'
+        return f"[stub] I can start on {subject} right away. What's the most important outcome for you?"
+
+
+def parse_provider_spec(spec, context_cache=None):
+    """Provider for a spec string ("stub", "stub:<latency>", "gemini:<model>" or a bare Gemini model name)
+
+    context_cache is shared by Gemini providers; stubs keep a local stand-in each.
+    """
+    spec = spec.strip()
+    kind, _, arg = spec.partition(':')
+    if kind == 'stub':
+        return StubProvider(name=spec, latency=float(arg) if arg else 0.0)
+    if kind == 'gemini':
+        return GeminiProvider(arg, context_cache)
+    return GeminiProvider(spec, context_cache)
+
+
+class ProviderHealth:
+    """EWMA latency and error rate of one client for one purpose"""
+
+    def __init__(self, alpha=0.2):
+        self.alpha = alpha
+        self.latency = None
+        self.error_rate = 0.0
+        self.calls = 0
+
+    def record(self, seconds, failed):
+        self.calls += 1
+        if not failed:
+            self.latency = seconds if self.latency is None else (1 - self.alpha) * self.latency + self.alpha * seconds
+        self.error_rate = (1 - self.alpha) * self.error_rate + self.alpha * (1.0 if failed else 0.0)
+
+    def score(self, error_penalty):
+        """Expected cost of a call: latency inflated by the error rate (untried clients score 0)"""
+        if self.calls == 0:
+            return 0.0
+        return (self.latency if self.latency is not None else 60.0) * (1 + error_penalty * self.error_rate)
+
+
+class ProviderRouter:
+    """Routes each purpose to the best of its candidate LLMClients
+
+    routes: {purpose: [(name, LLMClient), ...]}; purposes not listed use `default`.
+    Every explore_every-th call of a purpose goes to the runner-up so its stats stay fresh.
+    """
+
+    def __init__(self, routes, default='generation', error_penalty=5.0, explore_every=20):
+        self.routes = {purpose: list(candidates) for purpose, candidates in routes.items()}
+        self.default = default
+        self.error_penalty = error_penalty
+        self.explore_every = explore_every
+        self._health = {}  # (purpose, name) -> ProviderHealth
+        self._latency = {}  # purpose -> Histogram of successful call latency
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    @property
+    def max_in_flight(self):
+        clients = {id(client): client for candidates in self.routes.values() for _, client in candidates}
+        return sum(client.max_in_flight for client in clients.values())
+
+    def _candidates(self, purpose):
+        return self.routes.get(purpose) or self.routes[self.default]
+
+    def _health_for(self, purpose, name):
+        key = (purpose, name)
+        if key not in self._health:
+            self._health[key] = ProviderHealth()
+        return self._health[key]
+
+    def latency_percentile(self, purpose, pct, min_samples=1):
+        """Same contract as LLMClient.latency_percentile, over whichever candidate answered"""
+        with self._lock:
+            latency = self._latency.get(purpose)
+            if latency is None or latency.count < min_samples:
+                return None
+            return latency.percentile(pct)
+
+    def order(self, purpose):
+        """Candidates for a call, best first"""
+        candidates = self._candidates(purpose)
+        with self._lock:
+            ranked = sorted(candidates, key=lambda c: self._health_for(purpose, c[0]).score(self.error_penalty))
+            count = self._calls[purpose] = self._calls.get(purpose, 0) + 1
+        if len(ranked) > 1 and self.explore_every and count % self.explore_every == 0:
+            ranked[0], ranked[1] = ranked[1], ranked[0]
+        return ranked
+
+    def generate(self, prompt, purpose='generation', timeout=None, generation_config=None, prefix=None):
+        """Same contract as LLMClient.generate, failing over between candidates"""
+        candidates = self.order(purpose)
+        end = time.monotonic() + (timeout or max(client.timeout for _, client in candidates))
+        last_error = None
+        for name, client in candidates:
+            remaining = end - time.monotonic()
+            if remaining <= 0:
+                break
+            start = time.monotonic()
+            try:
+                text = client.generate(prompt, purpose, remaining, generation_config, prefix)
+            except Exception as e:
+                with self._lock:
+                    self._health_for(purpose, name).record(time.monotonic() - start, failed=True)
+                last_error = e
+                continue
+            elapsed = time.monotonic() - start
+            with self._lock:
+                self._health_for(purpose, name).record(elapsed, failed=False)
+                self._latency.setdefault(purpose, Histogram(LATENCY_BUCKETS)).observe(elapsed)
+            return text
+        raise last_error or LLMTimeout(f"{purpose}: no provider answered in time")
+
+    def stats(self):
+        with self._lock:
+            result = {}
+            for (purpose, name), health in self._health.items():
+                result.setdefault(purpose, {})[name] = {
+                    'calls': health.calls,
+                    'ewma_latency_seconds': round(health.latency, 3) if health.latency is not None else None,
+                    'ewma_error_rate': round(health.error_rate, 3),
+                    'score': round(health.score(self.error_penalty), 3),
+                }
+            return result
+
+    def format_stats(self):
+        """Routing state per purpose (each client logs its own call stats)"""
+        lines = []
+        for purpose, providers in self.stats().items():
+            parts = [f"{name} {s['calls']} calls {s['ewma_latency_seconds'] or 0:.1f}s err {s['ewma_error_rate'] * 100:.0f}%"
+                     for name, s in providers.items()]
+            lines.append(f"LLM routing {purpose}: " + " | ".join(parts))
+        return "\n".join(lines) if lines else "LLM routing: no calls yet"
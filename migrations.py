@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Versioned schema migrations for bids.db
+
+Both the autobidder and the API server call migrate() once at startup. The
+schema_version table records which migrations have run, so request handlers and
+hot paths can assume the current schema: no CREATE TABLE IF NOT EXISTS, ALTER
+TABLE or PRAGMA table_info probing per call.
+
+Migrations run in order inside one BEGIN IMMEDIATE transaction, so when both
+processes boot at the same time one applies them and the other waits and finds
+nothing left to do. Each migration is a list of steps: SQL strings or callables
+taking the connection.
+
+The first migrations bring databases created by older versions (where columns
+were added piecemeal by whichever code path ran first) up to one baseline, so
+they only add what is missing. Later migrations are plain DDL - append new ones
+to MIGRATIONS, never edit or reorder applied ones. Nothing here imports from the
+rest of the app: an applied migration must mean the same thing on a fresh database
+forever, so its SQL and helpers are frozen copies.
+"""
+import sqlite3
+import hashlib
+
+
+def _columns(conn, table):
+    return {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+
+
+def _add_columns(table, columns):
+    """Step adding each (name, declaration) the table doesn't have yet"""
+    def step(conn):
+        existing = _columns(conn, table)
+        for name, declaration in columns:
+            if name not in existing:
+                conn.execute(f"ALTER TABLE {table} ADD COLUMN {name} {declaration}")
+    return step
+
+
+def _template_hash_v1(template):
+    """prompt_registry.template_hash as of migration 2 (frozen)"""
+    return hashlib.md5((template or '').encode('utf-8')).hexdigest()[:16]
+
+
+def _backfill_prompt_hashes(conn):
+    rows = conn.execute("SELECT id, template FROM prompts WHERE prompt_hash IS NULL").fetchall()
+    conn.executemany("UPDATE prompts SET prompt_hash = ? WHERE id = ?",
+                     [(_template_hash_v1(template), prompt_id) for prompt_id, template in rows])
+
+
+MIGRATIONS = [
+    (1, 'bids baseline', [
+        '''CREATE TABLE IF NOT EXISTS bids
+           (project_id INTEGER PRIMARY KEY, title TEXT, bid_amount REAL,
+            status TEXT DEFAULT 'applied', outsource_cost REAL, profit REAL, applied_at TEXT, bid_message TEXT)''',
+        _add_columns('bids', [
+            ('bid_message', 'TEXT'),
+            ('prompt_hash', 'TEXT'),
+            ('currency_code', 'TEXT'),
+            ('prompt_id', 'INTEGER'),
+            ('reply_count', 'INTEGER DEFAULT 0'),
+            ('project_skills', 'TEXT'),  # comma-separated skill names, a prompt router feature
+        ]),
+    ]),
+    (2, 'prompts arsenal baseline', [
+        '''CREATE TABLE IF NOT EXISTS prompts
+           (id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            description TEXT,
+            template TEXT NOT NULL,
+            is_active INTEGER DEFAULT 0,
+            created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+            updated_at TEXT DEFAULT CURRENT_TIMESTAMP,
+            stats_bids INTEGER DEFAULT 0,
+            stats_replies INTEGER DEFAULT 0,
+            stats_won INTEGER DEFAULT 0)''',
+        _add_columns('prompts', [('description', 'TEXT'), ('prompt_hash', 'TEXT')]),
+        _backfill_prompt_hashes,
+        "CREATE INDEX IF NOT EXISTS idx_prompts_prompt_hash ON prompts (prompt_hash)",
+        '''CREATE TABLE IF NOT EXISTS prompt_metadata
+           (prompt_hash TEXT PRIMARY KEY, name TEXT NOT NULL, created_at TEXT DEFAULT CURRENT_TIMESTAMP)''',
+    ]),
+    (3, 'prompt version counter', [
+        # Prompt edits (not the stats_* counters) bump prompt_versions.version, so readers
+        # can tell "the arsenal changed" apart from "someone recorded a bid"
+        "CREATE TABLE IF NOT EXISTS prompt_versions (id INTEGER PRIMARY KEY CHECK (id = 1), version INTEGER NOT NULL)",
+        "INSERT OR IGNORE INTO prompt_versions (id, version) VALUES (1, 0)",
+        "CREATE TRIGGER IF NOT EXISTS prompts_version_insert AFTER INSERT ON prompts "
+        "BEGIN UPDATE prompt_versions SET version = version + 1 WHERE id = 1; END",
+        "CREATE TRIGGER IF NOT EXISTS prompts_version_update AFTER UPDATE OF name, description, template, is_active ON prompts "
+        "BEGIN UPDATE prompt_versions SET version = version + 1 WHERE id = 1; END",
+        "CREATE TRIGGER IF NOT EXISTS prompts_version_delete AFTER DELETE ON prompts "
+        "BEGIN UPDATE prompt_versions SET version = version + 1 WHERE id = 1; END",
+    ]),
+    (4, 'processed projects', [
+        # Dedupe state that survives restarts (see dedupe.ProcessedStore)
+        '''CREATE TABLE IF NOT EXISTS processed_projects
+           (project_id INTEGER PRIMARY KEY, processed_at REAL NOT NULL, outcome TEXT NOT NULL)''',
+        "CREATE INDEX IF NOT EXISTS idx_processed_projects_processed_at ON processed_projects (processed_at)",
+    ]),
+    (5, 'bids secondary indexes', [
+        # Each serves queries in bid_queries.py; test_query_plans.py checks they are used
+        # Newest-first listing, with project_id as the tiebreak for keyset pages
+        "CREATE INDEX idx_bids_applied_at ON bids (applied_at, project_id)",
+        # Filtered bids pages seek to the filter value and read newest first, no sort
+        "CREATE INDEX idx_bids_status ON bids (status, applied_at, project_id)",
+        "CREATE INDEX idx_bids_prompt_id ON bids (prompt_id, applied_at, project_id)",
+        # Bids with no currency_code are USD; the expression must match bid_queries.bids_page
+        "CREATE INDEX idx_bids_currency ON bids (COALESCE(currency_code, 'USD'), applied_at, project_id)",
+        "CREATE INDEX idx_bids_reply_count ON bids (reply_count)",
+        # Covers the per-prompt counts and first/last use, so analytics never reads the table
+        "CREATE INDEX idx_bids_prompt_hash ON bids (prompt_hash, status, reply_count, applied_at)",
+        # Covers the per-currency value and profit totals
+        "CREATE INDEX idx_bids_currency_totals ON bids (currency_code, bid_amount, profit)",
+    ]),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+def current_version(conn):
+    """Highest applied migration (0 for a database that predates schema_version)"""
+    conn.execute("CREATE TABLE IF NOT EXISTS schema_version "
+                 "(version INTEGER PRIMARY KEY, name TEXT NOT NULL, applied_at TEXT DEFAULT CURRENT_TIMESTAMP)")
+    return conn.execute("SELECT COALESCE(MAX(version), 0) FROM schema_version").fetchone()[0]
+
+
+def migrate(path, migrations=None, timeout=30.0):
+    """Apply pending migrations to the database at `path`. Returns [(version, name), ...] applied"""
+    migrations = MIGRATIONS if migrations is None else migrations
+    conn = sqlite3.connect(path, timeout=timeout, isolation_level=None)
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            version = current_version(conn)
+            applied = []
+            for number, name, steps in migrations:
+                if number <= version:
+                    continue
+                for step in steps:
+                    if callable(step):
+                        step(conn)
+                    else:
+                        conn.execute(step)
+                conn.execute("INSERT INTO schema_version (version, name) VALUES (?, ?)", (number, name))
+                applied.append((number, name))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+    finally:
+        conn.close()
+    return applied
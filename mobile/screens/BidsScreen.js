@@ -10,6 +10,8 @@ export default function BidsScreen() {
   const [loading, setLoading] = useState(true);
   const [refreshing, setRefreshing] = useState(false);
   const [searchQuery, setSearchQuery] = useState('');
+  const [nextCursor, setNextCursor] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
 
   useEffect(() => {
     loadBids();
@@ -35,6 +37,7 @@ export default function BidsScreen() {
       try {
         const response = await getBids();
         bidsData = response.bids || response || [];
+        setNextCursor(response.next_cursor || null);
       } catch (e) {
         bidsData = await getBidsCache();
       }
@@ -49,6 +52,20 @@ export default function BidsScreen() {
     }
   };
 
+  const loadMore = async () => {
+    if (!nextCursor || loadingMore) return;
+    setLoadingMore(true);
+    try {
+      const response = await getBids({ cursor: nextCursor });
+      setNextCursor(response.next_cursor || null);
+      setBids((previous) => [...previous, ...response.bids]);
+    } catch (error) {
+      console.error('Error loading more bids:', error);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   const onRefresh = () => {
     setRefreshing(true);
     loadBids();
@@ -139,6 +156,8 @@ export default function BidsScreen() {
         renderItem={renderBid}
         keyExtractor={(item) => item.project_id?.toString() || Math.random().toString()}
         refreshControl={<RefreshControl refreshing={refreshing} onRefresh={onRefresh} />}
+        onEndReached={loadMore}
+        onEndReachedThreshold={0.5}
         ListEmptyComponent={
           <View style={{ padding: 40, alignItems: 'center' }}>
             <Text style={{ color: 'gray', textAlign: 'center' }}>
@@ -48,9 +48,11 @@ export const updatePrompt = async (prompt) => {
   }
 };
 
-export const getBids = async () => {
+// One page of bids: { bids, next_cursor }. Pass next_cursor as params.cursor for the next page;
+// params may also filter by status, prompt_id, currency, since and until
+export const getBids = async (params = {}) => {
   try {
-    const response = await api.get('/bids');
+    const response = await api.get('/bids', { params });
     return response.data;
   } catch (error) {
     console.error('Error fetching bids:', error);
@@ -58,6 +60,16 @@ export const getBids = async () => {
   }
 };
 
+export const getBid = async (projectId) => {
+  try {
+    const response = await api.get(`/bids/${projectId}`);
+    return response.data;
+  } catch (error) {
+    console.error('Error fetching bid:', error);
+    throw error;
+  }
+};
+
 export const getStats = async () => {
   try {
     const response = await api.get('/stats');
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Incremental Freelancer project feed
+
+Instead of re-downloading the newest 100 projects every poll, ProjectFeed keeps a
+watermark (newest project id and submit time seen so far) and only asks for projects
+submitted since then, in small pages. It pages forward only while a whole page is
+newer than the watermark, so bytes moved and JSON parse time scale with the number
+of new projects rather than the page size.
+
+fetch_details() is the second phase of a two-phase poll: the listing is requested
+without full descriptions or job details, and only projects that survive the cheap
+budget/age/bid-count checks are hydrated, in batches, with the full fields.
+"""
+import json
+import time
+import logging
+
+from freelancer_client import get_session
+
+logger = logging.getLogger(__name__)
+
+ACTIVE_PROJECTS_URL = 'https://www.freelancer.com/api/projects/0.1/projects/active/'
+PROJECTS_URL = 'https://www.freelancer.com/api/projects/0.1/projects/'
+DETAIL_BATCH_SIZE = 50
+
+
+class RateLimited(Exception):
+    """Feed request was rejected with HTTP 429"""
+
+
+class ProjectFeed:
+    """Polls the active-projects feed, returning only projects newer than the watermark"""
+
+    def __init__(self, oauth_token, page_size=20, max_pages=5, bootstrap_limit=100, params=None, detail_params=None):
+        self.oauth_token = oauth_token
+        self.page_size = page_size
+        self.max_pages = max_pages
+        self.bootstrap_limit = bootstrap_limit
+        self.params = dict(params or {})
+        self.detail_params = dict(detail_params or {'full_description': True, 'job_details': True})
+        self.watermark_id = None
+        self.watermark_time = None
+        self.last_cycle = {}
+
+    def _get_page(self, limit, offset=0, from_time=None):
+        """Fetch one page. Returns (projects, total_count, bytes, parse_seconds)"""
+        params = dict(self.params, limit=limit, offset=offset)
+        if from_time:
+            params['from_time'] = int(from_time)
+        session = get_session(self.oauth_token)
+        response = session.session.get(ACTIVE_PROJECTS_URL, params=params)
+        if response.status_code == 429:
+            raise RateLimited(f"429 TOO MANY REQUESTS: {response.text[:200]}")
+        response.raise_for_status()
+        start = time.perf_counter()
+        data = json.loads(response.content)
+        parse_seconds = time.perf_counter() - start
+        result = data.get('result', {})
+        return result.get('projects', []), result.get('total_count', 'unknown'), len(response.content), parse_seconds
+
+    def _advance(self, projects):
+        for p in projects:
+            pid = p.get('id') or 0
+            if self.watermark_id is None or pid > self.watermark_id:
+                self.watermark_id = pid
+            submitted = p.get('time_submitted')
+            if isinstance(submitted, (int, float)) and (self.watermark_time is None or submitted > self.watermark_time):
+                self.watermark_time = submitted
+
+    def poll(self):
+        """Fetch projects newer than the watermark. Returns (new_projects, total_count)"""
+        total_bytes = 0
+        parse_seconds = 0.0
+        pages = 0
+
+        if self.watermark_id is None:
+            # First poll: take one full page to establish the watermark
+            projects, total, size, parse = self._get_page(self.bootstrap_limit)
+            total_bytes, parse_seconds, pages = size, parse, 1
+            new_projects = projects
+        else:
+            new_projects = []
+            total = 'unknown'
+            offset = 0
+            while pages < self.max_pages:
+                projects, total, size, parse = self._get_page(self.page_size, offset, self.watermark_time)
+                pages += 1
+                total_bytes += size
+                parse_seconds += parse
+                fresh = [p for p in projects if (p.get('id') or 0) > self.watermark_id]
+                new_projects.extend(fresh)
+                # Only page forward when every project on a full page was new
+                if len(projects) < self.page_size or len(fresh) < len(projects):
+                    break
+                offset += self.page_size
+            else:
+                logger.info(f"Feed burst exceeded {self.max_pages} pages of {self.page_size}; older new projects skipped")
+
+        self._advance(new_projects)
+        self.last_cycle = {
+            'new_projects': len(new_projects),
+            'pages': pages,
+            'bytes': total_bytes,
+            'parse_ms': round(parse_seconds * 1000, 2),
+            'watermark_id': self.watermark_id,
+            'watermark_time': self.watermark_time,
+        }
+        return new_projects, total
+
+    def fetch_details(self, project_ids):
+        """Batch-fetch full project records. Returns {project_id: project}"""
+        details = {}
+        total_bytes = 0
+        session = get_session(self.oauth_token)
+        ids = list(project_ids)
+        for i in range(0, len(ids), DETAIL_BATCH_SIZE):
+            batch = ids[i:i + DETAIL_BATCH_SIZE]
+            params = dict(self.detail_params)
+            params['projects[]'] = batch
+            response = session.session.get(PROJECTS_URL, params=params)
+            if response.status_code == 429:
+                raise RateLimited(f"429 TOO MANY REQUESTS: {response.text[:200]}")
+            response.raise_for_status()
+            total_bytes += len(response.content)
+            for p in json.loads(response.content).get('result', {}).get('projects', []):
+                details[p.get('id')] = p
+        self.last_cycle['detail_bytes'] = total_bytes
+        self.last_cycle['detail_projects'] = len(details)
+        return details
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Bandit-based prompt allocation
+
+Treats every prompt in the arsenal as an arm whose reward is "the bid got a reply".
+Counts come from prompts.stats_bids / stats_replies / stats_won, which the
+autobidder and the bid sync keep up to date incrementally, so choosing a prompt is
+an in-memory draw with no network call:
+
+- thompson: sample each arm's Beta(1 + replies, 1 + bids - replies) posterior, take the max
+- ucb: UCB1 on the reply rate, unplayed arms first
+"""
+import math
+import random
+import threading
+
+STRATEGIES = ('thompson', 'ucb')
+
+
+class PromptBandit:
+    """Per-prompt reply/win counts and the selection policy over them"""
+
+    def __init__(self, strategy='thompson', rng=None):
+        if strategy not in STRATEGIES:
+            raise ValueError(f"Unknown bandit strategy: {strategy} (expected one of {', '.join(STRATEGIES)})")
+        self.strategy = strategy
+        self.rng = rng or random.Random()
+        self.arms = {}  # prompt_id -> [bids, replies, wins]
+        self._lock = threading.Lock()
+
+    def load(self, rows):
+        """Replace counts with (prompt_id, bids, replies, wins) rows, e.g. from the prompts table"""
+        with self._lock:
+            self.arms = {prompt_id: [bids or 0, replies or 0, wins or 0] for prompt_id, bids, replies, wins in rows}
+
+    def _arm(self, prompt_id):
+        return self.arms.setdefault(prompt_id, [0, 0, 0])
+
+    def record_bid(self, prompt_id):
+        with self._lock:
+            self._arm(prompt_id)[0] += 1
+
+    def record_reply(self, prompt_id):
+        with self._lock:
+            self._arm(prompt_id)[1] += 1
+
+    def record_win(self, prompt_id):
+        with self._lock:
+            self._arm(prompt_id)[2] += 1
+
+    def _beta(self, prompt_id):
+        bids, replies, _ = self.arms.get(prompt_id, (0, 0, 0))
+        replies = min(replies, bids)
+        return 1 + replies, 1 + bids - replies
+
+    def _ucb(self, prompt_id, total_bids):
+        bids, replies, _ = self.arms.get(prompt_id, (0, 0, 0))
+        if not bids:
+            return float('inf')
+        return min(replies, bids) / bids + math.sqrt(2 * math.log(max(total_bids, 1)) / bids)
+
+    def select(self, prompt_ids):
+        """Choose one of prompt_ids (None if empty)"""
+        prompt_ids = list(prompt_ids)
+        if not prompt_ids:
+            return None
+        with self._lock:
+            if self.strategy == 'ucb':
+                total_bids = sum(self.arms.get(pid, (0, 0, 0))[0] for pid in prompt_ids)
+                return max(prompt_ids, key=lambda pid: self._ucb(pid, total_bids))
+            return max(prompt_ids, key=lambda pid: self.rng.betavariate(*self._beta(pid)))
+
+    def posterior(self, prompt_ids=None, draws=2000):
+        """Per-arm posterior state, including the Monte Carlo probability of being the best arm"""
+        with self._lock:
+            prompt_ids = list(prompt_ids if prompt_ids is not None else self.arms)
+            total_bids = sum(self.arms.get(pid, (0, 0, 0))[0] for pid in prompt_ids)
+            params = {pid: self._beta(pid) for pid in prompt_ids}
+            wins = dict.fromkeys(prompt_ids, 0)
+            if prompt_ids:
+                sampler = random.Random(0)  # deterministic, so the dashboard doesn't flicker
+                for _ in range(draws):
+                    best = max(prompt_ids, key=lambda pid: sampler.betavariate(*params[pid]))
+                    wins[best] += 1
+            arms = []
+            for pid in prompt_ids:
+                bids, replies, won = self.arms.get(pid, (0, 0, 0))
+                alpha, beta = params[pid]
+                ucb = self._ucb(pid, total_bids)
+                arms.append({
+                    'prompt_id': pid,
+                    'bids': bids,
+                    'replies': replies,
+                    'won': won,
+                    'alpha': alpha,
+                    'beta': beta,
+                    'mean': round(alpha / (alpha + beta), 4),
+                    'ucb': None if math.isinf(ucb) else round(ucb, 4),
+                    'p_best': round(wins[pid] / draws, 4) if prompt_ids else 0.0,
+                })
+        return {'strategy': self.strategy, 'total_bids': total_bids, 'arms': arms}
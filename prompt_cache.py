@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Cache for AI prompt-selection decisions
+
+In dynamic mode every matching project costs an extra Gemini call just to pick a
+prompt number. Projects of the same shape (same skills, similar budget, same kind
+of work) almost always get the same answer, so SelectionCache remembers the chosen
+prompt id per project signature for a TTL. The cache is tied to a fingerprint of
+the prompt arsenal: adding, editing or removing a prompt clears it.
+"""
+import re
+import math
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+
+from skill_matcher import normalize
+
+# What kind of work the client is asking for - the main thing the selector looks at
+# besides skills and budget. A project's signature carries the set of intents found.
+INTENT_KEYWORDS = {
+    'build': ['build', 'create', 'develop', 'new app', 'from scratch', 'mvp', 'launch'],
+    'fix': ['fix', 'bug', 'error', 'issue', 'broken', 'crash', 'debug', 'not working'],
+    'integrate': ['integrate', 'integration', 'api', 'connect', 'webhook', 'payment gateway'],
+    'redesign': ['redesign', 'revamp', 'improve', 'update', 'modernize', 'ui/ux'],
+    'migrate': ['migrate', 'migration', 'convert', 'port', 'upgrade'],
+    'maintain': ['maintain', 'maintenance', 'support', 'ongoing', 'long term', 'long-term'],
+    'consult': ['consult', 'advice', 'review', 'audit', 'architecture', 'guidance'],
+    'urgent': ['urgent', 'asap', 'immediately', 'today', 'deadline'],
+}
+
+_WORD_BOUNDARY = {
+    intent: re.compile(r'\b(' + '|'.join(re.escape(word) for word in words) + r')\b')
+    for intent, words in INTENT_KEYWORDS.items()
+}
+
+
+def budget_band(budget_usd):
+    """Budget bucket on a doubling scale ($0-50, $50-100, $100-200, ...)"""
+    if not budget_usd or budget_usd <= 50:
+        return 0
+    return int(math.log2(budget_usd / 50)) + 1
+
+
+def project_signature(project, budget_usd=None):
+    """Feature signature of a project: (normalized skills, budget band, intents)"""
+    skills = frozenset(normalize(j.get('name', '')) for j in project.get('jobs', []) or [] if j.get('name'))
+    text = f"{project.get('title', '')} {project.get('description', '')[:2000]}".lower()
+    intents = frozenset(intent for intent, pattern in _WORD_BOUNDARY.items() if pattern.search(text))
+    return (tuple(sorted(skills)), budget_band(budget_usd), tuple(sorted(intents)))
+
+
+def arsenal_fingerprint(prompts):
+    """Hash of every prompt the selector can choose from; changes when any of them does"""
+    digest = hashlib.md5()
+    for p in sorted(prompts, key=lambda p: p['id']):
+        digest.update(f"{p['id']}\x00{p.get('name')}\x00{p.get('description')}\x00{p.get('template')}\x01".encode('utf-8'))
+    return digest.hexdigest()
+
+
+class SelectionCache:
+    """signature -> selected prompt id, with a TTL, a capacity and hit-rate counters"""
+
+    def __init__(self, ttl_seconds=6 * 3600, capacity=500):
+        self.ttl_seconds = ttl_seconds
+        self.capacity = max(1, int(capacity))
+        self._entries = OrderedDict()  # signature -> (prompt_id, stored_at), oldest first
+        self._fingerprint = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _check_fingerprint(self, fingerprint):
+        if fingerprint != self._fingerprint:
+            if self._entries:
+                self.invalidations += 1
+            self._entries.clear()
+            self._fingerprint = fingerprint
+
+    def get(self, signature, fingerprint, now=None):
+        """Cached prompt id for this signature, or None (counts a hit or a miss)"""
+        with self._lock:
+            self._check_fingerprint(fingerprint)
+            entry = self._entries.get(signature)
+            if entry is not None and (now or time.time()) - entry[1] > self.ttl_seconds:
+                del self._entries[signature]
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return entry[0]
+
+    def put(self, signature, fingerprint, prompt_id, now=None):
+        with self._lock:
+            self._check_fingerprint(fingerprint)
+            self._entries.pop(signature, None)
+            self._entries[signature] = (prompt_id, now or time.time())
+            while len(self._entries) > self.capacity:
+                self._entries.popitem(last=False)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'size': len(self._entries),
+            'capacity': self.capacity,
+            'ttl_seconds': self.ttl_seconds,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups, 3) if lookups else 0.0,
+            'invalidations': self.invalidations,
+        }
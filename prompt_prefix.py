@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+Static prompt prefixes and context caching
+
+A prompt template is mostly a fixed persona and rule set with a small project block
+in the middle. split_template() separates the two: the static paragraphs become a
+prefix that is identical for every bid on that template, the paragraphs holding
+placeholders (or the age phrase) become the per-project suffix.
+
+ContextCache registers a prefix once per model and hands back a handle reused until
+the TTL runs out; a changed template is simply a new prefix, so it gets a new entry.
+The base class is a local stand-in that only keeps the text (used by the stub
+provider and tests); GeminiContextCache backs it with Gemini CachedContent.
+"""
+import time
+import string
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from datetime import timedelta
+from functools import lru_cache
+
+logger = logging.getLogger(__name__)
+
+AGE_PHRASE = "posted less than 2 minutes ago"
+FOLLOW_UP = "Follow the instructions above for this project."
+
+
+def _is_dynamic(paragraph):
+    if AGE_PHRASE in paragraph:
+        return True
+    try:
+        return any(field is not None for _, field, _, _ in string.Formatter().parse(paragraph))
+    except ValueError:
+        return False
+
+
+@lru_cache(maxsize=64)
+def split_template(template):
+    """(static prefix, per-project suffix template) for a prompt template.
+
+    Static paragraphs before and after the project block form the prefix; the block
+    itself (first through last dynamic paragraph) is the suffix. Templates without a
+    project block are not split: ('', template).
+    """
+    paragraphs = template.strip().split('\n\n')
+    dynamic = [i for i, paragraph in enumerate(paragraphs) if _is_dynamic(paragraph)]
+    if not dynamic:
+        return '', template
+    first, last = dynamic[0], dynamic[-1]
+    static = paragraphs[:first] + paragraphs[last + 1:]
+    if not static:
+        return '', template
+    suffix = paragraphs[first:last + 1]
+    if last + 1 < len(paragraphs):
+        # Trailing instructions moved into the prefix: point back at them
+        suffix.append(FOLLOW_UP)
+    return '\n\n'.join(static) + '\n\n', '\n\n'.join(suffix)
+
+
+def estimate_tokens(text):
+    return len(text) // 4
+
+
+class ContextCache:
+    """Prefix registrations per (model, prefix), with TTL, capacity and reuse counters"""
+
+    def __init__(self, ttl_seconds=3600, min_tokens=0, capacity=16, retry_after_seconds=300):
+        self.ttl_seconds = ttl_seconds
+        self.min_tokens = min_tokens
+        self.capacity = capacity
+        self.retry_after_seconds = retry_after_seconds  # how long a failed prefix is sent inline before retrying
+        self._entries = OrderedDict()  # key -> (handle, expires_at)
+        self._pending = set()  # keys being registered right now
+        self._failed = {}  # key -> time.time() to retry at
+        self._lock = threading.Lock()
+        self.registrations = 0
+        self.hits = 0
+        self.skipped = 0
+        self.failures = 0
+        self.tokens_reused = 0
+
+    @staticmethod
+    def key(model_name, prefix):
+        return hashlib.md5(f"{model_name}\x00{prefix}".encode('utf-8')).hexdigest()
+
+    def _create(self, model_name, prefix):
+        """Register the prefix with the backend. Returns the handle callers generate with"""
+        return prefix
+
+    def _delete(self, handle):
+        pass
+
+    def get(self, model_name, prefix):
+        """Handle for a cached prefix, registering it on first use. None if it can't be cached
+
+        _create and _delete are network calls, so they run outside the lock. While one
+        caller registers a prefix, concurrent callers send it inline instead of waiting.
+        """
+        if estimate_tokens(prefix) < self.min_tokens:
+            with self._lock:
+                self.skipped += 1
+            return None
+        key = self.key(model_name, prefix)
+        now = time.time()
+        with self._lock:
+            if key in self._pending or self._failed.get(key, 0) > now:
+                self.skipped += 1
+                return None
+            self._failed.pop(key, None)
+            entry = self._entries.get(key)
+            if entry and entry[1] > now:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                self.tokens_reused += estimate_tokens(prefix)
+                return entry[0]
+            self._pending.add(key)
+        try:
+            handle = self._create(model_name, prefix)
+        except Exception as e:
+            logger.info(f"Context cache unavailable for {model_name} ({e}); sending the prefix inline "
+                        f"for {self.retry_after_seconds}s")
+            with self._lock:
+                self._pending.discard(key)
+                self._failed[key] = time.time() + self.retry_after_seconds
+                self.failures += 1
+            return None
+        evicted = []
+        with self._lock:
+            self._pending.discard(key)
+            old = self._entries.pop(key, None)
+            if old:
+                evicted.append(old[0])
+            self._entries[key] = (handle, now + self.ttl_seconds)
+            self.registrations += 1
+            while len(self._entries) > self.capacity:
+                _, (old_handle, _) = self._entries.popitem(last=False)
+                evicted.append(old_handle)
+        for old_handle in evicted:
+            self._delete(old_handle)
+        return handle
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'registrations': self.registrations,
+                'hits': self.hits,
+                'skipped': self.skipped,
+                'failures': self.failures,
+                'tokens_reused': self.tokens_reused,
+            }
+
+
+class GeminiContextCache(ContextCache):
+    """Gemini CachedContent per prefix; handles are GenerativeModels bound to the cache"""
+
+    def _create(self, model_name, prefix):
+        import google.generativeai as genai
+        cached = genai.caching.CachedContent.create(
+            model=model_name if model_name.startswith('models/') else f"models/{model_name}",
+            contents=[prefix],
+            ttl=timedelta(seconds=self.ttl_seconds + 60),  # outlive our own TTL so the handle never dangles
+        )
+        model = genai.GenerativeModel.from_cached_content(cached_content=cached)
+        model._autobidder_cached_content = cached
+        return model
+
+    def _delete(self, handle):
+        cached = getattr(handle, '_autobidder_cached_content', None)
+        if cached is not None:
+            try:
+                cached.delete()
+            except Exception:
+                pass
@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+"""
+In-memory prompt registry with precompiled templates
+
+The autobidder used to read the prompts table (and sqlite_master) on every bid and
+only found out about a bad placeholder when str.format raised at bid time. The
+registry loads the arsenal once and keeps an immutable snapshot that the bid path
+reads without touching the database:
+
+- refresh() is cheap enough to call every poll cycle: it compares the connection's
+  PRAGMA data_version, and only when another connection has committed does it read
+  the prompts version counter (bumped by triggers on any prompt edit, see
+  migrations.py) and reload
+- every template is validated and compiled once: split into its static prefix and
+  per-project suffix (prompt_prefix.split_template), with the suffix parsed into
+  literal/field parts so rendering is a join instead of a parse
+- validate_template() is the same check the API runs before saving a prompt
+"""
+import string
+import hashlib
+import logging
+import threading
+
+from prompt_cache import arsenal_fingerprint
+from prompt_prefix import AGE_PHRASE, split_template
+
+logger = logging.getLogger(__name__)
+
+PLACEHOLDERS = ('project_title', 'full_description', 'budget_min', 'budget_max', 'skills_list')
+AGE_FIELD = 'project_age'
+
+
+def template_hash(template):
+    """Short hash identifying a template's text (stored as prompts.prompt_hash and bids.prompt_hash)"""
+    return hashlib.md5((template or '').encode('utf-8')).hexdigest()[:16]
+
+
+class TemplateError(ValueError):
+    """A prompt template that can't be filled with the project fields"""
+
+
+def validate_template(template):
+    """Raise TemplateError unless the template only uses the known {placeholders}"""
+    if not template or not template.strip():
+        raise TemplateError("Template is empty")
+    try:
+        fields = [(field, spec, conversion) for _, field, spec, conversion in string.Formatter().parse(template)
+                  if field is not None]
+    except ValueError as e:
+        raise TemplateError(f"Invalid template syntax: {e} (use {{{{ and }}}} for literal braces)")
+    unknown = sorted({field or '{}' for field, _, _ in fields if field not in PLACEHOLDERS})
+    if unknown:
+        raise TemplateError(f"Unknown placeholder(s): {', '.join(unknown)}. "
+                            f"Available: {', '.join('{' + name + '}' for name in PLACEHOLDERS)}")
+    for field, spec, _ in fields:
+        if spec and '{' in spec:
+            raise TemplateError(f"Nested placeholder in format spec of {{{field}}} is not supported")
+
+
+def _compile(template):
+    """[(literal, field, spec, conversion), ...] with the age phrase turned into a field"""
+    parts = []
+    for literal, field, spec, conversion in string.Formatter().parse(template):
+        pieces = literal.split(AGE_PHRASE)
+        for piece in pieces[:-1]:
+            parts.append((piece, AGE_FIELD, '', None))
+        parts.append((pieces[-1], field, spec, conversion))
+    return tuple(parts)
+
+
+def _render(parts, values):
+    out = []
+    for literal, field, spec, conversion in parts:
+        out.append(literal)
+        if field is None:
+            continue
+        value = values[field]
+        if conversion == 'r':
+            value = repr(value)
+        elif conversion == 's':
+            value = str(value)
+        elif conversion == 'a':
+            value = ascii(value)
+        out.append(format(value, spec) if spec else str(value))
+    return ''.join(out)
+
+
+class CompiledTemplate:
+    """A validated template, pre-split into prefix and suffix and pre-parsed for rendering"""
+
+    __slots__ = ('source', 'hash', 'prefix', '_parts', '_suffix_parts')
+
+    def __init__(self, template):
+        validate_template(template)
+        self.source = template
+        self.hash = template_hash(template)
+        self.prefix, suffix = split_template(template)
+        self._parts = _compile(template)
+        self._suffix_parts = _compile(suffix)
+
+    def render(self, values):
+        """The whole template filled with values (PLACEHOLDERS plus AGE_FIELD)"""
+        return _render(self._parts, values)
+
+    def render_suffix(self, values):
+        """Only the per-project part; send it after self.prefix"""
+        return _render(self._suffix_parts, values)
+
+
+class PromptSnapshot:
+    """One consistent view of the arsenal; replaced, never mutated"""
+
+    def __init__(self, prompts=(), active_id=None, version=None):
+        self.prompts = list(prompts)  # [{'id', 'name', 'description', 'template', 'prompt_hash', 'compiled'}, ...]
+        self.by_id = {prompt['id']: prompt for prompt in self.prompts}
+        self.active_id = active_id if active_id in self.by_id else None
+        self.version = version
+        self.fingerprint = arsenal_fingerprint(self.prompts)
+
+
+class PromptRegistry:
+    """The prompts table, loaded once and reloaded only when it changes
+
+    connect: factory for the registry's own long-lived connection (PRAGMA data_version
+    is per connection, so it has to be kept open). default_template is what the active
+    prompt falls back to when the table is empty or the active template is invalid.
+    """
+
+    def __init__(self, connect, default_template):
+        self.connect = connect
+        self.default = CompiledTemplate(default_template)
+        self.snapshot = PromptSnapshot()
+        self.reloads = 0
+        self.invalid = {}  # prompt_id -> error, logged only when it first appears or changes
+        self._compiled = {default_template: self.default}
+        self._conn = None
+        self._data_version = None
+        self._lock = threading.Lock()
+
+    def _connection(self):
+        if self._conn is None:
+            self._conn = self.connect()
+        return self._conn
+
+    def compile(self, template):
+        """Compiled form of any template text (cached; raises TemplateError if invalid)"""
+        compiled = self._compiled.get(template)
+        if compiled is None:
+            compiled = CompiledTemplate(template)
+            self._compiled[template] = compiled
+        return compiled
+
+    def refresh(self, force=False):
+        """Reload if the prompts changed since the last load. Returns True if it reloaded"""
+        with self._lock:
+            conn = self._connection()
+            data_version = conn.execute("PRAGMA data_version").fetchone()[0]
+            if not force and data_version == self._data_version:
+                return False
+            self._data_version = data_version
+            # prompts and the prompt_versions counter come from migrations 2 and 3
+            version = conn.execute("SELECT version FROM prompt_versions WHERE id = 1").fetchone()[0]
+            if not force and version == self.snapshot.version:
+                return False
+            rows = conn.execute("SELECT id, name, description, template, is_active FROM prompts ORDER BY id").fetchall()
+            self._load(rows, version)
+            return True
+
+    def _load(self, rows, version):
+        prompts = []
+        active_id = None
+        invalid = {}
+        compiled_by_text = {}
+        for prompt_id, name, description, template, is_active in rows:
+            try:
+                compiled = self._compiled.get(template) or CompiledTemplate(template)
+            except TemplateError as e:
+                invalid[prompt_id] = str(e)
+                if self.invalid.get(prompt_id) != str(e):
+                    logger.warning(f"Prompt {prompt_id} ({name}) skipped: {e}")
+                continue
+            compiled_by_text[template] = compiled
+            prompts.append({'id': prompt_id, 'name': name, 'description': description,
+                            'template': template, 'prompt_hash': compiled.hash, 'compiled': compiled})
+            if is_active and active_id is None:
+                active_id = prompt_id
+        compiled_by_text[self.default.source] = self.default
+        self._compiled = compiled_by_text
+        self.invalid = invalid
+        self.snapshot = PromptSnapshot(prompts, active_id, version)
+        self.reloads += 1
+        logger.info(f"Prompt registry loaded {len(prompts)} prompts (active: {active_id}, version {version})")
+
+    # Hot-path reads: attribute lookups on the current snapshot, no database
+    def all(self):
+        return self.snapshot.prompts
+
+    def get(self, prompt_id):
+        return self.snapshot.by_id.get(prompt_id)
+
+    def active(self):
+        """(prompt dict or None, CompiledTemplate) for the active prompt"""
+        snapshot = self.snapshot
+        prompt = snapshot.by_id.get(snapshot.active_id)
+        return prompt, prompt['compiled'] if prompt else self.default
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""
+Local prompt router trained on bid outcomes
+
+Learns, from past bids and whether they got a reply or were won, which prompt tends
+to work for which kind of project. Features are title words and the project's
+skills. For every prompt the router keeps its overall success rate plus per-token
+success counts, and scores a project as the prompt's rate adjusted by the
+(smoothed) lift of each of the project's tokens - a naive-Bayes style estimate that
+takes a few dictionary lookups per token, so routing costs microseconds.
+
+predict() also reports a confidence (how far the best prompt is ahead of the
+runner-up) and its support (how many training bids back the decision), so the
+caller can fall back to the LLM selector whenever the router isn't sure.
+
+Train it offline with `python autobidder.py --train-router`, which writes
+prompt_router.json; the autobidder loads that file at startup.
+"""
+import re
+import json
+import math
+import time
+
+from skill_matcher import normalize
+from prompt_registry import template_hash
+
+MODEL_VERSION = 1
+
+_WORD = re.compile(r'[a-z0-9][a-z0-9+#.]*[a-z0-9+#]|[a-z0-9]')
+STOPWORDS = {
+    'the', 'and', 'for', 'with', 'need', 'needed', 'looking', 'want', 'from', 'this',
+    'that', 'our', 'your', 'you', 'are', 'will', 'can', 'who', 'have', 'has', 'into',
+    'project', 'help', 'expert', 'developer', 'required', 'someone', 'simple',
+}
+
+
+def tokenize(title, skills):
+    """Feature tokens: title words plus 'skill:' tokens for each (normalized) skill"""
+    tokens = set()
+    for word in _WORD.findall((title or '').lower()):
+        if len(word) > 2 and word not in STOPWORDS:
+            tokens.add(word)
+    for skill in skills or []:
+        if skill and skill.strip():
+            tokens.add('skill:' + normalize(skill.strip()))
+    return tokens
+
+
+def project_tokens(project):
+    return tokenize(project.get('title', ''), [j.get('name', '') for j in project.get('jobs', []) or []])
+
+
+class PromptRouter:
+    """Per-prompt success model over title/skill tokens"""
+
+    def __init__(self, smoothing=2.0, min_token_bids=2):
+        self.smoothing = smoothing  # pseudo-bids pulling a token's rate towards the prompt's rate
+        self.min_token_bids = min_token_bids  # tokens seen less often than this under a prompt are ignored
+        self.prompts = {}  # prompt_id -> [bids, successes]
+        self.tokens = {}  # token -> {prompt_id: [bids, successes]}
+        self.trained_at = None
+        self.samples = 0
+
+    def __bool__(self):
+        return self.samples > 0
+
+    def fit(self, samples):
+        """samples: iterable of (tokens, prompt_id, success) where success is 0..1 (a win can count as 1)"""
+        self.prompts = {}
+        self.tokens = {}
+        self.samples = 0
+        for tokens, prompt_id, success in samples:
+            if prompt_id is None:
+                continue
+            counts = self.prompts.setdefault(prompt_id, [0, 0.0])
+            counts[0] += 1
+            counts[1] += success
+            for token in tokens:
+                token_counts = self.tokens.setdefault(token, {}).setdefault(prompt_id, [0, 0.0])
+                token_counts[0] += 1
+                token_counts[1] += success
+            self.samples += 1
+        self.trained_at = time.time()
+        return self
+
+    def _prompt_rate(self, prompt_id):
+        bids, successes = self.prompts.get(prompt_id, (0, 0.0))
+        # Beta(1, 1) prior: an unused prompt scores 0.5 and gets no support
+        return (successes + 1.0) / (bids + 2.0)
+
+    def scores(self, tokens, prompt_ids):
+        """{prompt_id: (estimated success rate, supporting bids)} for the given prompts"""
+        results = {}
+        for prompt_id in prompt_ids:
+            base = self._prompt_rate(prompt_id)
+            log_lift = 0.0
+            used = 0
+            support = 0
+            for token in tokens:
+                counts = self.tokens.get(token, {}).get(prompt_id)
+                if not counts or counts[0] < self.min_token_bids:
+                    continue
+                rate = (counts[1] + self.smoothing * base) / (counts[0] + self.smoothing)
+                log_lift += math.log(rate / base)
+                used += 1
+                support += counts[0]
+            score = base * math.exp(log_lift / used) if used else base
+            results[prompt_id] = (min(score, 1.0), support)
+        return results
+
+    def predict(self, tokens, prompt_ids):
+        """Best prompt for these tokens. Returns (prompt_id, confidence, support) or (None, 0.0, 0)
+
+        confidence is the relative margin of the best score over the runner-up (0..1).
+        """
+        prompt_ids = [pid for pid in prompt_ids if pid in self.prompts]
+        if not prompt_ids:
+            return None, 0.0, 0
+        ranked = sorted(self.scores(tokens, prompt_ids).items(), key=lambda kv: kv[1][0], reverse=True)
+        best_id, (best_score, support) = ranked[0]
+        runner_up = ranked[1][1][0] if len(ranked) > 1 else 0.0
+        confidence = (best_score - runner_up) / best_score if best_score > 0 else 0.0
+        return best_id, confidence, support
+
+    def to_dict(self):
+        return {
+            'version': MODEL_VERSION,
+            'smoothing': self.smoothing,
+            'min_token_bids': self.min_token_bids,
+            'trained_at': self.trained_at,
+            'samples': self.samples,
+            'prompts': {str(pid): counts for pid, counts in self.prompts.items()},
+            'tokens': {token: {str(pid): counts for pid, counts in by_prompt.items()}
+                       for token, by_prompt in self.tokens.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        if data.get('version') != MODEL_VERSION:
+            raise ValueError(f"Unsupported router model version: {data.get('version')}")
+        router = cls(smoothing=data['smoothing'], min_token_bids=data['min_token_bids'])
+        router.trained_at = data.get('trained_at')
+        router.samples = data.get('samples', 0)
+        router.prompts = {int(pid): counts for pid, counts in data['prompts'].items()}
+        router.tokens = {token: {int(pid): counts for pid, counts in by_prompt.items()}
+                         for token, by_prompt in data['tokens'].items()}
+        return router
+
+    def save(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls.from_dict(json.load(f))
+
+
+def training_samples(conn):
+    """(tokens, prompt_id, success) for every past bid we can attribute to a prompt.
+
+    Bids without a prompt_id are attributed through prompt_hash. A reply counts as a
+    success; a win counts as one too, even if the reply wasn't recorded.
+    """
+    c = conn.cursor()
+    c.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='prompts'")
+    if not c.fetchone():
+        return []
+    prompt_columns = {row[1] for row in c.execute("PRAGMA table_info(prompts)")}
+    hash_to_id = {}
+    if 'prompt_hash' in prompt_columns:
+        for prompt_id, prompt_hash in c.execute("SELECT id, prompt_hash FROM prompts WHERE prompt_hash IS NOT NULL"):
+            hash_to_id[prompt_hash] = prompt_id
+    else:
+        for prompt_id, template in c.execute("SELECT id, template FROM prompts"):
+            hash_to_id[template_hash(template)] = prompt_id
+    columns = {row[1] for row in c.execute("PRAGMA table_info(bids)")}
+    skills_col = 'project_skills' if 'project_skills' in columns else 'NULL'
+    replies_col = 'reply_count' if 'reply_count' in columns else '0'
+    samples = []
+    for title, skills, prompt_id, prompt_hash, reply_count, status in c.execute(
+            f"SELECT title, {skills_col}, prompt_id, prompt_hash, {replies_col}, status FROM bids"):
+        prompt_id = prompt_id or hash_to_id.get(prompt_hash)
+        if prompt_id is None:
+            continue
+        success = 1.0 if (reply_count or 0) > 0 or status == 'won' else 0.0
+        samples.append((tokenize(title, (skills or '').split(',')), prompt_id, success))
+    return samples
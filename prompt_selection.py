@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+LLM prompt-selection requests and the parsers for their answers
+
+autobidder.py connects to the database and the LLM providers at import, so the
+text it sends for prompt selection and the code reading the replies live here
+where they can be tested on their own. Every parser is defensive: the model's
+answer is untrusted text, so anything malformed or out of range becomes "no
+decision" and the caller falls back to its usual per-project path.
+
+- combined mode: select_and_write_prompt() asks one call to pick a strategy and
+  write the bid message; parse_select_and_write() maps the answer back to a prompt
+- batch mode: batch_selection_prompt() asks one call to pick a strategy for several
+  projects; assign_batch_selection() stores each valid pick on its project, where
+  preselected_prompt() finds it. Projects the answer leaves out keep no pick and go
+  through per-project selection.
+"""
+import re
+import json
+
+MAX_DESCRIPTION_CHARS = 3000
+
+
+class _Pairs(list):
+    """A JSON object as its (key, value) pairs, so repeated keys are not silently merged"""
+
+
+def _load_json_object(text, object_type=dict):
+    """The JSON object in a reply (tolerating a ```json fence or chatter around it), or None
+
+    object_type: dict, or _Pairs to keep every key/value pair in order
+    """
+    text = (text or '').strip()
+    match = re.search(r'\{.*\}', text, re.DOTALL)
+    hook = None if object_type is dict else object_type
+    try:
+        data = json.loads(match.group(0) if match else text, object_pairs_hook=hook)
+    except ValueError:
+        return None
+    return data if isinstance(data, object_type) else None
+
+
+def _skills(project):
+    return ", ".join([j['name'] for j in project.get('jobs', []) or []])
+
+
+def _budget(project):
+    budget = project.get('budget', {})
+    return f"${budget.get('minimum', 0)}–${budget.get('maximum', 0) or 'open'}"
+
+
+def select_and_write_prompt(project, prompts, instructions, age_text):
+    """Combined-mode request: pick one of `prompts` and write the message with it
+
+    instructions: each prompt's template rendered as instructions, in `prompts` order
+    """
+    strategies = "\n\n".join([
+        f"{i+1}. {prompt['name']}: {prompt['description']}\nINSTRUCTIONS:\n{text}"
+        for i, (prompt, text) in enumerate(zip(prompts, instructions))
+    ])
+    return f"""You are an expert at winning freelance projects. First pick the bid strategy that will maximize reply rate and win probability for this project, then write the bid message following that strategy's instructions exactly.
+
+PROJECT DETAILS:
+Title: {project.get('title', '')}
+Posted: {age_text}
+Description: {project.get('description', '')[:MAX_DESCRIPTION_CHARS]}
+Skills: {_skills(project)}
+Budget: {_budget(project)}
+
+AVAILABLE STRATEGIES:
+{strategies}
+
+Respond with ONLY a JSON object: {{"strategy": <number 1-{len(prompts)}>, "message": "<the finished bid message>"}}"""
+
+
+def parse_select_and_write(text, prompts):
+    """Parse a combined-mode reply. Returns (chosen prompt or None, message or None)"""
+    data = _load_json_object(text)
+    if data is None:
+        return None, None
+    message = data.get('message')
+    message = message.strip() if isinstance(message, str) and message.strip() else None
+    try:
+        strategy = int(data.get('strategy'))
+    except (TypeError, ValueError):
+        return None, message
+    if not 1 <= strategy <= len(prompts):
+        return None, message
+    return prompts[strategy - 1], message
+
+
+def format_prompt_strategies(prompts):
+    """Numbered list of prompt strategies for selection prompts"""
+    return "\n\n".join([
+        f"{i+1}. {p['name']}: {p['description']}"
+        for i, p in enumerate(prompts)
+    ])
+
+
+def batch_selection_prompt(projects, prompts):
+    """Batch-mode request: one strategy number per numbered project"""
+    projects_summary = "\n\n".join([
+        f"PROJECT {i+1}\nTitle: {project.get('title', '')}\n"
+        f"Skills: {_skills(project)}\n"
+        f"Budget: {_budget(project)}\n"
+        f"Description: {project.get('description', '')[:800]}"
+        for i, project in enumerate(projects)
+    ])
+    return f"""You are an expert at matching project requirements to the most effective bid strategy.
+
+AVAILABLE PROMPT STRATEGIES:
+{format_prompt_strategies(prompts)}
+
+PROJECTS:
+{projects_summary}
+
+For EACH project, select the SINGLE BEST prompt strategy (by number 1-{len(prompts)}) that will maximize reply rate and win probability.
+
+Consider:
+- Project complexity and scope
+- Client language and tone (technical vs. business vs. non-technical)
+- Budget level and project type
+- Whether it's a new build, fix, integration, or consultation
+
+Respond with ONLY a JSON object mapping project number to strategy number, e.g. {{"1": 2, "2": 1}}. No explanation."""
+
+
+def parse_batch_selection(text, project_count, strategy_count):
+    """Parse a batch reply into {project number: strategy number}, dropping invalid entries
+
+    A project named twice with different strategies (e.g. "1" and "01") is ambiguous
+    and dropped, so it gets a per-project decision instead.
+    """
+    data = _load_json_object(text, _Pairs)
+    if data is None:
+        return {}
+    selections = {}
+    conflicting = set()
+    for key, value in data:
+        try:
+            project_num, strategy_num = int(key), int(value)
+        except (TypeError, ValueError):
+            continue
+        if not (1 <= project_num <= project_count and 1 <= strategy_num <= strategy_count):
+            continue
+        if selections.get(project_num, strategy_num) != strategy_num:
+            conflicting.add(project_num)
+        selections[project_num] = strategy_num
+    return {num: strategy for num, strategy in selections.items() if num not in conflicting}
+
+
+def assign_batch_selection(text, projects, prompts):
+    """Store each valid pick in a batch reply as project['_selected_prompt_id']. Returns [(project, prompt), ...]"""
+    assigned = []
+    for project_num, strategy_num in sorted(parse_batch_selection(text, len(projects), len(prompts)).items()):
+        project, prompt = projects[project_num - 1], prompts[strategy_num - 1]
+        project['_selected_prompt_id'] = prompt['id']
+        assigned.append((project, prompt))
+    return assigned
+
+
+def preselected_prompt(project, prompts):
+    """The prompt a batch selection picked for this project, if it is still in the arsenal"""
+    prompt_id = project.get('_selected_prompt_id')
+    if prompt_id is None:
+        return None
+    return next((prompt for prompt in prompts if prompt['id'] == prompt_id), None)
@@ -65,6 +65,39 @@ def main():
         'MAX_PROJECT_AGE_MINUTES',
         'PROMPT_SELECTION_MODE',
         'MY_SKILLS',
+        'PIPELINE_QUEUE_SIZE',
+        'PIPELINE_SELECT_WORKERS',
+        'PIPELINE_GENERATE_WORKERS',
+        'PIPELINE_PLACE_WORKERS',
+        'PIPELINE_PERSIST_WORKERS',
+        'PRIORITY_AGE_HALF_LIFE_MINUTES',
+        'BID_DEADLINE_MINUTES',
+        'LLM_SELECTION_PROVIDERS',
+        'LLM_GENERATION_PROVIDERS',
+        'LLM_REQUESTS_PER_MINUTE',
+        'LLM_BURST',
+        'LLM_MAX_IN_FLIGHT',
+        'LLM_TIMEOUT_SECONDS',
+        'LLM_MAX_RETRIES',
+        'LLM_HEDGE_MODEL',
+        'LLM_HEDGE_PERCENTILE',
+        'LLM_HEDGE_DEFAULT_SECONDS',
+        'LLM_GENERATION_DEADLINE_SECONDS',
+        'LLM_CONTEXT_CACHE_TTL_SECONDS',
+        'LLM_CONTEXT_CACHE_MIN_TOKENS',
+        'PROMPT_CACHE_TTL_SECONDS',
+        'PROMPT_CACHE_SIZE',
+        'PROMPT_BATCH_SIZE',
+        'PROMPT_ROUTER_MODEL',
+        'PROMPT_ROUTER_MIN_CONFIDENCE',
+        'PROMPT_ROUTER_MIN_SUPPORT',
+        'PROMPT_BANDIT_STRATEGY',
+        'FEED_MODE',
+        'FEED_PAGE_SIZE',
+        'FEED_MAX_PAGES',
+        'FEED_TWO_PHASE',
+        'SEEN_EXPIRY_SECONDS',
+        'MAX_SEEN_SIZE',
     ]
     
     print("\n# Required Variables:")
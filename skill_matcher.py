@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+Precompiled skill matcher for project filtering
+
+Built once from the user's skills, SkillMatcher answers "does this required skill
+match one of mine" with dictionary lookups plus a memo, and scans free text for any
+of the user's skills in a single pass over an Aho-Corasick automaton. It keeps the
+original matching rules (exact, either-way substring, punctuation-insensitive) and
+adds an alias table so e.g. "reactjs" matches "react".
+"""
+
+# Groups of names that refer to the same skill. A group only takes effect when one
+# of its members is among the user's skills.
+SKILL_ALIASES = [
+    ['react', 'reactjs', 'react.js'],
+    ['next.js', 'nextjs', 'next'],
+    ['node.js', 'nodejs', 'node'],
+    ['vue.js', 'vuejs', 'vue'],
+    ['three.js', 'threejs'],
+    ['react native', 'react-native', 'rn'],
+    ['javascript', 'js', 'ecmascript'],
+    ['typescript', 'ts'],
+    ['postgresql', 'postgres'],
+    ['kubernetes', 'k8s'],
+    ['golang', 'go'],
+    ['ios development', 'ios', 'iphone'],
+    ['android', 'android development', 'android app development'],
+    ['mobile app', 'mobile app development'],
+    ['web app', 'web application', 'web development'],
+    ['game development', 'game design', 'unity 3d', 'unity'],
+    ['ar', 'augmented reality'],
+    ['vr', 'virtual reality'],
+    ['pwa', 'progressive web app'],
+]
+
+
+def normalize(skill):
+    """Lowercase and drop '.', ' ' and '-' so "Next.js" == "nextjs" == "next js\""""
+    return skill.lower().replace('.', '').replace(' ', '').replace('-', '')
+
+
+class AhoCorasick:
+    """Multi-pattern substring search: finds every pattern occurring in a text in one pass"""
+
+    def __init__(self, patterns):
+        self._goto = [{}]
+        self._fail = [0]
+        self._output = [[]]
+        for pattern in patterns:
+            if pattern:
+                self._add(pattern)
+        self._build()
+
+    def _add(self, pattern):
+        state = 0
+        for char in pattern:
+            nxt = self._goto[state].get(char)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[state][char] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append([])
+            state = nxt
+        self._output[state].append(pattern)
+
+    def _build(self):
+        queue = list(self._goto[0].values())
+        head = 0
+        while head < len(queue):
+            state = queue[head]
+            head += 1
+            for char, nxt in self._goto[state].items():
+                queue.append(nxt)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                candidate = self._goto[fallback].get(char, 0)
+                self._fail[nxt] = candidate if candidate != nxt else 0
+                self._output[nxt] = self._output[nxt] + self._output[self._fail[nxt]]
+
+    def find(self, text):
+        """Distinct patterns found in text, in order of first occurrence"""
+        found = []
+        seen = set()
+        state = 0
+        goto, fail, output = self._goto, self._fail, self._output
+        for char in text:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            for pattern in output[state]:
+                if pattern not in seen:
+                    seen.add(pattern)
+                    found.append(pattern)
+        return found
+
+
+class SkillMatcher:
+    """Compiled view of the user's skills"""
+
+    def __init__(self, user_skills, aliases=SKILL_ALIASES):
+        self.user_skills = [s.lower().strip() for s in user_skills if s and s.strip()]
+        self._exact = set(self.user_skills)
+        # normalized form (and normalized aliases) -> user skill
+        self._normalized = {}
+        for skill in self.user_skills:
+            self._normalized.setdefault(normalize(skill), skill)
+        for group in aliases:
+            owner = next((self._normalized[normalize(name)] for name in group if normalize(name) in self._normalized), None)
+            if owner:
+                for name in group:
+                    self._normalized.setdefault(normalize(name), owner)
+        # every substring of a user skill -> that skill ("react" matches user skill "react native")
+        self._substrings = {}
+        for skill in self.user_skills:
+            for start in range(len(skill)):
+                for end in range(start + 1, len(skill) + 1):
+                    self._substrings.setdefault(skill[start:end], skill)
+        # user skills contained in a required skill or in free text
+        self._automaton = AhoCorasick(self.user_skills)
+        self._memo = {}
+
+    def match_skill(self, required):
+        """User skill matching one required skill name, or None"""
+        required = required.lower().strip()
+        if not required:
+            return None
+        if required in self._memo:
+            return self._memo[required]
+        if required in self._exact:
+            matched = required
+        elif required in self._substrings:
+            matched = self._substrings[required]
+        else:
+            contained = self._automaton.find(required)
+            if contained:
+                matched = contained[0]
+            else:
+                matched = self._normalized.get(normalize(required))
+        self._memo[required] = matched
+        return matched
+
+    def scan_text(self, text):
+        """User skills appearing anywhere in text (one pass, case-insensitive)"""
+        return self._automaton.find(text.lower())
+
+    def match_project(self, project):
+        """Match a project. Returns (matched, missing, source)
+
+        matched is a list of (required_skill, user_skill) pairs; source is 'jobs' when
+        the project lists skills and 'text' when the title/description was scanned.
+        """
+        required_skills = [j.get('name', '').lower().strip() for j in project.get('jobs', []) or []]
+        required_skills = [s for s in required_skills if s]
+        if not required_skills:
+            text = f"{project.get('title', '')[:50]} {project.get('description', '')}"
+            return [(skill, skill) for skill in self.scan_text(text)], [], 'text'
+        matched = []
+        missing = []
+        for required in required_skills:
+            user_skill = self.match_skill(required)
+            if user_skill:
+                matched.append((required, user_skill))
+            else:
+                missing.append(required)
+        return matched, missing, 'jobs'
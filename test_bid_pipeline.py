@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the asyncio bid pipeline
+"""
+import unittest
+import asyncio
+import threading
+import time
+import sys
+import os
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bid_pipeline import BidPipeline, Stage
+
+
+class TestBidPipeline(unittest.TestCase):
+    """Test stage wiring, concurrency limits and drops"""
+
+    def run_pipeline(self, pipeline, seconds=0.5):
+        async def runner():
+            try:
+                await asyncio.wait_for(pipeline.run(), timeout=seconds)
+            except asyncio.TimeoutError:
+                pass
+        asyncio.run(runner())
+
+    def test_burst_respects_stage_concurrency(self):
+        """A burst of matches never runs more generate calls at once than its worker count"""
+        projects = [{'id': i, 'title': f'Project {i}'} for i in range(12)]
+        batches = [projects]
+        lock = threading.Lock()
+        state = {'active': 0, 'peak': 0}
+        placed = []
+
+        def fetch():
+            return (batches.pop() if batches else []), False
+
+        def generate(item):
+            with lock:
+                state['active'] += 1
+                state['peak'] = max(state['peak'], state['active'])
+            time.sleep(0.02)
+            with lock:
+                state['active'] -= 1
+            item.message = f"message {item.pid}"
+            return True
+
+        def place(item):
+            placed.append(item.pid)
+            return True
+
+        pipeline = BidPipeline(
+            fetch=fetch,
+            screen=lambda found: found,
+            stages=[Stage('generate', generate, workers=2), Stage('place', place, workers=1)],
+            poll_interval=0.01,
+            queue_size=12,
+        )
+        self.run_pipeline(pipeline)
+
+        self.assertEqual(sorted(placed), list(range(12)))
+        self.assertLessEqual(state['peak'], 2, "generate stage should never exceed 2 workers")
+        stats = pipeline.stats()
+        self.assertEqual(stats['stages']['generate']['processed'], 12)
+        self.assertEqual(stats['time_to_bid']['processed'], 12)
+
+    def test_failed_stage_drops_item(self):
+        """Falsy results and exceptions stop the item from reaching later stages"""
+        batches = [[{'id': 1, 'title': 'ok'}, {'id': 2, 'title': 'drop'}, {'id': 3, 'title': 'boom'}]]
+        placed = []
+
+        def generate(item):
+            if item.pid == 3:
+                raise RuntimeError("LLM exploded")
+            return item.pid != 2
+
+        pipeline = BidPipeline(
+            fetch=lambda: ((batches.pop() if batches else []), False),
+            screen=lambda found: found,
+            stages=[Stage('generate', generate), Stage('place', lambda item: placed.append(item.pid) or True)],
+            poll_interval=0.01,
+        )
+        self.run_pipeline(pipeline, seconds=0.3)
+
+        self.assertEqual(placed, [1])
+        generate_stats = pipeline.stats()['stages']['generate']
+        self.assertEqual(generate_stats['dropped'], 2)
+        self.assertEqual(generate_stats['errors'], 1)
+
+    def test_full_queue_keeps_highest_priority(self):
+        """A burst bigger than the queue keeps the best items and runs them best-first"""
+        batches = [[{'id': i, 'value': v} for i, v in enumerate([5, 1, 9, 3, 7, 2])]]
+        order = []
+
+        def select(item):
+            order.append(item.project['value'])
+            return True
+
+        pipeline = BidPipeline(
+            fetch=lambda: ((batches.pop() if batches else []), False),
+            screen=lambda found: found,
+            stages=[Stage('select', select, workers=1)],
+            poll_interval=0.01,
+            queue_size=3,
+            priority=lambda project: project['value'],
+        )
+        self.run_pipeline(pipeline, seconds=0.6)
+
+        # The whole cycle is queued at once, so only the best three of six fit
+        self.assertEqual(order, [9, 7, 5])
+        self.assertEqual(pipeline.stats()['stages']['select']['queue_dropped'], 3)
+
+    def test_stale_items_skip_expensive_stages(self):
+        """Items past their deadline are dropped before the next stage and counted"""
+        now = time.time()
+        batches = [[{'id': 1, 'deadline': now + 60}, {'id': 2, 'deadline': now - 1}]]
+        generated = []
+
+        pipeline = BidPipeline(
+            fetch=lambda: ((batches.pop() if batches else []), False),
+            screen=lambda found: found,
+            stages=[Stage('generate', lambda item: generated.append(item.pid) or True)],
+            poll_interval=0.01,
+            deadline=lambda project: project['deadline'],
+        )
+        self.run_pipeline(pipeline, seconds=0.3)
+
+        self.assertEqual(generated, [1])
+        self.assertEqual(pipeline.stats()['stages']['generate']['stale'], 1)
+
+    def test_batch_runs_once_over_queued_items_in_time(self):
+        """A batching stage hands the queued items still in time to one batch call"""
+        now = time.time()
+        batches = [[{'id': i, 'deadline': now + (60 if i != 2 else -1)} for i in range(5)]]
+        calls = []
+        selected = []
+
+        def select(item):
+            selected.append((item.pid, item.template))
+            return True
+
+        def batch(items):
+            calls.append(sorted(item.pid for item in items))
+            for item in items:
+                item.template = f"batched {item.pid}"
+
+        pipeline = BidPipeline(
+            fetch=lambda: ((batches.pop() if batches else []), False),
+            screen=lambda found: found,
+            stages=[Stage('select', select, workers=2, batch=batch, batch_size=10)],
+            poll_interval=0.01,
+            deadline=lambda project: project['deadline'],
+        )
+        self.run_pipeline(pipeline, seconds=0.3)
+
+        self.assertEqual(calls, [[0, 1, 3, 4]])
+        self.assertEqual(sorted(selected), [(pid, f"batched {pid}") for pid in (0, 1, 3, 4)])
+        stats = pipeline.stats()['stages']['select']
+        self.assertEqual((stats['batches'], stats['stale']), (1, 1))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the bidder's WAL store and its group-committing writer
+"""
+import unittest
+import sqlite3
+import sys
+import os
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bid_store import BidStore
+from dedupe import ProcessedStore, SeenCache
+
+
+class TestBidStore(unittest.TestCase):
+    """Writes are group-committed, isolated per unit and don't block readers"""
+
+    def setUp(self):
+        handle, self.path = tempfile.mkstemp(suffix='.db')
+        os.close(handle)
+        conn = sqlite3.connect(self.path)
+        conn.execute("CREATE TABLE bids (project_id INTEGER PRIMARY KEY, title TEXT)")
+        conn.execute("CREATE TABLE prompts (id INTEGER PRIMARY KEY, stats_bids INTEGER DEFAULT 0)")
+        conn.execute("INSERT INTO prompts (id) VALUES (1)")
+        conn.execute("CREATE TABLE processed_projects (project_id INTEGER PRIMARY KEY, processed_at REAL NOT NULL, outcome TEXT NOT NULL)")
+        conn.commit()
+        conn.close()
+        self.store = BidStore(self.path, linger=0.05).start()
+
+    def tearDown(self):
+        self.store.close()
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(self.path + suffix):
+                os.remove(self.path + suffix)
+
+    def test_wal_and_group_commit(self):
+        reader = sqlite3.connect(self.path)
+        self.assertEqual(reader.execute("PRAGMA journal_mode").fetchone()[0], 'wal')
+        reader.close()
+        futures = [self.store.write_all([("INSERT INTO bids VALUES (?, ?)", (i, f"p{i}")),
+                                         ("UPDATE prompts SET stats_bids = stats_bids + 1 WHERE id = 1", ())])
+                   for i in range(50)]
+        for future in futures:
+            future.result(5)
+        self.assertEqual(self.store.read("SELECT COUNT(*) FROM bids")[0][0], 50)
+        self.assertEqual(self.store.read("SELECT stats_bids FROM prompts")[0][0], 50)
+        stats = self.store.stats()
+        self.assertLess(stats['commits'], 50)
+        self.assertEqual(stats['statements'], 100)
+
+    def test_failed_unit_does_not_affect_others(self):
+        good = self.store.write("INSERT INTO bids VALUES (1, 'a')")
+        bad = self.store.write_all([("INSERT INTO bids VALUES (2, 'b')", ()), ("INSERT INTO missing VALUES (1)", ())])
+        later = self.store.write("INSERT INTO bids VALUES (3, 'c')")
+        good.result(5)
+        later.result(5)
+        with self.assertRaises(sqlite3.OperationalError):
+            bad.result(5)
+        self.assertEqual([row[0] for row in self.store.read("SELECT project_id FROM bids ORDER BY 1")], [1, 3])
+        self.assertEqual(self.store.stats()['errors'], 1)
+
+    def test_reader_not_blocked_by_open_write_transaction(self):
+        blocker = sqlite3.connect(self.path, isolation_level=None)
+        blocker.execute("BEGIN IMMEDIATE")
+        blocker.execute("INSERT INTO bids VALUES (99, 'uncommitted')")
+        done = threading.Event()
+        result = []
+
+        def read():
+            result.append(self.store.read("SELECT COUNT(*) FROM bids")[0][0])
+            done.set()
+
+        threading.Thread(target=read).start()
+        self.assertTrue(done.wait(2))
+        self.assertEqual(result, [0])
+        blocker.execute("ROLLBACK")
+        blocker.close()
+
+    def test_writes_racing_close_always_resolve(self):
+        futures = []
+        stop = threading.Event()
+
+        def write():
+            while not stop.is_set():
+                futures.append(self.store.write("INSERT INTO bids VALUES (?, 'x')", (len(futures),)))
+
+        writer = threading.Thread(target=write)
+        writer.start()
+        time.sleep(0.05)
+        self.store.close()
+        time.sleep(0.05)
+        stop.set()
+        writer.join()
+        outcomes = {type(future.exception(timeout=1)) for future in futures}
+        self.assertEqual(outcomes, {type(None), RuntimeError})
+
+    def test_processed_store_queues_through_writer(self):
+        processed = ProcessedStore(store=self.store)
+        processed.record({1: 'matched', 2: 'skipped'}, now=1000.0)
+        processed.mark_bid(3, now=1000.0)
+        self.store.flush(5)
+        seen = SeenCache(ttl_seconds=10 ** 12)
+        recent, total_bids = ProcessedStore(store=self.store).load(seen, now=1001.0)
+        self.assertEqual((recent, total_bids), (3, 1))
+        self.assertTrue(processed.already_bid(3))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the API server's read-only connection pool
+"""
+import unittest
+import sqlite3
+import sys
+import os
+import tempfile
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from db_pool import ReadPool, PoolTimeout, snapshot
+
+
+class TestReadPool(unittest.TestCase):
+    """Connections are reused, read-only and don't block on the writer"""
+
+    def setUp(self):
+        handle, self.path = tempfile.mkstemp(suffix='.db')
+        os.close(handle)
+        self.writer = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False)
+        self.writer.execute("PRAGMA journal_mode=WAL")
+        self.writer.execute("CREATE TABLE bids (project_id INTEGER PRIMARY KEY)")
+        self.writer.execute("INSERT INTO bids VALUES (1)")
+        self.pool = ReadPool(self.path, size=2, timeout=0.1)
+
+    def tearDown(self):
+        self.pool.close()
+        self.writer.close()
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(self.path + suffix):
+                os.remove(self.path + suffix)
+
+    def test_connections_are_reused_and_read_only(self):
+        with self.pool.connection() as first:
+            with self.assertRaises(sqlite3.OperationalError):
+                first.execute("INSERT INTO bids VALUES (2)")
+        with self.pool.connection() as second:
+            self.assertIs(second, first)
+        stats = self.pool.stats()
+        self.assertEqual((stats['checkouts'], stats['open'], stats['in_use']), (2, 1, 0))
+
+    def test_waits_and_timeouts_are_counted(self):
+        a = self.pool.acquire()
+        b = self.pool.acquire()
+        with self.assertRaises(PoolTimeout):
+            self.pool.acquire()
+        threading.Timer(0.02, self.pool.release, args=(a,)).start()
+        self.assertIs(self.pool.acquire(timeout=1), a)
+        self.pool.release(a)
+        self.pool.release(b)
+        stats = self.pool.stats()
+        self.assertEqual((stats['waits'], stats['timeouts'], stats['open']), (1, 1, 2))
+        self.assertGreater(stats['max_wait_ms'], 0)
+
+    def test_snapshot_is_consistent_while_writer_commits(self):
+        with self.pool.connection() as conn:
+            with snapshot(conn):
+                before = conn.execute("SELECT COUNT(*) FROM bids").fetchone()[0]
+                self.writer.execute("BEGIN IMMEDIATE")
+                self.writer.execute("INSERT INTO bids VALUES (2)")
+                self.writer.execute("COMMIT")
+                during = conn.execute("SELECT COUNT(*) FROM bids").fetchone()[0]
+            after = conn.execute("SELECT COUNT(*) FROM bids").fetchone()[0]
+        self.assertEqual((before, during, after), (1, 1, 2))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+Unit tests for project dedupe structures
+"""
+import unittest
+import sqlite3
+import tempfile
+import threading
+import sys
+import os
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from dedupe import SeenCache, BloomFilter, ProcessedStore
+from bid_store import BidStore
+from migrations import migrate
+
+
+class TestSeenCache(unittest.TestCase):
+    """Test TTL expiry, capacity eviction and counters"""
+
+    def test_hit_and_miss_counters(self):
+        cache = SeenCache(ttl_seconds=60, capacity=10)
+        cache.add(1, ts=1000)
+        self.assertTrue(cache.seen(1, now=1010))
+        self.assertFalse(cache.seen(2, now=1010))
+        stats = cache.stats()
+        self.assertEqual((stats['hits'], stats['misses']), (1, 1))
+
+    def test_expire_pops_only_old_entries(self):
+        cache = SeenCache(ttl_seconds=60, capacity=10)
+        for pid, ts in [(1, 1000), (2, 1030), (3, 1090)]:
+            cache.add(pid, ts=ts)
+        self.assertEqual(cache.expire(now=1095), 2)
+        self.assertEqual(len(cache), 1)
+        self.assertTrue(cache.seen(3, now=1095))
+
+    def test_lookup_of_stale_entry_is_a_miss(self):
+        cache = SeenCache(ttl_seconds=60, capacity=10)
+        cache.add(1, ts=1000)
+        self.assertFalse(cache.seen(1, now=1100))
+        self.assertEqual(cache.stats()['expirations'], 1)
+
+    def test_capacity_evicts_oldest(self):
+        cache = SeenCache(ttl_seconds=3600, capacity=3)
+        for pid in range(5):
+            cache.add(pid, ts=1000 + pid)
+        self.assertEqual(len(cache), 3)
+        self.assertFalse(cache.seen(0, now=1010))
+        self.assertTrue(cache.seen(4, now=1010))
+        self.assertEqual(cache.stats()['evictions'], 2)
+
+    def test_re_add_refreshes_position(self):
+        cache = SeenCache(ttl_seconds=3600, capacity=2)
+        cache.add(1, ts=1000)
+        cache.add(2, ts=1001)
+        cache.add(1, ts=1002)
+        cache.add(3, ts=1003)
+        self.assertTrue(cache.seen(1, now=1004))
+        self.assertFalse(cache.seen(2, now=1004))
+
+    def test_concurrent_add_lookup_and_expire(self):
+        cache = SeenCache(ttl_seconds=0.001, capacity=50)
+        errors = []
+
+        def hammer(work):
+            try:
+                for i in range(5000):
+                    work(i)
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=hammer, args=(work,)) for work in
+                   (cache.add, lambda i: cache.seen(i), lambda i: cache.expire())]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+        self.assertLessEqual(len(cache), 50)
+
+
+class TestBloomFilter(unittest.TestCase):
+    """Test membership and false-positive rate"""
+
+    def test_no_false_negatives_and_low_false_positives(self):
+        bloom = BloomFilter(capacity=2000, error_rate=0.01)
+        for pid in range(2000):
+            bloom.add(pid)
+        self.assertTrue(all(pid in bloom for pid in range(2000)))
+        false_positives = sum(1 for pid in range(100000, 110000) if pid in bloom)
+        self.assertLess(false_positives / 10000, 0.03)
+
+    def test_concurrent_adds_lose_no_bits(self):
+        bloom = BloomFilter(capacity=200, error_rate=0.01)
+        threads = [threading.Thread(target=lambda start=start: [bloom.add(pid) for pid in range(start, 8000, 8)])
+                   for start in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(bloom.count, 8000)
+        self.assertTrue(all(pid in bloom for pid in range(8000)))
+
+
+class TestProcessedStore(unittest.TestCase):
+    """Test that dedupe state survives a simulated restart"""
+
+    def setUp(self):
+        handle, self.db_path = tempfile.mkstemp(suffix='.db')
+        os.close(handle)
+        migrate(self.db_path)
+        conn = sqlite3.connect(self.db_path)
+        conn.execute("INSERT INTO bids (project_id, title) VALUES (7, 'legacy bid')")
+        conn.commit()
+        conn.close()
+        self.stores = []
+
+    def tearDown(self):
+        for store in self.stores:
+            store.close()
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(self.db_path + suffix):
+                os.remove(self.db_path + suffix)
+
+    def make_store(self):
+        """A fresh process: new BidStore writer and reader, nothing carried over in memory"""
+        for store in self.stores:
+            store.close()
+        self.stores.append(BidStore(self.db_path, linger=0.0).start())
+        return ProcessedStore(store=self.stores[-1])
+
+    def test_restart_restores_seen_and_bids(self):
+        store = self.make_store()
+        store.load(SeenCache(ttl_seconds=3600))
+        store.record({1: 'skipped', 2: 'matched'}, now=10000)
+        store.mark_bid(2, now=10000)
+        store.record({2: 'matched'}, now=10001)  # a later 'matched' must not downgrade 'bid'
+
+        restarted = self.make_store()
+        seen = SeenCache(ttl_seconds=3600)
+        recent, total_bids = restarted.load(seen, now=10100)
+        self.assertEqual(recent, 2)
+        self.assertTrue(seen.seen(1, now=10100))
+        self.assertEqual(total_bids, 2)
+        self.assertTrue(restarted.already_bid(2))
+        self.assertTrue(restarted.already_bid(7), "bids table rows count as past bids")
+        self.assertFalse(restarted.already_bid(1))
+
+    def test_throttled_projects_are_screened_again(self):
+        store = self.make_store()
+        store.record({1: 'matched', 2: 'matched'}, now=10000)
+        store.record({2: 'throttled'}, now=10001)
+        seen = SeenCache(ttl_seconds=3600)
+        recent, _ = self.make_store().load(seen, now=10100)
+        self.assertEqual(recent, 1)
+        self.assertTrue(seen.seen(1, now=10100))
+        self.assertFalse(seen.seen(2, now=10100))
+        seen.discard(1)
+        seen.discard(99)
+        self.assertEqual(len(seen), 0)
+
+    def test_recent_bids_answer_before_the_bloom_filter(self):
+        store = self.make_store()
+        store.mark_bid(5, now=10000)
+        store.bid_filter = BloomFilter()  # as if the bit had been lost
+        self.assertTrue(store.already_bid(5))
+        self.assertEqual(store.db_confirmations, 0)
+
+    def test_expired_rows_are_not_reloaded(self):
+        store = self.make_store()
+        store.record({1: 'skipped'}, now=1000)
+        seen = SeenCache(ttl_seconds=60)
+        recent, _ = store.load(seen, now=5000)
+        self.assertEqual(recent, 0)
+        self.assertFalse(seen.seen(1, now=5000))
+
+
+if __name__ == '__main__':
+    unittest.main()
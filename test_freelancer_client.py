@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the pooled Freelancer HTTP session
+"""
+import unittest
+import threading
+import sys
+import os
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import freelancer_client
+from freelancer_client import PooledHTTPSession, ClientStats
+
+
+class KeepAliveHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        status = 404 if self.path.startswith('/missing') else 200
+        body = b'{"status": "success"}'
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class FakeAdapter(requests.adapters.HTTPAdapter):
+    """Records the timeout each request is sent with instead of sending it"""
+
+    def __init__(self):
+        super().__init__()
+        self.timeouts = []
+
+    def send(self, request, timeout=None, **kwargs):
+        self.timeouts.append(timeout)
+        response = requests.Response()
+        response.status_code = 200
+        response.request = request
+        response.url = request.url
+        return response
+
+
+class TestPooledHTTPSession(unittest.TestCase):
+    """Every call gets a timeout, the pool is capped, and connections are reused"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), KeepAliveHandler)
+        cls.thread = threading.Thread(target=cls.server.serve_forever, daemon=True)
+        cls.thread.start()
+        cls.base_url = f"http://127.0.0.1:{cls.server.server_address[1]}"
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        self.session = PooledHTTPSession(pool_size=3, timeout=(1.5, 7))
+
+    def tearDown(self):
+        self.session.close()
+
+    def test_default_timeout_applied_unless_given(self):
+        adapter = FakeAdapter()
+        self.session.mount('https://', adapter)
+        self.session.get('https://www.freelancer.com/api/projects/0.1/projects/')
+        self.session.post('https://www.freelancer.com/api/projects/0.1/bids/', json={})
+        self.session.get('https://www.freelancer.com/api/users/0.1/self/', timeout=2)
+        self.assertEqual(adapter.timeouts, [(1.5, 7), (1.5, 7), 2])
+
+    def test_pool_is_capped_and_blocking(self):
+        pool = self.session.adapter.poolmanager.connection_from_url(self.base_url)
+        self.assertTrue(pool.block)
+        self.assertEqual(pool.pool.maxsize, 3)
+
+    def test_connections_are_reused(self):
+        for path in ('/a', '/b/1', '/b/2', '/missing'):
+            self.session.get(self.base_url + path)
+        self.assertEqual(self.session.connection_stats(),
+                         {'requests': 4, 'new_connections': 1, 'reused_connections': 3})
+        endpoints = freelancer_client.stats.snapshot()
+        self.assertEqual(endpoints[f'GET {self.base_url}/b/{{id}}']['count'], 2)
+        self.assertEqual(endpoints[f'GET {self.base_url}/missing']['errors'], 1)
+
+    def test_endpoint_key_collapses_ids(self):
+        self.assertEqual(ClientStats.endpoint_key('get', 'https://www.freelancer.com/api/users/0.1/users/123/?x=1'),
+                         'GET /api/users/0.1/users/{id}/')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the rate-limited LLM client
+"""
+import unittest
+import threading
+import time
+import sys
+import os
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from llm_client import LLMClient, HedgedLLM, LLMThrottled, LLMTimeout, TokenBucket
+
+
+class ApiError(Exception):
+    def __init__(self, code):
+        super().__init__(f"{code} error")
+        self.code = code
+
+
+class Usage:
+    prompt_token_count = 120
+    candidates_token_count = 40
+
+
+class Response:
+    usage_metadata = Usage()
+
+    def __init__(self, text):
+        self.text = text
+
+
+class FakeModel:
+    """Raises the queued errors in order, then answers"""
+
+    def __init__(self, errors=(), delay=0.0):
+        self.errors = list(errors)
+        self.delay = delay
+        self.calls = 0
+        self.active = 0
+        self.peak = 0
+        self.lock = threading.Lock()
+
+    def generate_content(self, prompt, request_options=None, generation_config=None):
+        with self.lock:
+            self.calls += 1
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        try:
+            time.sleep(self.delay)
+            if self.errors:
+                raise self.errors.pop(0)
+            return Response(f"reply to {prompt}")
+        finally:
+            with self.lock:
+                self.active -= 1
+
+
+class TestLLMClient(unittest.TestCase):
+    """Retries, throttling, concurrency and histograms"""
+
+    def client(self, model, **kwargs):
+        options = dict(requests_per_minute=6000, burst=10, max_in_flight=4, timeout=2, max_retries=3, backoff_base=0.01)
+        options.update(kwargs)
+        return LLMClient(model, **options)
+
+    def test_retries_429_and_5xx_then_succeeds(self):
+        model = FakeModel([ApiError(429), ApiError(503)])
+        client = self.client(model)
+        self.assertEqual(client.generate('hi', purpose='generation'), 'reply to hi')
+        stats = client.stats()['generation']
+        self.assertEqual((model.calls, stats['retries']), (3, 2))
+        self.assertEqual(stats['input_tokens']['avg'], 120)
+        self.assertEqual(stats['latency_seconds']['count'], 1)
+
+    def test_persistent_429_raises_throttled(self):
+        client = self.client(FakeModel([ApiError(429)] * 5), max_retries=2)
+        with self.assertRaises(LLMThrottled):
+            client.generate('hi', purpose='selection')
+        self.assertEqual(client.stats()['selection']['throttled'], 1)
+
+    def test_non_retryable_errors_are_raised_once(self):
+        model = FakeModel([ApiError(400)])
+        with self.assertRaises(ApiError):
+            self.client(model).generate('hi')
+        self.assertEqual(model.calls, 1)
+
+    def test_empty_bucket_throttles_instead_of_waiting_past_deadline(self):
+        client = self.client(FakeModel(), requests_per_minute=1, burst=1)
+        client.generate('first')
+        with self.assertRaises(LLMThrottled):
+            client.generate('second', timeout=0.2)
+
+    def test_in_flight_cap(self):
+        model = FakeModel(delay=0.05)
+        client = self.client(model, max_in_flight=2)
+        threads = [threading.Thread(target=client.generate, args=(f"p{i}",)) for i in range(6)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(model.calls, 6)
+        self.assertLessEqual(model.peak, 2)
+
+    def test_stats_exact_under_concurrent_calls(self):
+        client = self.client(FakeModel(), requests_per_minute=10 ** 6, burst=10 ** 6, max_in_flight=8)
+
+        def call():
+            for i in range(200):
+                client.generate(f"p{i}", purpose='selection')
+
+        threads = [threading.Thread(target=call) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        stats = client.stats()['selection']
+        self.assertEqual((stats['calls'], stats['latency_seconds']['count'], stats['output_tokens']['count']),
+                         (1600, 1600, 1600))
+
+    def test_deadline_timeout(self):
+        client = self.client(FakeModel([ApiError(503)] * 10, delay=0.1), max_retries=10)
+        with self.assertRaises(LLMTimeout):
+            client.generate('slow', timeout=0.3)
+
+    def test_token_bucket_refills(self):
+        bucket = TokenBucket(rate=20, capacity=1)
+        self.assertTrue(bucket.acquire(time.monotonic()))
+        self.assertFalse(bucket.acquire(time.monotonic()))
+        self.assertTrue(bucket.acquire(time.monotonic() + 0.2))
+
+
+
+class TestHedgedLLM(unittest.TestCase):
+    """Hedging to the fast model and the hard deadline"""
+
+    def client(self, model):
+        return LLMClient(model, requests_per_minute=6000, burst=10, timeout=5, backoff_base=0.01)
+
+    def test_fast_primary_is_not_hedged(self):
+        hedged = HedgedLLM(self.client(FakeModel()), self.client(FakeModel()), default_delay=0.5)
+        self.assertEqual(hedged.generate('hi'), ('reply to hi', 'primary'))
+        self.assertEqual(hedged.stats()['hedged'], 0)
+
+    def test_slow_primary_is_hedged(self):
+        fast = FakeModel(delay=0.01)
+        hedged = HedgedLLM(self.client(FakeModel(delay=1.0)), self.client(fast), default_delay=0.05, deadline=2)
+        start = time.monotonic()
+        self.assertEqual(hedged.generate('hi'), ('reply to hi', 'hedge'))
+        self.assertLess(time.monotonic() - start, 0.5)
+        stats = hedged.stats()
+        self.assertEqual((stats['hedged'], stats['hedge_wins'], stats['hedge_rate']), (1, 1, 1.0))
+
+    def test_failed_primary_hedges_immediately(self):
+        hedged = HedgedLLM(self.client(FakeModel([ApiError(400)])), self.client(FakeModel()), default_delay=5)
+        self.assertEqual(hedged.generate('hi')[1], 'hedge')
+
+    def test_hedge_delay_reads_primary_latency_while_it_records(self):
+        primary = LLMClient(FakeModel(), requests_per_minute=10 ** 6, burst=10 ** 6, max_in_flight=8)
+        hedged = HedgedLLM(primary, default_delay=7.0, min_samples=50)
+        self.assertEqual(hedged.hedge_delay('generation'), 7.0)
+        errors = []
+        done = threading.Event()
+
+        def call():
+            for i in range(300):
+                primary.generate(f"p{i}")
+
+        def read():
+            while not done.is_set():
+                try:
+                    hedged.hedge_delay('generation')
+                except Exception as e:  # e.g. deque mutated during iteration
+                    errors.append(e)
+                    return
+
+        threads = [threading.Thread(target=call) for _ in range(4)]
+        reader = threading.Thread(target=read)
+        reader.start()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        done.set()
+        reader.join()
+        self.assertEqual(errors, [])
+        self.assertLess(hedged.hedge_delay('generation'), 7.0)
+
+    def test_hard_deadline(self):
+        hedged = HedgedLLM(self.client(FakeModel(delay=1.0)), self.client(FakeModel(delay=1.0)),
+                           default_delay=0.05, deadline=0.2)
+        with self.assertRaises(LLMTimeout):
+            hedged.generate('hi')
+        self.assertEqual(hedged.stats()['deadline_misses'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
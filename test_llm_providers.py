@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Unit tests for LLM providers and per-purpose routing
+"""
+import unittest
+import json
+import threading
+import sys
+import os
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from llm_client import LLMClient
+from llm_providers import StubProvider, GeminiProvider, ProviderRouter, parse_provider_spec
+
+
+class FailingProvider:
+    name = 'failing'
+
+    def __init__(self):
+        self.calls = 0
+
+    def generate_content(self, prompt, request_options=None, generation_config=None):
+        self.calls += 1
+        raise ValueError("provider down")
+
+
+def client(provider):
+    return LLMClient(provider, requests_per_minute=60000, burst=100, timeout=5, max_retries=0)
+
+
+class TestStubProvider(unittest.TestCase):
+    """Deterministic answers in each format the autobidder parses"""
+
+    def test_formats(self):
+        stub = StubProvider()
+        selection = "Respond with ONLY the number (1-3) ... strategy (by number 1-3)"
+        self.assertIn(stub.generate_content(selection).text, {'1', '2', '3'})
+        self.assertEqual(stub.generate_content(selection).text, stub.generate_content(selection).text)
+        combined = 'Title: Shop app\nRespond with ONLY a JSON object: {"strategy": <number 1-2>, "message": "..."}'
+        data = json.loads(stub.generate_content(combined).text)
+        self.assertIn(data['strategy'], (1, 2))
+        self.assertIn('Shop app', data['message'])
+        batch = "PROJECT 1\nTitle: a\n\nPROJECT 2\nTitle: b\nstrategy (by number 1-4)\nmapping project number to strategy number"
+        self.assertEqual(set(json.loads(stub.generate_content(batch).text)), {'1', '2'})
+
+    def test_specs(self):
+        self.assertIsInstance(parse_provider_spec('stub'), StubProvider)
+        self.assertEqual(parse_provider_spec('stub:0.5').latency, 0.5)
+        self.assertEqual(parse_provider_spec('gemini:gemini-2.5-flash').model_name, 'gemini-2.5-flash')
+        self.assertIsInstance(parse_provider_spec('gemini-2.5-pro'), GeminiProvider)
+
+
+class TestProviderRouter(unittest.TestCase):
+    """Latency/error based choice and failover"""
+
+    def test_prefers_faster_provider(self):
+        router = ProviderRouter({'selection': [('slow', client(StubProvider('slow', latency=0.05))),
+                                               ('fast', client(StubProvider('fast')))]}, default='selection',
+                                explore_every=0)
+        for _ in range(4):
+            router.generate('hello', purpose='selection')
+        stats = router.stats()['selection']
+        self.assertEqual(stats['slow']['calls'], 1)
+        self.assertEqual(stats['fast']['calls'], 3)
+
+    def test_fails_over_and_penalizes_errors(self):
+        failing = FailingProvider()
+        router = ProviderRouter({'generation': [('failing', client(failing)), ('stub', client(StubProvider()))]},
+                                explore_every=0)
+        self.assertTrue(router.generate('Title: x').startswith('[stub]'))
+        router.generate('Title: y')
+        self.assertEqual(failing.calls, 1)
+        self.assertGreater(router.stats()['generation']['failing']['ewma_error_rate'], 0)
+        # Unknown purposes use the default route
+        self.assertTrue(router.generate('Title: z', purpose='other').startswith('[stub]'))
+
+    def test_latency_counts_every_concurrent_call(self):
+        router = ProviderRouter({'generation': [('stub', LLMClient(StubProvider(), requests_per_minute=10 ** 6,
+                                                                   burst=10 ** 6, max_in_flight=8))]})
+        self.assertIsNone(router.latency_percentile('generation', 90))
+
+        def call():
+            for i in range(200):
+                router.generate(f"Title: {i}")
+
+        threads = [threading.Thread(target=call) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(router._latency['generation'].count, 1600)
+        self.assertIsNotNone(router.latency_percentile('generation', 90, min_samples=1600))
+        self.assertIsNone(router.latency_percentile('generation', 90, min_samples=1601))
+
+
+if __name__ == '__main__':
+    unittest.main()
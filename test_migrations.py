@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the versioned schema migrations
+"""
+import unittest
+import sqlite3
+import sys
+import os
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from migrations import migrate, current_version, MIGRATIONS, LATEST_VERSION
+from prompt_registry import template_hash
+
+
+def columns(conn, table):
+    return {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+
+
+class TestMigrations(unittest.TestCase):
+    """migrate() brings any bids.db to the latest schema exactly once"""
+
+    def setUp(self):
+        handle, self.path = tempfile.mkstemp(suffix='.db')
+        os.close(handle)
+
+    def tearDown(self):
+        for suffix in ('', '-wal', '-shm', '-journal'):
+            if os.path.exists(self.path + suffix):
+                os.remove(self.path + suffix)
+
+    def test_fresh_database_gets_latest_schema(self):
+        applied = migrate(self.path)
+        self.assertEqual([version for version, _ in applied], [version for version, _, _ in MIGRATIONS])
+        conn = sqlite3.connect(self.path)
+        self.assertEqual(current_version(conn), LATEST_VERSION)
+        self.assertTrue({'bid_message', 'prompt_hash', 'currency_code', 'prompt_id', 'reply_count',
+                         'project_skills'} <= columns(conn, 'bids'))
+        self.assertTrue({'description', 'prompt_hash'} <= columns(conn, 'prompts'))
+        self.assertEqual(conn.execute("SELECT version FROM prompt_versions").fetchone(), (0,))
+        conn.execute("INSERT INTO processed_projects VALUES (1, 0.0, 'bid')")
+        conn.close()
+
+    def test_legacy_database_is_upgraded_in_place(self):
+        conn = sqlite3.connect(self.path)
+        conn.execute("CREATE TABLE bids (project_id INTEGER PRIMARY KEY, title TEXT, bid_amount REAL, "
+                     "status TEXT DEFAULT 'applied', outsource_cost REAL, profit REAL, applied_at TEXT, "
+                     "bid_message TEXT, reply_count INTEGER DEFAULT 0)")
+        conn.execute("INSERT INTO bids (project_id, title) VALUES (7, 'kept')")
+        conn.execute("CREATE TABLE prompts (id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT NOT NULL, "
+                     "template TEXT NOT NULL, is_active INTEGER DEFAULT 0)")
+        conn.execute("INSERT INTO prompts (name, template) VALUES ('old', 'Bid on {project_title}')")
+        conn.commit()
+        conn.close()
+
+        migrate(self.path)
+        conn = sqlite3.connect(self.path)
+        self.assertEqual(conn.execute("SELECT title, reply_count, currency_code FROM bids").fetchone(), ('kept', 0, None))
+        self.assertEqual(conn.execute("SELECT prompt_hash FROM prompts").fetchone()[0],
+                         template_hash('Bid on {project_title}'))
+        # The version counter trigger now tracks prompt edits
+        conn.execute("UPDATE prompts SET name = 'renamed'")
+        self.assertEqual(conn.execute("SELECT version FROM prompt_versions").fetchone(), (1,))
+        conn.close()
+
+    def test_second_run_is_a_no_op(self):
+        migrate(self.path)
+        self.assertEqual(migrate(self.path), [])
+        extra = MIGRATIONS + [(LATEST_VERSION + 1, 'extra', ["CREATE TABLE extra (id INTEGER)"])]
+        self.assertEqual(migrate(self.path, extra), [(LATEST_VERSION + 1, 'extra')])
+        self.assertEqual(migrate(self.path, extra), [])
+
+    def test_failed_migration_rolls_back(self):
+        broken = MIGRATIONS + [(LATEST_VERSION + 1, 'broken', ["CREATE TABLE half (id INTEGER)", "NOT SQL"])]
+        with self.assertRaises(sqlite3.OperationalError):
+            migrate(self.path, broken)
+        conn = sqlite3.connect(self.path)
+        self.assertFalse(conn.execute("SELECT name FROM sqlite_master WHERE name = 'half'").fetchone())
+        conn.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
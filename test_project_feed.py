@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the incremental project feed
+"""
+import unittest
+import json
+import sys
+import os
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import project_feed
+from project_feed import ProjectFeed, RateLimited, ACTIVE_PROJECTS_URL, PROJECTS_URL, DETAIL_BATCH_SIZE
+
+
+class Response:
+    def __init__(self, payload, status_code=200):
+        self.content = json.dumps(payload).encode()
+        self.text = self.content.decode()
+        self.status_code = status_code
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise RuntimeError(f"HTTP {self.status_code}")
+
+
+class FakeHTTP:
+    """Serves the active-projects listing newest first, and project details by id"""
+
+    def __init__(self):
+        self.projects = []
+        self.calls = []
+        self.status_code = 200
+
+    def post(self, count):
+        """Submit `count` new projects, one second apart"""
+        newest = self.projects[-1]['id'] if self.projects else 1000
+        for pid in range(newest + 1, newest + 1 + count):
+            self.projects.append({'id': pid, 'time_submitted': 1_700_000_000 + pid})
+
+    def get(self, url, params=None):
+        self.calls.append((url, dict(params)))
+        if self.status_code != 200:
+            return Response({}, self.status_code)
+        if url == PROJECTS_URL:
+            return Response({'result': {'projects': [{'id': pid, 'description': 'full'} for pid in params['projects[]']]}})
+        listing = [p for p in reversed(self.projects) if p['time_submitted'] >= params.get('from_time', 0)]
+        page = listing[params['offset']:params['offset'] + params['limit']]
+        return Response({'result': {'projects': page, 'total_count': len(listing)}})
+
+    def listing_calls(self):
+        return [params for url, params in self.calls if url == ACTIVE_PROJECTS_URL]
+
+
+class FakeSession:
+    def __init__(self, http):
+        self.session = http
+
+
+class TestProjectFeed(unittest.TestCase):
+    """poll() returns each project once and pages only while a whole page is new"""
+
+    def setUp(self):
+        self.http = FakeHTTP()
+        self._get_session = project_feed.get_session
+        project_feed.get_session = lambda oauth_token: FakeSession(self.http)
+        self.feed = ProjectFeed('token', page_size=3, max_pages=2, bootstrap_limit=10)
+        self.http.post(5)
+        self.bootstrap, _ = self.feed.poll()
+
+    def tearDown(self):
+        project_feed.get_session = self._get_session
+
+    def test_bootstrap_sets_watermark(self):
+        self.assertEqual([p['id'] for p in self.bootstrap], [1005, 1004, 1003, 1002, 1001])
+        self.assertEqual(self.http.listing_calls(), [{'limit': 10, 'offset': 0}])
+        self.assertEqual((self.feed.watermark_id, self.feed.watermark_time), (1005, 1_700_001_005))
+
+    def test_incremental_poll_pages_from_watermark(self):
+        self.http.post(4)
+        new, total = self.feed.poll()
+        self.assertEqual([p['id'] for p in new], [1009, 1008, 1007, 1006])
+        # from_time includes the watermark's own second, so 1005 comes back and is filtered out
+        self.assertEqual(total, 5)
+        calls = self.http.listing_calls()[1:]
+        self.assertEqual([(c['offset'], c['from_time']) for c in calls], [(0, 1_700_001_005), (3, 1_700_001_005)])
+        self.assertEqual((self.feed.watermark_id, self.feed.watermark_time), (1009, 1_700_001_009))
+        self.assertEqual(self.feed.last_cycle['pages'], 2)
+
+    def test_burst_stops_at_max_pages(self):
+        self.http.post(8)
+        with self.assertLogs('project_feed', 'INFO'):
+            new, _ = self.feed.poll()
+        self.assertEqual([p['id'] for p in new], [1013, 1012, 1011, 1010, 1009, 1008])
+        self.assertEqual(len(self.http.listing_calls()), 1 + self.feed.max_pages)
+        self.assertEqual(self.feed.watermark_id, 1013)
+        # The skipped older projects are behind the watermark now and never come back
+        self.assertEqual(self.feed.poll()[0], [])
+
+    def test_empty_poll_keeps_watermark(self):
+        for projects in ([], [{'id': 1001, 'time_submitted': 1_700_001_001}]):
+            with self.subTest(page=len(projects)):
+                self.http.projects = projects
+                new, _ = self.feed.poll()
+                self.assertEqual(new, [])
+                self.assertEqual((self.feed.watermark_id, self.feed.watermark_time), (1005, 1_700_001_005))
+
+    def test_rate_limited(self):
+        self.http.status_code = 429
+        with self.assertRaises(RateLimited):
+            self.feed.poll()
+        self.assertEqual(self.feed.watermark_id, 1005)
+
+    def test_fetch_details_in_batches(self):
+        ids = list(range(1, 2 * DETAIL_BATCH_SIZE + 21))
+        details = self.feed.fetch_details(ids)
+        self.assertEqual(sorted(details), ids)
+        batches = [params['projects[]'] for url, params in self.http.calls if url == PROJECTS_URL]
+        self.assertEqual([len(batch) for batch in batches], [DETAIL_BATCH_SIZE, DETAIL_BATCH_SIZE, 20])
+        self.assertEqual(sum(batches, []), ids)
+        self.assertTrue(all(params['full_description'] for url, params in self.http.calls if url == PROJECTS_URL))
+        self.assertEqual(self.feed.last_cycle['detail_projects'], len(ids))
+        self.assertEqual(self.feed.fetch_details([]), {})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""
+Unit tests for bandit prompt allocation
+"""
+import unittest
+import random
+import sys
+import os
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from prompt_bandit import PromptBandit
+
+
+class TestPromptBandit(unittest.TestCase):
+    """Selection policies and posterior reporting"""
+
+    def test_thompson_favors_better_reply_rate(self):
+        bandit = PromptBandit('thompson', rng=random.Random(42))
+        bandit.load([(1, 100, 30, 3), (2, 100, 5, 0)])
+        picks = [bandit.select([1, 2]) for _ in range(200)]
+        self.assertGreater(picks.count(1), 190)
+
+    def test_ucb_tries_unplayed_arms_first(self):
+        bandit = PromptBandit('ucb')
+        bandit.load([(1, 50, 20, 0)])
+        self.assertEqual(bandit.select([1, 2]), 2)
+        bandit.record_bid(2)
+        self.assertEqual(bandit.arms[2], [1, 0, 0])
+
+    def test_incremental_updates_and_posterior(self):
+        bandit = PromptBandit()
+        bandit.record_bid(7)
+        bandit.record_bid(7)
+        bandit.record_reply(7)
+        bandit.record_win(7)
+        state = bandit.posterior([7, 8])
+        arm = next(a for a in state['arms'] if a['prompt_id'] == 7)
+        self.assertEqual((arm['alpha'], arm['beta']), (2, 2))
+        self.assertEqual(arm['won'], 1)
+        self.assertAlmostEqual(sum(a['p_best'] for a in state['arms']), 1.0, places=3)
+        self.assertIsNone(next(a for a in state['arms'] if a['prompt_id'] == 8)['ucb'])
+
+    def test_rejects_unknown_strategy(self):
+        with self.assertRaises(ValueError):
+            PromptBandit('epsilon')
+        self.assertIsNone(PromptBandit().select([]))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the prompt-selection cache
+"""
+import unittest
+import sys
+import os
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from prompt_cache import SelectionCache, project_signature, arsenal_fingerprint, budget_band
+
+
+PROMPTS = [
+    {'id': 1, 'name': 'Technical', 'description': 'For dev-heavy briefs', 'template': 'Write {title}'},
+    {'id': 2, 'name': 'Business', 'description': 'For founders', 'template': 'Pitch {title}'},
+]
+
+
+class TestProjectSignature(unittest.TestCase):
+    """Projects of the same shape share a signature"""
+
+    def test_same_shape_same_signature(self):
+        a = {'title': 'Build a React dashboard', 'description': 'New app from scratch',
+             'jobs': [{'name': 'React.js'}, {'name': 'Node.js'}]}
+        b = {'title': 'Create admin panel', 'description': 'We want to build an MVP',
+             'jobs': [{'name': 'nodejs'}, {'name': 'reactjs'}]}
+        self.assertEqual(project_signature(a, 300), project_signature(b, 350))
+
+    def test_kind_of_work_and_budget_split_signatures(self):
+        build = {'title': 'Build a React app', 'jobs': [{'name': 'React.js'}]}
+        fix = {'title': 'Fix a React bug', 'jobs': [{'name': 'React.js'}]}
+        self.assertNotEqual(project_signature(build, 300), project_signature(fix, 300))
+        self.assertNotEqual(project_signature(build, 300), project_signature(build, 5000))
+        self.assertEqual(budget_band(0), 0)
+        self.assertLess(budget_band(100), budget_band(1000))
+
+
+class TestSelectionCache(unittest.TestCase):
+    """TTL, arsenal invalidation and hit-rate counters"""
+
+    def test_hit_miss_and_ttl(self):
+        cache = SelectionCache(ttl_seconds=60)
+        fingerprint = arsenal_fingerprint(PROMPTS)
+        self.assertIsNone(cache.get('sig', fingerprint, now=1000))
+        cache.put('sig', fingerprint, 2, now=1000)
+        self.assertEqual(cache.get('sig', fingerprint, now=1030), 2)
+        self.assertIsNone(cache.get('sig', fingerprint, now=1100))
+        stats = cache.stats()
+        self.assertEqual((stats['hits'], stats['misses']), (1, 2))
+        self.assertAlmostEqual(stats['hit_rate'], 0.333, places=3)
+
+    def test_arsenal_change_invalidates(self):
+        cache = SelectionCache()
+        cache.put('sig', arsenal_fingerprint(PROMPTS), 1)
+        edited = [dict(PROMPTS[0], template='Write something else about {title}'), PROMPTS[1]]
+        self.assertIsNone(cache.get('sig', arsenal_fingerprint(edited)))
+        self.assertEqual(cache.stats()['invalidations'], 1)
+        self.assertEqual(len(cache), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Unit tests for prompt prefix splitting and the context cache
+"""
+import unittest
+import threading
+import time
+import sys
+import os
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from prompt_prefix import ContextCache, split_template, FOLLOW_UP
+from llm_client import LLMClient
+from llm_providers import StubProvider
+
+
+TEMPLATE = """
+You are a senior developer with a strong portfolio.
+
+A client just posted this project (posted less than 2 minutes ago):
+
+Title: {project_title}
+
+Budget: ${budget_min}-${budget_max}
+
+Rules you MUST follow:
+- Be specific.
+
+Write only the message itself.
+"""
+
+
+class RecordingModel:
+    """A model without prefix support: records the prompt it was sent"""
+
+    def __init__(self):
+        self.prompts = []
+
+    def generate_content(self, prompt, request_options=None, generation_config=None):
+        self.prompts.append(prompt)
+        return type('Response', (), {'text': 'ok', 'usage_metadata': None})()
+
+
+class TestSplitTemplate(unittest.TestCase):
+    """Static paragraphs become the prefix, the project block the suffix"""
+
+    def test_split_moves_static_paragraphs_to_prefix(self):
+        prefix, suffix = split_template(TEMPLATE)
+        self.assertIn('senior developer', prefix)
+        self.assertIn('Rules you MUST follow', prefix)
+        self.assertIn('Write only the message itself.', prefix)
+        self.assertNotIn('{', prefix)
+        self.assertTrue(suffix.startswith('A client just posted'))
+        self.assertIn('{project_title}', suffix)
+        self.assertTrue(suffix.endswith(FOLLOW_UP))
+
+    def test_templates_without_static_or_dynamic_parts_are_not_split(self):
+        self.assertEqual(split_template('Write {project_title}'), ('', 'Write {project_title}'))
+        self.assertEqual(split_template('No placeholders here'), ('', 'No placeholders here'))
+
+
+class TestContextCache(unittest.TestCase):
+    """Registrations are reused until the TTL runs out; small prefixes are skipped"""
+
+    def test_reuse_and_expiry(self):
+        cache = ContextCache(ttl_seconds=60)
+        self.assertEqual(cache.get('model', 'persona'), 'persona')
+        self.assertEqual(cache.get('model', 'persona'), 'persona')
+        stats = cache.stats()
+        self.assertEqual((stats['registrations'], stats['hits']), (1, 1))
+        cache.ttl_seconds = -1
+        cache.get('model', 'other persona')
+        cache.get('model', 'other persona')
+        self.assertEqual(cache.stats()['registrations'], 3)
+
+    def test_small_prefix_and_failed_backend_are_skipped(self):
+        class Failing(ContextCache):
+            def _create(self, model_name, prefix):
+                raise RuntimeError('cache unavailable')
+
+        self.assertIsNone(ContextCache(min_tokens=100).get('model', 'short'))
+        cache = Failing()
+        self.assertIsNone(cache.get('model', 'persona'))
+        self.assertIsNone(cache.get('model', 'persona'))
+        self.assertEqual((cache.stats()['failures'], cache.stats()['skipped']), (1, 1))
+
+    def test_failed_prefix_retried_after_delay(self):
+        class FailsOnce(ContextCache):
+            calls = 0
+
+            def _create(self, model_name, prefix):
+                self.calls += 1
+                if self.calls == 1:
+                    raise RuntimeError('cache unavailable')
+                return prefix
+
+        cache = FailsOnce(retry_after_seconds=0.05)
+        self.assertIsNone(cache.get('model', 'persona'))
+        self.assertIsNone(cache.get('model', 'persona'))
+        self.assertEqual(cache.calls, 1)
+        time.sleep(0.1)
+        self.assertEqual(cache.get('model', 'persona'), 'persona')
+        self.assertEqual(cache.calls, 2)
+
+    def test_registration_runs_outside_the_lock(self):
+        started, release = threading.Event(), threading.Event()
+
+        class Slow(ContextCache):
+            def _create(self, model_name, prefix):
+                if prefix == 'slow persona':
+                    started.set()
+                    release.wait(5)
+                return prefix
+
+        cache = Slow()
+        results = []
+        registering = threading.Thread(target=lambda: results.append(cache.get('model', 'slow persona')))
+        registering.start()
+        self.assertTrue(started.wait(5))
+        # Same prefix: sent inline rather than waiting; other prefixes aren't blocked at all
+        self.assertIsNone(cache.get('model', 'slow persona'))
+        self.assertEqual(cache.get('model', 'fast persona'), 'fast persona')
+        release.set()
+        registering.join()
+        self.assertEqual(results, ['slow persona'])
+        self.assertEqual(cache.get('model', 'slow persona'), 'slow persona')
+        self.assertEqual(cache.stats()['hits'], 1)
+
+
+class TestClientPrefix(unittest.TestCase):
+    """The client sends the prefix inline unless the provider can cache it"""
+
+    def test_prefix_inlined_for_plain_models(self):
+        model = RecordingModel()
+        LLMClient(model, max_retries=0).generate('suffix', prefix='prefix ')
+        self.assertEqual(model.prompts, ['prefix suffix'])
+
+    def test_stub_serves_prefix_from_cache(self):
+        client = LLMClient(StubProvider(), max_retries=0)
+        for _ in range(3):
+            client.generate('title: Build a dashboard', prefix='persona ' * 50)
+        stats = client.stats()['generation']
+        self.assertGreater(stats['cached_tokens']['avg'], 0)
+        self.assertEqual(client.model.context_cache.stats()['hits'], 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the in-memory prompt registry
+"""
+import unittest
+import sqlite3
+import sys
+import os
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from prompt_registry import (PromptRegistry, CompiledTemplate, TemplateError, validate_template,
+                             template_hash, AGE_FIELD)
+from migrations import migrate
+
+
+DEFAULT = "Default persona.\n\nWrite for {project_title}."
+
+VALUES = {
+    'project_title': 'Dashboard',
+    'full_description': 'A React dashboard',
+    'budget_min': 100,
+    'budget_max': 'open',
+    'skills_list': 'React',
+    AGE_FIELD: 'posted 3 minutes ago',
+}
+
+
+class TestTemplates(unittest.TestCase):
+    """Validation and precompiled rendering match str.format"""
+
+    def test_unknown_placeholders_and_bad_syntax_rejected(self):
+        with self.assertRaises(TemplateError):
+            validate_template("Hi {client_name}")
+        with self.assertRaises(TemplateError):
+            validate_template("Respond with {\"strategy\": 1}")
+        with self.assertRaises(TemplateError):
+            validate_template("Hi {}")
+        validate_template("Budget ${budget_min:>6}, literal {{braces}}")
+
+    def test_render_matches_format_and_age_phrase(self):
+        template = "Project: {project_title} (posted less than 2 minutes ago)\n\nBudget ${budget_min}-{budget_max!s}"
+        expected = template.format(**VALUES).replace("posted less than 2 minutes ago", VALUES[AGE_FIELD])
+        self.assertEqual(CompiledTemplate(template).render(VALUES), expected)
+
+
+class TestPromptRegistry(unittest.TestCase):
+    """Loads once, reloads only when prompts change, never reads the DB for lookups"""
+
+    def setUp(self):
+        handle, self.path = tempfile.mkstemp(suffix='.db')
+        os.close(handle)
+        migrate(self.path)
+        self.writer = sqlite3.connect(self.path)
+        self.writer.execute("INSERT INTO prompts (name, template, is_active) VALUES ('A', 'Write {project_title}', 1)")
+        self.writer.execute("INSERT INTO prompts (name, template) VALUES ('Broken', 'Hi {client_name}')")
+        self.writer.commit()
+        self.registry = PromptRegistry(lambda: sqlite3.connect(self.path, check_same_thread=False), DEFAULT)
+
+    def tearDown(self):
+        self.registry.close()
+        self.writer.close()
+        os.remove(self.path)
+
+    def test_load_skips_invalid_and_finds_active(self):
+        self.assertTrue(self.registry.refresh(force=True))
+        self.assertEqual([p['name'] for p in self.registry.all()], ['A'])
+        self.assertEqual(len(self.registry.invalid), 1)
+        prompt, compiled = self.registry.active()
+        self.assertEqual(prompt['name'], 'A')
+        self.assertEqual(prompt['prompt_hash'], template_hash('Write {project_title}'))
+        self.assertEqual(compiled.render(VALUES), 'Write Dashboard')
+
+    def test_reload_only_on_prompt_edits(self):
+        self.registry.refresh(force=True)
+        self.assertFalse(self.registry.refresh())
+        self.writer.execute("UPDATE prompts SET stats_bids = stats_bids + 1")
+        self.writer.commit()
+        self.assertFalse(self.registry.refresh())
+        self.writer.execute("UPDATE prompts SET is_active = 0")
+        self.writer.commit()
+        self.assertTrue(self.registry.refresh())
+        prompt, compiled = self.registry.active()
+        self.assertIsNone(prompt)
+        self.assertIs(compiled, self.registry.default)
+        self.assertEqual(self.registry.reloads, 2)
+
+    def test_invalid_template_logged_once(self):
+        with self.assertLogs('prompt_registry', 'WARNING') as logs:
+            self.registry.refresh(force=True)
+            self.writer.execute("UPDATE prompts SET name = 'A2' WHERE name = 'A'")
+            self.writer.commit()
+            self.assertTrue(self.registry.refresh())
+            self.writer.execute("UPDATE prompts SET template = 'Hi {client}' WHERE name = 'Broken'")
+            self.writer.commit()
+            self.assertTrue(self.registry.refresh())
+        self.assertEqual(len(logs.output), 2, logs.output)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the local prompt router
+"""
+import unittest
+import sqlite3
+import hashlib
+import tempfile
+import sys
+import os
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from prompt_router import PromptRouter, tokenize, training_samples
+
+
+def history():
+    """Prompt 1 gets replies on React work, prompt 2 on WordPress work"""
+    samples = []
+    for i in range(10):
+        samples.append((tokenize('React dashboard', ['React.js']), 1, 1.0 if i < 7 else 0.0))
+        samples.append((tokenize('React dashboard', ['React.js']), 2, 1.0 if i < 1 else 0.0))
+        samples.append((tokenize('WordPress site fix', ['WordPress']), 1, 0.0))
+        samples.append((tokenize('WordPress site fix', ['WordPress']), 2, 1.0 if i < 6 else 0.0))
+    return samples
+
+
+class TestPromptRouter(unittest.TestCase):
+    """Routing decisions, confidence and persistence"""
+
+    def test_routes_by_token_outcomes(self):
+        router = PromptRouter().fit(history())
+        prompt_id, confidence, support = router.predict(tokenize('New React app', ['reactjs']), [1, 2])
+        self.assertEqual(prompt_id, 1)
+        self.assertGreater(confidence, 0.3)
+        self.assertGreater(support, 0)
+        prompt_id, _, _ = router.predict(tokenize('WordPress plugin', ['WordPress']), [1, 2])
+        self.assertEqual(prompt_id, 2)
+
+    def test_unknown_project_has_no_support(self):
+        router = PromptRouter().fit(history())
+        _, _, support = router.predict(tokenize('Rust compiler', ['Rust']), [1, 2])
+        self.assertEqual(support, 0)
+        self.assertEqual(router.predict({'x'}, [99]), (None, 0.0, 0))
+
+    def test_save_and_load(self):
+        router = PromptRouter().fit(history())
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'router.json')
+            router.save(path)
+            loaded = PromptRouter.load(path)
+        tokens = tokenize('React dashboard', ['React.js'])
+        self.assertEqual(loaded.predict(tokens, [1, 2]), router.predict(tokens, [1, 2]))
+
+    def test_training_samples_attribute_by_hash(self):
+        conn = sqlite3.connect(':memory:')
+        conn.execute("CREATE TABLE prompts (id INTEGER PRIMARY KEY, template TEXT)")
+        conn.execute("CREATE TABLE bids (project_id INTEGER PRIMARY KEY, title TEXT, status TEXT, prompt_hash TEXT, "
+                     "prompt_id INTEGER, reply_count INTEGER DEFAULT 0, project_skills TEXT)")
+        conn.execute("INSERT INTO prompts VALUES (5, 'Template five')")
+        prompt_hash = hashlib.md5(b'Template five').hexdigest()[:16]
+        conn.execute("INSERT INTO bids VALUES (1, 'React app', 'applied', ?, NULL, 2, 'React.js,Node.js')", (prompt_hash,))
+        conn.execute("INSERT INTO bids VALUES (2, 'Logo', 'won', NULL, 5, 0, NULL)")
+        conn.execute("INSERT INTO bids VALUES (3, 'Orphan', 'applied', 'unknownhash', NULL, 0, NULL)")
+        samples = training_samples(conn)
+        conn.close()
+        self.assertEqual([(pid, success) for _, pid, success in samples], [(5, 1.0), (5, 1.0)])
+        self.assertIn('skill:reactjs', samples[0][0])
+
+
+if __name__ == '__main__':
+    unittest.main()
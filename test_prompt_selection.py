@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the prompt-selection requests and reply parsers
+"""
+import unittest
+import json
+import sys
+import os
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from prompt_selection import (select_and_write_prompt, parse_select_and_write, batch_selection_prompt,
+                              parse_batch_selection, assign_batch_selection, preselected_prompt)
+from llm_providers import StubProvider
+
+PROMPTS = [
+    {'id': 11, 'name': 'Technical', 'description': 'For detailed specs', 'template': 'Tech {project_title}'},
+    {'id': 7, 'name': 'Friendly', 'description': 'For non-technical clients', 'template': 'Hi {project_title}'},
+    {'id': 30, 'name': 'Short', 'description': 'For small fixes', 'template': 'Fix {project_title}'},
+]
+
+PROJECT = {
+    'id': 1, 'title': 'Shop app', 'description': 'Build a React Native shop',
+    'jobs': [{'name': 'React Native'}, {'name': 'iOS'}], 'budget': {'minimum': 250, 'maximum': None},
+}
+
+
+class TestSelectAndWrite(unittest.TestCase):
+    """Combined mode: one reply carries the strategy and the message"""
+
+    def test_prompt_lists_every_strategy_and_the_project(self):
+        text = select_and_write_prompt(PROJECT, PROMPTS, ['be precise', 'be warm', 'be brief'], 'posted 3 minutes ago')
+        self.assertIn('1. Technical: For detailed specs\nINSTRUCTIONS:\nbe precise', text)
+        self.assertIn('3. Short: For small fixes\nINSTRUCTIONS:\nbe brief', text)
+        self.assertIn('Skills: React Native, iOS', text)
+        self.assertIn('Budget: $250–$open', text)
+        self.assertIn('Posted: posted 3 minutes ago', text)
+        self.assertIn('{"strategy": <number 1-3>', text)
+
+    def test_chosen_strategy_maps_to_its_prompt(self):
+        for strategy, prompt_id in ((1, 11), (2, 7), (3, 30)):
+            with self.subTest(strategy=strategy):
+                prompt, message = parse_select_and_write(json.dumps({'strategy': strategy, 'message': ' Hello '}), PROMPTS)
+                self.assertEqual((prompt['id'], message), (prompt_id, 'Hello'))
+        prompt, _ = parse_select_and_write('{"strategy": "2", "message": "x"}', PROMPTS)
+        self.assertEqual(prompt['id'], 7)
+
+    def test_fenced_json(self):
+        reply = 'Here you go:\n```json\n{"strategy": 3, "message": "Line one\\nLine two"}\n```'
+        prompt, message = parse_select_and_write(reply, PROMPTS)
+        self.assertEqual((prompt['id'], message), (30, 'Line one\nLine two'))
+
+    def test_invalid_json(self):
+        for reply in ('', 'Strategy 2 is best', '{"strategy": 2, "message": ', '[2, "hi"]', None):
+            with self.subTest(reply=reply):
+                self.assertEqual(parse_select_and_write(reply, PROMPTS), (None, None))
+
+    def test_out_of_range_strategy_keeps_the_message(self):
+        for strategy in (0, 4, -1, 'two', None):
+            with self.subTest(strategy=strategy):
+                reply = json.dumps({'strategy': strategy, 'message': 'Hello'})
+                self.assertEqual(parse_select_and_write(reply, PROMPTS), (None, 'Hello'))
+
+    def test_missing_or_empty_message(self):
+        for data in ({'strategy': 1}, {'strategy': 1, 'message': ''}, {'strategy': 1, 'message': '  \n'},
+                     {'strategy': 1, 'message': 42}):
+            with self.subTest(data=data):
+                prompt, message = parse_select_and_write(json.dumps(data), PROMPTS)
+                self.assertIsNone(message)
+                self.assertEqual(prompt['id'], 11)
+
+    def test_stub_provider_round_trip(self):
+        text = select_and_write_prompt(PROJECT, PROMPTS[:2], ['a', 'b'], 'just posted')
+        prompt, message = parse_select_and_write(StubProvider().generate_content(text).text, PROMPTS[:2])
+        self.assertIn(prompt['id'], (11, 7))
+        self.assertIn('Shop app', message)
+
+
+class TestBatchSelection(unittest.TestCase):
+    """Batch mode: one reply maps project numbers to strategy numbers"""
+
+    def projects(self, count):
+        return [dict(PROJECT, id=i, title=f"Project {i}") for i in range(1, count + 1)]
+
+    def test_prompt_numbers_projects_and_strategies(self):
+        text = batch_selection_prompt(self.projects(2), PROMPTS)
+        self.assertIn('PROJECT 2\nTitle: Project 2\nSkills: React Native, iOS\nBudget: $250–$open', text)
+        self.assertIn('2. Friendly: For non-technical clients', text)
+        self.assertIn('(by number 1-3)', text)
+
+    def test_full_and_partial_answers(self):
+        self.assertEqual(parse_batch_selection('{"1": 2, "2": 3, "3": 1}', 3, 3), {1: 2, 2: 3, 3: 1})
+        self.assertEqual(parse_batch_selection('```json\n{"2": "1"}\n```', 3, 3), {2: 1})
+
+    def test_non_json_answers(self):
+        for reply in ('', 'Project 1 -> strategy 2', '[2, 1]', '{"1": 2', None):
+            with self.subTest(reply=reply):
+                self.assertEqual(parse_batch_selection(reply, 3, 3), {})
+
+    def test_out_of_range_and_malformed_entries_are_dropped(self):
+        reply = json.dumps({'0': 1, '4': 1, '1': 0, '2': 4, '3': 'x', 'one': 1, '1.5': 2, '2b': 1})
+        self.assertEqual(parse_batch_selection(reply, 3, 3), {})
+        self.assertEqual(parse_batch_selection('{"1": {"strategy": 2}, "2": 2}', 3, 3), {2: 2})
+
+    def test_duplicate_keys(self):
+        self.assertEqual(parse_batch_selection('{"1": 2, "1": 2, "2": 1}', 2, 3), {1: 2, 2: 1})
+        # Conflicting picks for one project (however its number is spelled) leave it undecided
+        self.assertEqual(parse_batch_selection('{"1": 2, "1": 3, "2": 1}', 2, 3), {2: 1})
+        self.assertEqual(parse_batch_selection('{"1": 2, "01": 3, "2": 1}', 2, 3), {2: 1})
+
+    def test_unassigned_projects_fall_through_to_per_project_selection(self):
+        batch = self.projects(3)
+        assigned = assign_batch_selection('{"1": 3, "3": 9}', batch, PROMPTS)
+        self.assertEqual([(project['id'], prompt['id']) for project, prompt in assigned], [(1, 30)])
+        self.assertEqual(preselected_prompt(batch[0], PROMPTS)['id'], 30)
+        self.assertNotIn('_selected_prompt_id', batch[1])
+        self.assertIsNone(preselected_prompt(batch[1], PROMPTS))
+        self.assertIsNone(preselected_prompt(batch[2], PROMPTS))
+        # A pick whose prompt was deleted since is ignored too
+        self.assertIsNone(preselected_prompt(batch[0], PROMPTS[:2]))
+
+    def test_stub_provider_round_trip(self):
+        batch = self.projects(3)
+        reply = StubProvider().generate_content(batch_selection_prompt(batch, PROMPTS)).text
+        self.assertEqual(len(assign_batch_selection(reply, batch, PROMPTS)), 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Query-plan regression tests for the dashboard's bids queries, and bids paging
+"""
+import unittest
+import sqlite3
+import sys
+import os
+import re
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import bid_queries
+from migrations import migrate
+
+# "SCAN bids" / "SCAN TABLE bids AS b" without USING ... INDEX: a full table scan
+TABLE_SCAN = re.compile(r'^SCAN (TABLE )?(bids|b)( AS b)?$')
+
+
+class TestQueryPlans(unittest.TestCase):
+    """Every endpoint query reads bids through an index, never a table scan"""
+
+    @classmethod
+    def setUpClass(cls):
+        handle, cls.path = tempfile.mkstemp(suffix='.db')
+        os.close(handle)
+        migrate(cls.path)
+        cls.conn = sqlite3.connect(cls.path)
+        cls.conn.executemany(
+            "INSERT INTO bids (project_id, title, bid_amount, status, profit, applied_at, reply_count, "
+            "currency_code, prompt_id, prompt_hash) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            [(i, f"Project {i}", 100.0 + i, 'won' if i % 7 == 0 else 'applied', 10.0, f"2026-01-{1 + i % 28:02d} 12:00:00",
+              i % 3, 'EUR' if i % 2 else None, 1 + i % 4, f"hash{i % 4}") for i in range(500)])
+        cls.conn.execute("INSERT INTO prompts (name, template, prompt_hash) VALUES ('a', 'x', 'hash0')")
+        cls.conn.commit()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.conn.close()
+        os.remove(cls.path)
+
+    def plan(self, sql, params=()):
+        return [row[3] for row in self.conn.execute("EXPLAIN QUERY PLAN " + sql, params)]
+
+    def assertIndexed(self, sql, params=(), index='INDEX'):
+        plan = self.plan(sql, params)
+        scans = [step for step in plan if TABLE_SCAN.match(step)]
+        self.assertEqual(scans, [], f"table scan of bids in plan: {plan}")
+        self.assertTrue(any(index in step for step in plan), f"{index} not used in plan: {plan}")
+        return plan
+
+    def test_bids_pages_seek_in_keyset_order(self):
+        fields = list(bid_queries.BID_FIELDS)
+        cases = [
+            ({}, 'idx_bids_applied_at'),
+            ({'after': ('2026-01-10 12:00:00', 40)}, 'idx_bids_applied_at'),
+            ({'after': (None, 40)}, 'idx_bids_applied_at'),
+            ({'since': '2026-01-01', 'until': '2026-01-15'}, 'idx_bids_applied_at'),
+            ({'status': 'won', 'after': ('2026-01-10 12:00:00', 40)}, 'idx_bids_status'),
+            ({'prompt_id': 2}, 'idx_bids_prompt_id'),
+            ({'currency': 'USD', 'after': ('2026-01-10 12:00:00', 40)}, 'idx_bids_currency'),
+        ]
+        for filters, index in cases:
+            with self.subTest(**{key: str(value) for key, value in filters.items()}):
+                plan = self.assertIndexed(*bid_queries.bids_page(fields, 50, **filters), index=index)
+                self.assertFalse(any('TEMP B-TREE' in step for step in plan), f"sorts instead of reading in order: {plan}")
+
+    def test_bid_detail_is_a_primary_key_lookup(self):
+        plan = self.plan(bid_queries.BID_DETAIL, (1,))
+        self.assertTrue(any('INTEGER PRIMARY KEY' in step for step in plan[:1]), plan)
+
+    def test_stats_counters(self):
+        self.assertIndexed(bid_queries.COUNT_BIDS)
+        self.assertIndexed(bid_queries.COUNT_BIDS_WITH_STATUS, ('won',), 'idx_bids_status')
+        self.assertIndexed(bid_queries.COUNT_BIDS_WITH_REPLIES, index='idx_bids_reply_count')
+        self.assertIndexed(bid_queries.TOTALS_BY_CURRENCY, index='idx_bids_currency_totals')
+
+    def test_prompt_analytics_uses_prompt_hash_index(self):
+        self.assertIndexed(bid_queries.PROMPT_ANALYTICS, index='idx_bids_prompt_hash')
+
+    def test_prompt_id_lookups(self):
+        self.assertIndexed("SELECT COUNT(*) FROM bids WHERE prompt_id = ?", (1,), 'idx_bids_prompt_id')
+
+    def test_totals_match_row_by_row_sums(self):
+        totals = {currency: (value, profit) for currency, value, profit in self.conn.execute(bid_queries.TOTALS_BY_CURRENCY)}
+        self.assertEqual(set(totals), {'EUR', 'USD'})
+        self.assertAlmostEqual(sum(value for value, _ in totals.values()),
+                               self.conn.execute("SELECT SUM(bid_amount) FROM bids").fetchone()[0])
+
+
+class TestBidsPages(unittest.TestCase):
+    """Walking the cursor visits every matching bid once, newest first"""
+
+    def setUp(self):
+        handle, self.path = tempfile.mkstemp(suffix='.db')
+        os.close(handle)
+        migrate(self.path)
+        self.conn = sqlite3.connect(self.path)
+        # Two bids share each timestamp (project_id breaks the tie); 5 have no applied_at
+        self.conn.executemany(
+            "INSERT INTO bids (project_id, title, status, applied_at, currency_code, bid_message) VALUES (?, ?, ?, ?, ?, ?)",
+            [(i, f"Project {i}", 'won' if i % 3 == 0 else 'applied',
+              f"2026-01-01 00:{i // 2:02d}:00" if i >= 5 else None, 'EUR' if i % 2 else None, 'x' * 5000)
+             for i in range(45)])
+        self.conn.commit()
+
+    def tearDown(self):
+        self.conn.close()
+        os.remove(self.path)
+
+    def walk(self, limit, **filters):
+        pages, after = [], None
+        while True:
+            rows, after = bid_queries.fetch_bids_page(self.conn, ['project_id', 'applied_at'], limit, after, **filters)
+            pages.append([project_id for project_id, _ in rows])
+            if after is None:
+                return pages
+            after = bid_queries.decode_cursor(bid_queries.encode_cursor(after))
+
+    def expected(self, where="1"):
+        return [row[0] for row in self.conn.execute(
+            f"SELECT project_id FROM bids WHERE {where} ORDER BY applied_at DESC, project_id DESC")]
+
+    def test_walk_covers_every_bid_including_undated(self):
+        pages = self.walk(7)
+        self.assertEqual(sum(pages, []), self.expected())
+        self.assertTrue(all(len(page) == 7 for page in pages[:-1]))
+        self.assertEqual(sum(pages, [])[-5:], [4, 3, 2, 1, 0])
+
+    def test_filters(self):
+        self.assertEqual(sum(self.walk(4, status='won'), []), self.expected("status = 'won'"))
+        self.assertEqual(sum(self.walk(4, currency='USD'), []), self.expected("currency_code IS NULL"))
+        self.assertEqual(sum(self.walk(4, since='2026-01-01 00:10:00', until='2026-01-01 00:15:00'), []),
+                         self.expected("applied_at >= '2026-01-01 00:10:00' AND applied_at < '2026-01-01 00:15:00'"))
+
+    def test_projection_leaves_out_the_message(self):
+        rows, _ = bid_queries.fetch_bids_page(self.conn, ['title', 'has_message'], 3)
+        self.assertEqual(rows, [('Project 44', 1), ('Project 43', 1), ('Project 42', 1)])
+
+    def test_bad_cursor(self):
+        for token in ('', 'not-a-cursor', bid_queries.encode_cursor(('x', 'y'))):
+            with self.assertRaises(ValueError):
+                bid_queries.decode_cursor(token)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the compiled skill matcher
+"""
+import unittest
+import sys
+import os
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from skill_matcher import SkillMatcher, AhoCorasick
+
+USER_SKILLS = ['react', 'next.js', 'react native', 'typescript', 'three.js', 'ar', 'flutter', 'node.js']
+
+
+def legacy_match(required, user_skills):
+    """The original nested-loop rule from good_project()"""
+    for user_skill in user_skills:
+        if required == user_skill or required in user_skill or user_skill in required:
+            return True
+        if required.replace('.', '').replace(' ', '').replace('-', '') == user_skill.replace('.', '').replace(' ', '').replace('-', ''):
+            return True
+    return False
+
+
+class TestSkillMatcher(unittest.TestCase):
+    """Test that the compiled matcher keeps the old rules and adds aliases"""
+
+    def setUp(self):
+        self.matcher = SkillMatcher(USER_SKILLS)
+
+    def test_agrees_with_legacy_rules(self):
+        """Every required skill the old loop accepted is still accepted"""
+        required = ['react', 'reactjs', 'nextjs', 'next js', 'react native', 'native', 'three-js',
+                    'typescript', 'python', 'php', 'solidity', 'flutter', 'dart', 'node.js', 'nodejs',
+                    'javascript', 'augmented reality', 'webgl', 'excel', 'data entry', 'arduino']
+        for skill in required:
+            if legacy_match(skill, USER_SKILLS):
+                self.assertIsNotNone(self.matcher.match_skill(skill), f"{skill} should still match")
+
+    def test_aliases(self):
+        """Alias groups map alternate names onto the user's skill"""
+        self.assertEqual(self.matcher.match_skill('ReactJS'), 'react')
+        self.assertEqual(self.matcher.match_skill('nodejs'), 'node.js')
+        self.assertIsNone(self.matcher.match_skill('python'))
+
+    def test_match_project_reports_matches(self):
+        """Matched and missing skills are both returned"""
+        project = {'jobs': [{'name': 'React.js'}, {'name': 'Python'}, {'name': 'Flutter'}]}
+        matched, missing, source = self.matcher.match_project(project)
+        self.assertEqual(source, 'jobs')
+        self.assertEqual([user for _, user in matched], ['react', 'flutter'])
+        self.assertEqual(missing, ['python'])
+
+    def test_text_scan_when_no_jobs(self):
+        """Projects without skills fall back to scanning title and description"""
+        project = {'title': 'Build a Flutter app', 'description': 'Needs a Three.js viewer', 'jobs': []}
+        matched, missing, source = self.matcher.match_project(project)
+        self.assertEqual(source, 'text')
+        self.assertIn('flutter', [user for _, user in matched])
+        self.assertIn('three.js', [user for _, user in matched])
+
+    def test_aho_corasick_overlapping_patterns(self):
+        """Overlapping and nested patterns are all reported"""
+        automaton = AhoCorasick(['he', 'she', 'his', 'hers'])
+        self.assertEqual(sorted(automaton.find('ushers')), ['he', 'hers', 'she'])
+
+
+if __name__ == '__main__':
+    unittest.main()